@@ -29,6 +29,14 @@ interface ApiResponse {
   [key: string]: any;
 }
 
+interface CrewSyncResponse {
+  inserted: number;
+  updated: number;
+  deleted: number;
+  unchanged: number;
+  imported: string;
+}
+
 interface GlobalSetting {
   id: number;
   [key: string]: any;
@@ -39,7 +47,7 @@ const importApis = {
   clubs: () => axios.get<ApiResponse[]>("/api/club-data-import/"),
   events: () => axios.get<ApiResponse[]>("/api/event-data-import/"),
   bands: () => axios.get<ApiResponse[]>("/api/band-data-import/"),
-  crews: (apiEndpoint: string) => axios.get<ApiResponse[]>(apiEndpoint),
+  crews: (apiEndpoint: string) => axios.get<CrewSyncResponse>(apiEndpoint),
   competitors: () => axios.get<ApiResponse[]>("/api/competitor-data-import"),
   eventBands: () => axios.get<ApiResponse[]>("/api/crew-get-event-band/"),
   getSettings: () => axios.get<PaginatedResponse<GlobalSetting>>("api/global-settings-list/"),
@@ -206,14 +214,14 @@ const BROELoader: React.FC<BROELoaderProps> = ({ importPersonalData = false }) =
         updateStep("crews", { status: "loading" });
         try {
           const crewsResponse = await importApis.crews(crewApi);
-          const crewsCount = Array.isArray(crewsResponse.data) ? crewsResponse.data.length : 0;
+          const { inserted, updated, deleted, unchanged } = crewsResponse.data;
 
           updateStep("crews", {
             status: "success",
-            count: crewsCount,
-            message: getSuccessMessage("Importing crew data from British Rowing", crewsCount)
+            count: inserted + updated,
+            message: `Importing crew data from British Rowing - ${inserted} added, ${updated} updated, ${deleted} removed, ${unchanged} unchanged`
           });
-          lastUpdated = crewsResponse.data[0]?.updated || "";
+          lastUpdated = crewsResponse.data.imported || "";
           console.log("Crews imported:", crewsResponse.data);
         } catch (error) {
           hasErrors = true;
@@ -2,6 +2,7 @@ import React from "react";
 import { useMutation, useQueryClient, QueryKey } from "@tanstack/react-query";
 import axios, { AxiosResponse } from "axios";
 import TextButton from "../../atoms/TextButton/TextButton";
+import { waitForJob } from "../../../lib/jobs";
 
 interface DataLoaderProps {
   url: string;
@@ -16,6 +17,10 @@ const DataLoader: React.FC<DataLoaderProps> = ({ url, buttonText, queryKeyToInva
     mutationFn: async (): Promise<any> => {
       const response: AxiosResponse = await axios.get(url);
       console.log(response.data);
+      // Recalculations run as a background job, so wait for it before refetching
+      if (response.status === 202 && response.data?.id) {
+        return waitForJob(response.data.id);
+      }
       return response.data;
     },
     onSuccess: () => {
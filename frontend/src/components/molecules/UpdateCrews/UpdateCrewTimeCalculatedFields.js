@@ -1,6 +1,7 @@
 import React, { Component } from 'react'
 import axios from 'axios'
 import { formatTimeDate } from '../../../lib/helpers'
+import { waitForJob } from '../../../lib/jobs'
 import TextButton from '../../atoms/TextButton/TextButton'
 import { IconButton } from '../../atoms/IconButton/IconButton'
 import "./updateCrews.scss"
@@ -30,6 +31,8 @@ class CrewTimeCalculatedFieldsUpdate extends Component {
 
       console.log(update)
 
+      await waitForJob(update.data.id)
+
       this.setState({ crewDataUpdated: Date.now(), loading: false })
 
     } catch (err) {
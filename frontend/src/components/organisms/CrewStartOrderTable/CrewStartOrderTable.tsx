@@ -15,6 +15,7 @@ import TablePagination from "../../molecules/TablePagination/TablePagination";
 import SearchInput from "../../molecules/SearchInput/SearchInput";
 import Checkbox from "../../atoms/Checkbox/Checkbox";
 import TextButton from "../../atoms/TextButton/TextButton";
+import { waitForJob } from "../../../lib/jobs";
 import "./crewStartOrderTable.scss";
 
 interface duplicate {
@@ -166,14 +167,15 @@ export default function CrewStartOrderTable() {
         }
       });
 
-      const result = await response.json();
+      const job = await response.json();
 
-      if (response.ok && result.success) {
-        console.log(`Updated start orders for ${result.updated_crews} crews`);
+      if (response.ok) {
+        const result = await waitForJob(job.id);
+        console.log(`Updated start orders for ${result.result?.updated_crews} crews`);
         await refetch();
       } else {
-        console.error("Failed to update start orders:", result.message);
-        alert(`Error updating start orders: ${result.message}`);
+        console.error("Failed to update start orders:", job);
+        alert("Error updating start orders");
       }
     } catch (error) {
       console.error("Error updating start orders:", error);
@@ -77,8 +77,6 @@ const useServerCrews = ({
     queryFn: async (): Promise<CrewsApiResponse> => {
       const params = new URLSearchParams();
 
-      params.append("status", "Accepted");
-
       // Pagination
       params.append("page", (page + 1).toString()); // TanStack uses 0-based, DRF uses 1-based
       params.append("page_size", pageSize.toString());
@@ -94,7 +92,7 @@ const useServerCrews = ({
             orderField = gender === "all" ? "overall_rank" : "gender_rank";
             break;
           case "club":
-            orderField = "club__name";
+            orderField = "club_name";
             break;
           case "crew_name":
             orderField = "competitor_names";
@@ -112,18 +110,16 @@ const useServerCrews = ({
         params.append("search", globalFilter);
       }
 
-      // Results page specific - only crews with published times > 0 and exclude DQS, DNS, DNF
-      params.append("results_only", "true");
-
       if (selectedCategory) {
         params.append("event_band", selectedCategory);
       }
 
       if (gender && gender !== "all") {
-        params.append("event__gender", gender);
+        params.append("gender", gender);
       }
 
-      const response = await axios.get(`/api/crews/?${params.toString()}`);
+      // The results snapshot only holds accepted crews with a published time (no DQ, DNS or DNF)
+      const response = await axios.get(`/api/results/?${params.toString()}`);
       return response.data;
     },
     placeholderData: (previousData) => previousData,
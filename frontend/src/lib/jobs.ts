@@ -0,0 +1,27 @@
+import axios from "axios";
+
+export interface Job {
+  id: number;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  processed: number;
+  total: number | null;
+  result: Record<string, any> | null;
+  error: string;
+  duration: number | null;
+}
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Poll a background job until it finishes. Rejects if the job fails.
+export async function waitForJob(jobId: number, onProgress?: (job: Job) => void, interval = 1000): Promise<Job> {
+  for (;;) {
+    const { data } = await axios.get<Job>(`/api/jobs/${jobId}/`);
+    onProgress?.(data);
+
+    if (data.status === "succeeded") return data;
+    if (data.status === "failed") throw new Error(data.error || `Job ${jobId} failed`);
+
+    await sleep(interval);
+  }
+}
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'results.instrumentation.QueryTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -147,6 +148,11 @@ STATICFILES_DIRS = [
 ]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 
+# Per-request query counts and timings for the API (Server-Timing headers and
+# /api/instrumentation/), off unless RESULTS_INSTRUMENTATION=1
+RESULTS_INSTRUMENTATION = os.environ.get('RESULTS_INSTRUMENTATION') == '1'
+RESULTS_INSTRUMENTATION_WINDOW = int(os.environ.get('RESULTS_INSTRUMENTATION_WINDOW', 200))
+
 DEFAULT_AUTO_FIELD='django.db.models.AutoField'
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Club, Event, Crew, RaceTime, Competitor, MastersAdjustment, EventMeetingKey, GlobalSettings, Band, MarshallingDivision, NumberLocation, EventOrder, OriginalEventCategory
+from .models import Club, Event, Crew, RaceTime, Competitor, MastersAdjustment, EventMeetingKey, GlobalSettings, Band, MarshallingDivision, NumberLocation, EventOrder, OriginalEventCategory, Job
 
 # Register your models here.
 
@@ -16,3 +16,4 @@ admin.site.register(MarshallingDivision)
 admin.site.register(NumberLocation)
 admin.site.register(EventOrder)
 admin.site.register(OriginalEventCategory)
+admin.site.register(Job)
@@ -0,0 +1,9 @@
+"""
+Race-day load benchmarks: a synthetic meeting generator and timed scenarios
+run against it, reported as JSON. Run with manage.py benchmark, and the cold
+start of the app with manage.py benchmark_startup.
+"""
+
+from .generator import SIZES, Meeting
+from .scenarios import Benchmark, ScenarioFailed
+from .startup import StartupTouchedDatabase, measure_startup
@@ -0,0 +1,338 @@
+"""
+Synthetic meeting generator.
+
+Builds a meeting of any size from the 2024 event order in results/csv: clubs
+with number locations, events and bands, event orders, marshalling divisions
+and a masters adjustment table are saved straight away, while the crews are
+returned as a BROE OE2CrewInformation payload and the taps as Webscorer CSV
+rows so they go in through the same imports as on race day.
+
+Every crew is timed by each timing system, a race with both start and finish
+taps. The first system is the timing reference and the default start and
+finish; the others are offset from it, with a RaceTimingSync holding the
+offset.
+"""
+
+import csv
+import os
+import random
+
+from ..models import (
+    Band,
+    Club,
+    Competitor,
+    Crew,
+    Event,
+    EventOrder,
+    MarshallingDivision,
+    MastersAdjustment,
+    NumberLocation,
+    OriginalEventCategory,
+    Race,
+    RaceTimingSync,
+)
+from ..models.crew_model import BULK_BATCH_SIZE
+
+EVENT_ORDER_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "csv", "event-order-2024.csv"
+)
+
+# Event band suffixes that are a band of the event rather than part of its name
+BAND_NAMES = ["Championship", "Senior", "Intermediate", "Club"]
+
+GENDERS = {"Op": "Open", "W": "Female", "Mx": "Mixed"}
+
+MASTERS_CATEGORIES = ["MasB", "MasC", "MasD", "MasE", "MasF", "MasG", "MasH", "MasI"]
+
+# Bib numbers per marshalling division
+DIVISION_SIZE = 100
+
+# Clock time of the first start, and the gap between starts, in ms
+FIRST_START = 10 * 60 * 60 * 1000
+START_INTERVAL = 15 * 1000
+
+# Size presets for the benchmark command
+SIZES = {
+    "small": {"crews": 100, "clubs": 20},
+    "medium": {"crews": 500, "clubs": 60},
+    "race-day": {"crews": 1000, "clubs": 120},
+    "large": {"crews": 2500, "clubs": 200},
+}
+
+
+def format_tap(milliseconds):
+    """A Webscorer time tap (h:mm:ss.SS)"""
+    hours, remainder = divmod(milliseconds, 60 * 60 * 1000)
+    minutes, remainder = divmod(remainder, 60 * 1000)
+    seconds, remainder = divmod(remainder, 1000)
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{remainder // 10:02d}"
+
+
+def event_bands():
+    """(event band, event name, band name or None) from the 2024 event order"""
+    with open(EVENT_ORDER_CSV, newline="") as f:
+        rows = list(csv.reader(f))[1:]
+
+    bands = []
+    for event_band, _order in rows:
+        name, _space, suffix = event_band.rpartition(" ")
+        if suffix in BAND_NAMES:
+            bands.append((event_band, name, suffix))
+        else:
+            bands.append((event_band, event_band, None))
+    return bands
+
+
+def _boat_type(event_band):
+    return "2x" if "2x" in event_band else "2-"
+
+
+class Meeting:
+    """
+    A generated meeting. generate() saves the reference data and builds the
+    BROE payload and Webscorer taps, which the benchmark scenarios import.
+    """
+
+    def __init__(
+        self,
+        crews=1000,
+        clubs=60,
+        competitors_per_crew=2,
+        timing_systems=2,
+        unassigned_taps=0.05,
+        missing_taps=0.02,
+        unidentified_taps=0.02,
+        seed=1,
+    ):
+        self.crew_count = crews
+        self.club_count = clubs
+        self.competitors_per_crew = competitors_per_crew
+        self.timing_system_count = timing_systems
+        self.unassigned_taps = unassigned_taps
+        self.missing_taps = missing_taps
+        self.unidentified_taps = unidentified_taps
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    @property
+    def size(self):
+        return {
+            "crews": self.crew_count,
+            "clubs": self.club_count,
+            "competitors_per_crew": self.competitors_per_crew,
+            "timing_systems": self.timing_system_count,
+            "seed": self.seed,
+        }
+
+    def generate(self):
+        self.generate_clubs()
+        self.generate_events()
+        self.generate_races()
+        self.generate_masters_adjustments()
+        self.broe_crews = self.generate_broe_crews()
+        self.taps = self.generate_taps()
+        return self
+
+    def generate_clubs(self):
+        self.clubs = Club.objects.bulk_create(
+            Club(
+                id=club_id,
+                name=f"Club {club_id}",
+                abbreviation=f"C{club_id}",
+                index_code=f"C{club_id:03d}",
+                blade_image=f"https://example.com/blades/{club_id}.png",
+            )
+            for club_id in range(1, self.club_count + 1)
+        )
+        NumberLocation.objects.bulk_create(
+            NumberLocation(club=club.name, number_location=f"Tent {club.id % 5 + 1}")
+            for club in self.clubs
+        )
+
+    def generate_events(self):
+        self.events = {}
+        self.bands = {}
+        self.event_bands = []
+        for order, (event_band, event_name, band_name) in enumerate(
+            event_bands(), start=1
+        ):
+            event = self.events.get(event_name)
+            if event is None:
+                event = self.events[event_name] = Event(
+                    id=len(self.events) + 1,
+                    name=event_name,
+                    override_name=event_name,
+                    type="Master" if "Mas" in event_name else "Open",
+                    gender=GENDERS[event_name.split(" ")[0]],
+                )
+            band = None
+            if band_name is not None:
+                band = self.bands[event_band] = Band(
+                    id=len(self.bands) + 1, name=band_name, event=event
+                )
+            self.event_bands.append((event_band, event, band, order))
+
+        Event.objects.bulk_create(self.events.values())
+        Band.objects.bulk_create(self.bands.values())
+        EventOrder.objects.bulk_create(
+            EventOrder(event=event_band, event_order=order)
+            for event_band, _event, _band, order in self.event_bands
+        )
+        MarshallingDivision.objects.bulk_create(
+            MarshallingDivision(
+                name=f"Division {i + 1}",
+                bottom_range=i * DIVISION_SIZE + 1,
+                top_range=(i + 1) * DIVISION_SIZE,
+            )
+            for i in range(self.crew_count // DIVISION_SIZE + 1)
+        )
+
+    def generate_races(self):
+        """A race per timing system, the first the reference and default"""
+        self.timing_systems = []
+        for system in range(1, self.timing_system_count + 1):
+            first = system == 1
+            race = Race.objects.create(
+                name=f"Timing system {system}",
+                race_id=str(system),
+                default_start=first,
+                default_finish=first,
+                is_timing_reference=first,
+            )
+            # Each system's clock is up to a minute out from the reference
+            offset = 0 if first else self.rng.randint(-60000, 60000)
+            self.timing_systems.append((race, offset))
+
+        reference = self.timing_systems[0][0]
+        RaceTimingSync.objects.bulk_create(
+            RaceTimingSync(
+                reference_race=reference, target_race=race, timing_offset_ms=offset
+            )
+            for race, offset in self.timing_systems[1:]
+        )
+
+    def generate_masters_adjustments(self):
+        """Adjustments for every category against fastest times of 8 to 20 minutes"""
+        MastersAdjustment.objects.bulk_create(
+            (
+                MastersAdjustment(
+                    standard_time_label=f"{seconds // 60}:{seconds % 60:02d}",
+                    standard_time_ms=seconds * 1000,
+                    master_category=category,
+                    master_time_adjustment_ms=round(
+                        seconds * 1000 * (i + 1) * 0.012, -3
+                    ),
+                )
+                for seconds in range(8 * 60, 20 * 60 + 1)
+                for i, category in enumerate(MASTERS_CATEGORIES)
+            ),
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    def generate_broe_crews(self):
+        """The crews as BROE's OE2CrewInformation would send them"""
+        crews = []
+        for crew_id in range(1, self.crew_count + 1):
+            event_band, event, band, _order = self.rng.choice(self.event_bands)
+            club = self.rng.choice(self.clubs)
+            status = self.rng.choices(
+                ["Accepted", "Scratched", "Withdrawn"], weights=[90, 7, 3]
+            )[0]
+            crews.append(
+                {
+                    "id": crew_id,
+                    "name": f"{club.abbreviation} {event_band}"[:50],
+                    "compositeCode": None,
+                    "clubId": club.id,
+                    "rowingCRI": self.rng.randint(0, 200),
+                    "scullingCRI": self.rng.randint(0, 200),
+                    "eventId": event.id,
+                    "status": status,
+                    "customCrewNumber": crew_id,
+                    "bandId": band.id if band else None,
+                    "boatingPermissionsClubID": self.rng.choice(self.clubs).id,
+                    "competitionNotes": "TO" if self.rng.random() < 0.02 else "",
+                    "notes": "",
+                    "competitionContactName": f"Contact {crew_id}",
+                    "competitionContactHomePhone": None,
+                    "competitionContactMobilePhone": "07000 000000",
+                    "competitionContactWorkPhone": None,
+                }
+            )
+        return crews
+
+    def generate_taps(self):
+        """
+        {race: Webscorer CSV rows (after the header)} - a start and finish tap
+        per crew in every timing system, less a few missed taps and a few
+        recorded without the crew, plus some stray taps for no crew at all
+        """
+        taps = {race: [] for race, _offset in self.timing_systems}
+        accepted = [crew for crew in self.broe_crews if crew["status"] == "Accepted"]
+
+        for position, crew in enumerate(accepted):
+            started = FIRST_START + position * START_INTERVAL
+            finished = started + self.rng.randint(9 * 60000, 16 * 60000)
+            for race, offset in self.timing_systems:
+                for tap, time in (("Start", started), ("Finish", finished)):
+                    if self.rng.random() < self.missing_taps:
+                        continue
+                    jitter = self.rng.randint(-200, 200)
+                    crew_id = crew["id"]
+                    if self.rng.random() < self.unidentified_taps:
+                        crew_id = None
+                    taps[race].append((time - offset + jitter, tap, crew_id))
+
+        last_start = FIRST_START + len(accepted) * START_INTERVAL
+        for race_taps in taps.values():
+            for _ in range(int(len(accepted) * self.unassigned_taps)):
+                tap = self.rng.choice(["Start", "Finish"])
+                race_taps.append((self.rng.randint(FIRST_START, last_start), tap, None))
+
+        rows = {}
+        for race, race_taps in taps.items():
+            race_taps.sort(key=lambda race_tap: race_tap[0])
+            rows[race] = [
+                [sequence, "", "", tap, format_tap(time), "", "", "", crew_id or ""]
+                for sequence, (time, tap, crew_id) in enumerate(race_taps, start=1)
+            ]
+        return rows
+
+    def load_competitors(self):
+        """Competitors and original event categories for the imported crews"""
+        competitors = []
+        original_events = []
+        crew_names = {}
+        events = {event.id: event for event in self.events.values()}
+        for crew in self.broe_crews:
+            names = [
+                f"Rower{crew['id']}-{seat}"
+                for seat in range(1, self.competitors_per_crew + 1)
+            ]
+            crew_names[crew["id"]] = " / ".join(names)
+            competitors += [
+                Competitor(last_name=name, gender="M", crew_id=crew["id"])
+                for name in names
+            ]
+
+            event = events[crew["eventId"]]
+            boat_type = _boat_type(event.override_name)
+            original_event = boat_type
+            if event.type == "Master":
+                category = self.rng.choice(MASTERS_CATEGORIES)
+                prefix = {"Open": "", "Female": "W.", "Mixed": "Mx."}[event.gender]
+                original_event = f"{prefix}{category}.{boat_type}"
+            original_events.append(
+                OriginalEventCategory(crew_id=crew["id"], event_original=original_event)
+            )
+
+        Competitor.objects.bulk_create(competitors, batch_size=BULK_BATCH_SIZE)
+        OriginalEventCategory.objects.bulk_create(
+            original_events, batch_size=BULK_BATCH_SIZE
+        )
+        crews = list(Crew.objects.only("id", "competitor_names"))
+        for crew in crews:
+            crew.competitor_names = crew_names.get(crew.id)
+        Crew.objects.bulk_update(
+            crews, ["competitor_names"], batch_size=BULK_BATCH_SIZE
+        )
@@ -0,0 +1,271 @@
+"""
+Timed race-day scenarios against a generated meeting.
+
+Each scenario is run a number of times and reports the queries of its last
+run and the median, fastest and slowest wall-clock times. Scenarios run in
+race-day order and the loading ones (BROE import, time import, recompute and
+the draw) always run, untimed if they are filtered out, so that the later
+scenarios have crews, times and results to work on.
+"""
+
+import contextlib
+import fnmatch
+import io
+import json
+import statistics
+import time
+
+from django import get_version
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from ..crew_import import import_crews, sync_crews
+from ..models import Crew
+from ..race_time_import import import_csv_taps
+from ..views import (
+    BibDataExport,
+    CompetitorDataExport,
+    CreateEventOrderTemplate,
+    CreateNumberLocationTemplate,
+    CreatePenaltiesTemplate,
+    CrewDataExport,
+    CrewListView,
+    CrewStartOrderDataExport,
+    CrewWebScorerDataExport,
+    RaceTimeAutoAssignView,
+    RaceTimeListView,
+    RaceTimingSyncEstimateView,
+    RawTimeComparisonView,
+    ResultDataExport,
+    ResultsComparisonView,
+    StartOrderDataExport,
+)
+from ..views.results import ResultListView
+
+CSV_EXPORTS = [
+    ("crew_data_export", CrewDataExport),
+    ("bib_data_export", BibDataExport),
+    ("start_order_data_export", StartOrderDataExport),
+    ("crew_start_order_data_export", CrewStartOrderDataExport),
+    ("crew_web_scorer_data_export", CrewWebScorerDataExport),
+    ("result_data_export", ResultDataExport),
+    ("competitor_data_export", CompetitorDataExport),
+    ("event_order_template", CreateEventOrderTemplate),
+    ("number_location_template", CreateNumberLocationTemplate),
+    ("penalties_template", CreatePenaltiesTemplate),
+]
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+class Scenario:
+    def __init__(self, name, description, run, setup=False, timed=True):
+        self.name = name
+        self.description = description
+        self.run = run
+        # Setup scenarios load the data the later scenarios need
+        self.setup = setup
+        self.timed = timed
+
+
+class Benchmark:
+    """Runs the scenarios against a generated Meeting and builds the report"""
+
+    def __init__(self, meeting, repeat=5, patterns=None):
+        self.meeting = meeting
+        self.repeat = repeat
+        self.patterns = patterns
+        self.factory = APIRequestFactory()
+
+    def selected(self, scenario):
+        if not self.patterns:
+            return True
+        return any(fnmatch.fnmatch(scenario.name, pattern) for pattern in self.patterns)
+
+    def scenarios(self):
+        reference, _offset = self.meeting.timing_systems[0]
+        scenarios = [
+            Scenario(
+                "broe_import",
+                "Replace all crews from a BROE payload",
+                lambda: import_crews(self.meeting.broe_crews),
+                setup=True,
+            ),
+            Scenario(
+                "broe_sync_unchanged",
+                "Sync an unchanged BROE payload",
+                lambda: sync_crews(self.meeting.broe_crews),
+            ),
+            Scenario(
+                "competitors",
+                "Load the competitors",
+                self.meeting.load_competitors,
+                setup=True,
+                timed=False,
+            ),
+            Scenario(
+                "time_import",
+                "Import the Webscorer CSV taps for every race",
+                self.import_taps,
+                setup=True,
+            ),
+            Scenario(
+                "recompute",
+                "Recalculate times, masters adjustments, ranks and the results snapshot",
+                Crew.update_all_computed_properties,
+                setup=True,
+            ),
+            Scenario(
+                "start_order_draw",
+                "Draw the start order",
+                Crew.update_start_order_calcs,
+                setup=True,
+            ),
+            Scenario(
+                "crew_list_page_25",
+                "First page of accepted crews, 25 per page",
+                lambda: self.get(CrewListView, {"status[]": "Accepted"}),
+            ),
+            Scenario(
+                "crew_list_page_500",
+                "First page of accepted crews, 500 per page",
+                lambda: self.get(
+                    CrewListView, {"status[]": "Accepted", "page_size": 500}
+                ),
+            ),
+            Scenario(
+                "race_time_list",
+                "First page of the reference race's taps, with the tap summary",
+                lambda: self.get(
+                    RaceTimeListView, {"race_id": self.meeting.timing_systems[0][0].id}
+                ),
+            ),
+            Scenario(
+                "results_list",
+                "First page of public results",
+                lambda: self.get(ResultListView),
+            ),
+            Scenario(
+                "raw_time_comparison",
+                "Raw time comparison across timing systems",
+                lambda: self.get(RawTimeComparisonView),
+            ),
+            Scenario(
+                "tap_auto_assign_proposals",
+                "Proposed crews for every unassigned tap",
+                lambda: self.get(RaceTimeAutoAssignView),
+            ),
+            Scenario(
+                "sync_offset_estimate",
+                "Estimated offsets between the timing systems",
+                lambda: self.get(RaceTimingSyncEstimateView),
+            ),
+        ]
+
+        if len(self.meeting.timing_systems) > 1:
+            other, _offset = self.meeting.timing_systems[1]
+            comparison = {
+                "comparison1": {
+                    "start_race_id": reference.id,
+                    "finish_race_id": reference.id,
+                },
+                "comparison2": {"start_race_id": other.id, "finish_race_id": other.id},
+            }
+            scenarios.append(
+                Scenario(
+                    "results_comparison",
+                    "Results from the first two timing systems compared",
+                    lambda: self.post(ResultsComparisonView, comparison),
+                )
+            )
+
+        for name, view in CSV_EXPORTS:
+            scenarios.append(
+                Scenario(
+                    name,
+                    f"{view.__name__} CSV",
+                    lambda view=view: self.get(view),
+                )
+            )
+
+        return scenarios
+
+    def import_taps(self):
+        for race, rows in self.meeting.taps.items():
+            import_csv_taps(rows, race.id)
+
+    def get(self, view, params=None):
+        return self.respond(view, self.factory.get("/", params or {}))
+
+    def post(self, view, data):
+        request = self.factory.post(
+            "/", json.dumps(data), content_type="application/json"
+        )
+        return self.respond(view, request)
+
+    def respond(self, view, request):
+        """The view's response, rendered or streamed to the end"""
+        response = view.as_view()(request)
+        if hasattr(response, "render"):
+            response.render()
+        if response.streaming:
+            for _chunk in response.streaming_content:
+                pass
+        if response.status_code >= 400:
+            raise ScenarioFailed(f"{view.__name__} returned {response.status_code}")
+        return response
+
+    def measure(self, scenario):
+        timings = []
+        for _ in range(self.repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                scenario.run()
+                timings.append((time.perf_counter() - started) * 1000)
+        return {
+            "name": scenario.name,
+            "description": scenario.description,
+            "queries": len(queries),
+            "runs": len(timings),
+            "median_ms": round(statistics.median(timings), 2),
+            "min_ms": round(min(timings), 2),
+            "max_ms": round(max(timings), 2),
+        }
+
+    def run(self, progress=None):
+        """
+        Run the scenarios, returning a result for each selected one. progress,
+        if given, is called with each result.
+        """
+        results = []
+        for scenario in self.scenarios():
+            # The jobs print progress, which would get in the way of the report
+            timed = scenario.timed and self.selected(scenario)
+            if not timed and not scenario.setup:
+                continue
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                if timed:
+                    result = self.measure(scenario)
+                else:
+                    scenario.run()
+
+            if timed:
+                results.append(result)
+                if progress:
+                    progress(result)
+        return results
+
+    def report(self, results):
+        return {
+            "generated": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "django": get_version(),
+            "meeting": self.meeting.size,
+            "repeat": self.repeat,
+            "scenarios": results,
+        }
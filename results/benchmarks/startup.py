@@ -0,0 +1,78 @@
+"""
+Cold start cost of the results app.
+
+Every process (each manage.py command, web worker and release step) imports
+results.urls, and with it every view, before it serves anything. Each run
+here starts a fresh interpreter, sets Django up and imports results.urls,
+timing both and recording any SQL run on the way: importing the app should
+never need the database.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+SCRIPT = """
+import contextlib, json, time
+
+started = time.perf_counter()
+import django
+django.setup()
+setup_ms = (time.perf_counter() - started) * 1000
+
+from django.db import connections
+
+queries = []
+
+def record(execute, sql, params, many, context):
+    queries.append(sql)
+    return execute(sql, params, many, context)
+
+started = time.perf_counter()
+with contextlib.ExitStack() as stack:
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(record))
+    import results.urls
+import_ms = (time.perf_counter() - started) * 1000
+
+print(json.dumps({"setup_ms": setup_ms, "import_ms": import_ms, "queries": queries}))
+"""
+
+
+class StartupTouchedDatabase(Exception):
+    pass
+
+
+def cold_start():
+    """setup_ms, import_ms and the queries run, from a new interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_startup(repeat=5):
+    """
+    The median and max setup and import times over repeat cold starts.
+    Raises StartupTouchedDatabase with the SQL if any start ran a query.
+    """
+    runs = [cold_start() for _ in range(repeat)]
+    queries = [sql for run in runs for sql in run["queries"]]
+    if queries:
+        raise StartupTouchedDatabase(
+            f"Importing results.urls ran {len(queries)} queries, starting with: "
+            f"{queries[0]}"
+        )
+
+    report = {"runs": repeat}
+    for field in ("setup_ms", "import_ms"):
+        values = [run[field] for run in runs]
+        report[field] = {
+            "median": round(statistics.median(values), 1),
+            "max": round(max(values), 1),
+        }
+    return report
@@ -0,0 +1,287 @@
+"""
+Bulk import of crews from British Rowing (BROE).
+
+The whole OE2CrewInformation payload is validated in memory against the clubs,
+events and bands loaded up front, then written in one transaction rather than
+saved one crew at a time through a serializer.
+
+sync_crews compares the payload with the stored crews by id and a hash of the
+imported fields: new crews are inserted, changed crews updated and crews no
+longer in BROE marked as removed, leaving unchanged crews (and their times,
+penalties and overrides) untouched. import_crews throws everything away and
+reloads, e.g. when switching to a different meeting.
+"""
+
+import hashlib
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import (
+    Band,
+    Club,
+    Crew,
+    Event,
+    OriginalEventCategory,
+    RaceTime,
+    ResultSnapshot,
+)
+from .models.crew_model import BULK_BATCH_SIZE
+from .serializers import BulkImportCrewSerializer
+from .versions import CREWS, RACE_TIMES, bump, collected
+
+# Crews without a host club in BROE are all given this club
+UNASSIGNED_HOST_CLUB_ID = 999998
+UNASSIGNED_HOST_CLUB_NAME = "Unknown club - host club not assigned"
+
+# Status given to crews that are no longer in BROE
+REMOVED_STATUS = "Removed"
+
+# Crew fields that come from BROE; everything else is only ever set locally
+BROE_FIELDS = [
+    "name",
+    "composite_code",
+    "club",
+    "rowing_CRI",
+    "sculling_CRI",
+    "event",
+    "status",
+    "band",
+    "bib_number",
+    "host_club",
+    "otd_contact",
+    "otd_home_phone",
+    "otd_mobile_phone",
+    "otd_work_phone",
+    "time_only",
+]
+
+# BROE fields that change a crew's results if they change
+RESULT_INPUT_FIELDS = ["event_id", "band_id", "status", "time_only"]
+
+
+def crew_data(crew, personal=False):
+    """
+    Crew fields from a BROE crew. Contact details are only kept if personal,
+    otherwise they are cleared.
+    """
+    data = {
+        "name": crew["name"],
+        "id": crew["id"],
+        "composite_code": crew["compositeCode"],
+        "club": crew["clubId"],
+        "rowing_CRI": crew["rowingCRI"],
+        "sculling_CRI": crew["scullingCRI"],
+        "event": crew["eventId"],
+        "status": crew["status"],
+        "bib_number": crew["customCrewNumber"],
+        "band": crew["bandId"],
+        "host_club": crew["boatingPermissionsClubID"],
+        "time_only": crew["competitionNotes"] == "TO" or crew["notes"] == "TO",
+        "otd_contact": None,
+        "otd_home_phone": None,
+        "otd_mobile_phone": None,
+        "otd_work_phone": None,
+    }
+
+    if personal:
+        data.update(
+            {
+                "otd_contact": crew["competitionContactName"],
+                "otd_home_phone": crew["competitionContactHomePhone"],
+                "otd_mobile_phone": crew["competitionContactMobilePhone"],
+                "otd_work_phone": crew["competitionContactWorkPhone"],
+            }
+        )
+
+    return data
+
+
+def validate_crews(broe_crews, personal=False):
+    """
+    Validate every crew in the payload, raising a ValidationError for the
+    whole import if any crew is invalid. Returns the validated crew fields.
+    """
+    serializer = BulkImportCrewSerializer(
+        data=[crew_data(crew, personal) for crew in broe_crews],
+        many=True,
+        context={
+            "club_ids": set(Club.objects.values_list("id", flat=True)),
+            "event_ids": set(Event.objects.values_list("id", flat=True)),
+            "band_ids": set(Band.objects.values_list("id", flat=True)),
+        },
+    )
+    serializer.is_valid(raise_exception=True)
+
+    seen = set()
+    for row in serializer.validated_data:
+        if row["id"] in seen:
+            raise serializers.ValidationError(
+                {"id": f"Crew {row['id']} is in the import more than once"}
+            )
+        seen.add(row["id"])
+
+    return serializer.validated_data
+
+
+def missing_host_clubs(host_club_ids):
+    """Placeholder clubs for host club ids that aren't in the club list"""
+    existing = set(
+        Club.objects.filter(id__in=host_club_ids).values_list("id", flat=True)
+    )
+    return [
+        Club(
+            id=club_id,
+            name=(
+                UNASSIGNED_HOST_CLUB_NAME
+                if club_id == UNASSIGNED_HOST_CLUB_ID
+                else f"Unknown club - {club_id}"
+            ),
+        )
+        for club_id in sorted(set(host_club_ids) - existing)
+    ]
+
+
+def build_crew(row, events, bands):
+    """An unsaved Crew from validated fields, with its event band worked out"""
+    row = dict(row)
+    host_club_id = row.pop("host_club", None)
+    band_id = row.pop("band", None)
+
+    crew = Crew(
+        event=events[row.pop("event")],
+        band=bands[band_id] if band_id is not None else None,
+        club_id=row.pop("club"),
+        host_club_id=(
+            UNASSIGNED_HOST_CLUB_ID if host_club_id is None else host_club_id
+        ),
+        **row,
+    )
+    crew.event_band = crew.calc_event_band()
+    crew.broe_hash = content_hash(crew)
+    return crew
+
+
+def content_hash(crew):
+    """Hash of the BROE fields of a crew"""
+    values = {
+        field: getattr(crew, crew._meta.get_field(field).attname)
+        for field in BROE_FIELDS
+    }
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+def build_crews(broe_crews, personal=False):
+    """Validate the payload and build unsaved crews, with any missing host clubs"""
+    rows = validate_crews(broe_crews, personal)
+
+    events = Event.objects.in_bulk()
+    bands = Band.objects.in_bulk()
+    crews = [build_crew(row, events, bands) for row in rows]
+    return crews, missing_host_clubs({crew.host_club_id for crew in crews})
+
+
+def import_crews(broe_crews, personal=False):
+    """
+    Replace all crews (and their race times and original event categories)
+    with the crews from BROE. Nothing is deleted if the payload is invalid.
+    Returns the inserted / updated / deleted counts.
+    """
+    crews, host_clubs = build_crews(broe_crews, personal)
+
+    # One change each for every crew and race time, not one per deleted crew
+    with transaction.atomic(), collected():
+        _total, deleted = Crew.objects.all().delete()
+        RaceTime.objects.all().delete()
+        OriginalEventCategory.objects.all().delete()
+        # Nothing is published until the new crews are recalculated
+        ResultSnapshot.objects.all().delete()
+
+        Club.objects.bulk_create(host_clubs)
+        Crew.objects.bulk_create(crews, batch_size=BULK_BATCH_SIZE)
+        bump(CREWS)
+        bump(RACE_TIMES)
+
+    return {
+        "inserted": len(crews),
+        "updated": 0,
+        "deleted": deleted.get(Crew._meta.label, 0),
+        "unchanged": 0,
+    }
+
+
+def sync_crews(broe_crews, personal=False):
+    """
+    Bring the stored crews in line with BROE without reloading them. Crews
+    whose results inputs (event, band, status, time only) change, and new or
+    removed crews, are flagged requires_recalculation. Returns the inserted /
+    updated / deleted (marked as removed) / unchanged counts.
+    """
+    crews, host_clubs = build_crews(broe_crews, personal)
+    stored = {
+        crew.id: crew
+        for crew in Crew.objects.only(
+            "id",
+            "broe_hash",
+            "event",
+            "band",
+            "status",
+            "time_only",
+            "requires_recalculation",
+        )
+    }
+    now = timezone.now()
+
+    inserted, updated = [], []
+    for crew in crews:
+        existing = stored.get(crew.id)
+        if existing is None:
+            crew.requires_recalculation = True
+            inserted.append(crew)
+        elif crew.broe_hash != existing.broe_hash:
+            crew.requires_recalculation = existing.requires_recalculation or any(
+                getattr(crew, field) != getattr(existing, field)
+                for field in RESULT_INPUT_FIELDS
+            )
+            crew.updated = now
+            updated.append(crew)
+
+    # Crews already marked as removed have no hash, so they are updated if they come back
+    incoming_ids = {crew.id for crew in crews}
+    removed = [
+        crew
+        for crew in stored.values()
+        if crew.id not in incoming_ids and crew.status != REMOVED_STATUS
+    ]
+    for crew in removed:
+        crew.status = REMOVED_STATUS
+        crew.broe_hash = None
+        crew.requires_recalculation = True
+        crew.updated = now
+
+    with transaction.atomic():
+        Club.objects.bulk_create(host_clubs)
+        Crew.objects.bulk_create(inserted, batch_size=BULK_BATCH_SIZE)
+        Crew.objects.bulk_update(
+            updated,
+            BROE_FIELDS
+            + ["event_band", "broe_hash", "requires_recalculation", "updated"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Crew.objects.bulk_update(
+            removed,
+            ["status", "broe_hash", "requires_recalculation", "updated"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        # Renamed, scratched and removed crews change on the results now
+        ResultSnapshot.refresh([crew.id for crew in updated + removed])
+        bump(CREWS, [crew.id for crew in inserted + updated + removed])
+
+    return {
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "deleted": len(removed),
+        "unchanged": len(crews) - len(inserted) - len(updated),
+    }
@@ -0,0 +1,69 @@
+"""
+Streaming CSV exports.
+
+Exports are written row by row to a StreamingHttpResponse, so the download
+starts straight away and memory use doesn't grow with the size of the meeting.
+Rows are read with values() projections and iterator() rather than model
+instances, with anything that used to be looked up per crew (clubs, bands,
+number locations, marshalling divisions) joined in or loaded once up front
+(see lookups.py).
+"""
+
+import csv
+import datetime
+
+from django.http import StreamingHttpResponse
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object for csv.writer that hands back each line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def timestamped_filename(prefix):
+    return prefix + " - " + datetime.datetime.now().strftime("%Y-%m-%d-%H-%M.csv")
+
+
+def stream_csv(filename, header, rows):
+    """A CSV download of the header followed by each row in rows (any iterable)"""
+    writer = csv.writer(Echo(), delimiter=",")
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = 'attachment; filename="' + filename + '"'
+    return response
+
+
+def export_rows(queryset, fields, format_row):
+    """Rows for stream_csv from a values() projection, formatted by format_row(values)"""
+    for values in queryset.values(*fields).iterator(chunk_size=CHUNK_SIZE):
+        yield format_row(values)
+
+
+def blade_image(url):
+    return '=IMAGE("' + url + '")' if url else ""
+
+
+def manual_override_time(crew):
+    """Crew.manual_override_time from a values() row"""
+    return (
+        (crew["manual_override_minutes"] * 60 * 1000)
+        + (crew["manual_override_seconds"] * 1000)
+        + (crew["manual_override_hundredths_seconds"] * 10)
+    )
+
+
+def masters_adjusted_time(crew):
+    """Crew.masters_adjusted_time from a values() row"""
+    if not crew["masters_adjustment"]:
+        return 0
+    return crew["race_time"] - crew["masters_adjustment"]
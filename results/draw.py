@@ -0,0 +1,102 @@
+"""
+Set-based start order draw.
+
+Draw start scores are worked out in memory from a single load of the accepted
+crews instead of a count query per crew. A crew's score is its event band's
+event order plus a thousandth for each place in the band's CRI order: one
+more than the number of accepted crews in the band with a strictly higher
+sculling CRI (2x bands) or rowing CRI (2- bands) - the same rules as the
+original per-crew Crew.calc_draw_start_score.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+
+# Start order given to crews that can't be drawn
+UNDRAWN_START_ORDER = 9999999
+
+# Score for event bands that are neither sculling nor sweep
+UNRECOGNISED_ROW_SCORE = 0.001
+
+
+def _cri_field(event_band):
+    """The CRI a band is drawn on, or None if it is neither sculling nor sweep"""
+    if "2x" in event_band:
+        return "sculling_CRI"
+    if "2-" in event_band:
+        return "rowing_CRI"
+    return None
+
+
+def build_cri_tables(crews):
+    """Sorted lists of the CRIs in each event band, for the field it is drawn on"""
+    by_event_band = defaultdict(list)
+
+    for crew in crews:
+        if crew.status != "Accepted" or not crew.event_band:
+            continue
+        field = _cri_field(crew.event_band)
+        if field is None:
+            continue
+        cri = getattr(crew, field)
+        if cri is not None:
+            by_event_band[crew.event_band].append(cri)
+
+    for cris in by_event_band.values():
+        cris.sort()
+
+    return by_event_band
+
+
+def draw_start_score(crew, event_orders, tables):
+    """
+    The draw start score for one crew, or None if it can't be drawn (no event
+    orders, event band, CRI or event order for its band).
+    """
+    if not event_orders or not crew.event_band:
+        return None
+
+    field = _cri_field(crew.event_band)
+    if field is None:
+        row_score = UNRECOGNISED_ROW_SCORE
+    else:
+        cri = getattr(crew, field)
+        if cri is None:
+            return None
+        cris = tables.get(crew.event_band, [])
+        higher = len(cris) - bisect_right(cris, cri)
+        row_score = (higher + 1) / 1000
+
+    event_order = event_orders.get(crew.event_band)
+    if event_order is None:
+        return None
+    return event_order + row_score
+
+
+def calculate_start_orders(crews, event_orders, progress=None):
+    """
+    Set draw_start_score and calculated_start_order on each crew in crews,
+    which should be every accepted crew. Crews are ordered by score then
+    name, and crews without a score go to the back with UNDRAWN_START_ORDER.
+    progress, if given, is called with (crews processed, total).
+    """
+    tables = build_cri_tables(crews)
+
+    for processed, crew in enumerate(crews, start=1):
+        crew.draw_start_score = draw_start_score(crew, event_orders, tables)
+        if progress:
+            progress(processed, len(crews))
+
+    def draw_order(crew):
+        score = crew.draw_start_score
+        return (score is None, score if score is not None else float("inf"), crew.name)
+
+    ordered = sorted(crews, key=draw_order)
+
+    for position, crew in enumerate(ordered, start=1):
+        if not crew.draw_start_score:
+            crew.calculated_start_order = UNDRAWN_START_ORDER
+        else:
+            crew.calculated_start_order = position
+
+    return ordered
@@ -0,0 +1,211 @@
+"""
+Opt-in request instrumentation for the results API.
+
+With RESULTS_INSTRUMENTATION set, QueryTimingMiddleware records for every
+/api/ request the number of database queries, the time spent in them, the
+time spent rendering the response and the response size. These are sent
+back as a Server-Timing header and added to a rolling window of the latest
+requests to each endpoint, summarised at /api/instrumentation/.
+
+Streamed responses (the CSV exports) run most of their queries while the
+response is being sent, so their header only covers the view; the window
+gets the full figures once the stream finishes.
+
+The windows are held per process, like the reference data caches, so with
+more than one web process each reports on its own requests.
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+# Requests kept per endpoint, unless RESULTS_INSTRUMENTATION_WINDOW is set
+DEFAULT_WINDOW = 200
+
+# Requests listed as worst offenders
+WORST_OFFENDERS = 10
+
+API_PREFIX = "/api/"
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class RequestMetrics:
+    """
+    Figures for one request. Used as a database execute wrapper, so every
+    query run while it is installed is counted and timed.
+    """
+
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.size = 0
+        self.duration_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        return ", ".join(
+            [
+                f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+                f"render;dur={self.render_ms:.1f}",
+                f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}",
+            ]
+        )
+
+    def sample(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "duration_ms": round(self.duration_ms, 1),
+            "queries": self.queries,
+            "db_ms": round(self.db_ms, 1),
+            "render_ms": round(self.render_ms, 1),
+            "size": self.size,
+        }
+
+
+class EndpointStats:
+    """Rolling windows of the latest requests to each endpoint"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, endpoint, metrics):
+        with self.lock:
+            self.endpoints[endpoint].append(metrics.sample())
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def summary(self):
+        """p50 / p95 / max per endpoint, slowest first, and the worst requests"""
+        with self.lock:
+            endpoints = {
+                name: list(samples) for name, samples in self.endpoints.items()
+            }
+
+        summaries = []
+        for name, samples in endpoints.items():
+            summary = {"endpoint": name, "requests": len(samples)}
+            for field in ("duration_ms", "queries", "db_ms", "render_ms", "size"):
+                values = [sample[field] for sample in samples]
+                summary[field] = {
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "max": max(values),
+                }
+            summaries.append(summary)
+        summaries.sort(key=lambda summary: summary["duration_ms"]["p95"], reverse=True)
+
+        samples = [
+            {"endpoint": name, **sample}
+            for name, endpoint_samples in endpoints.items()
+            for sample in endpoint_samples
+        ]
+        return {
+            "window": self.window,
+            "endpoints": summaries,
+            "most_queries": sorted(
+                samples, key=lambda sample: sample["queries"], reverse=True
+            )[:WORST_OFFENDERS],
+            "slowest": sorted(
+                samples, key=lambda sample: sample["duration_ms"], reverse=True
+            )[:WORST_OFFENDERS],
+        }
+
+
+stats = EndpointStats(
+    getattr(settings, "RESULTS_INSTRUMENTATION_WINDOW", DEFAULT_WINDOW)
+)
+
+
+def endpoint_name(request):
+    """Method and URL pattern, so /api/crews/1 and /api/crews/2 are one endpoint"""
+    match = request.resolver_match
+    route = f"/{match.route}" if match is not None else request.path
+    return f"{request.method} {route}"
+
+
+class QueryTimingMiddleware:
+    """Instruments /api/ requests when RESULTS_INSTRUMENTATION is set"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "RESULTS_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(API_PREFIX):
+            return self.get_response(request)
+
+        metrics = RequestMetrics(request)
+        request.metrics = metrics
+        with connection.execute_wrapper(metrics):
+            response = self.get_response(request)
+
+        endpoint = endpoint_name(request)
+        response["Server-Timing"] = metrics.server_timing()
+
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, metrics, endpoint
+            )
+        else:
+            metrics.size = len(response.content)
+            metrics.finish()
+            stats.record(endpoint, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the rendering of DRF responses, done after the view returns"""
+        metrics = getattr(request, "metrics", None)
+        if metrics is None:
+            return response
+
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                metrics.render_ms += (time.perf_counter() - started) * 1000
+
+        response.render = timed_render
+        return response
+
+    def stream(self, content, metrics, endpoint):
+        """Pass the streamed content through, counting its queries and bytes"""
+        with connection.execute_wrapper(metrics):
+            for chunk in content:
+                metrics.size += len(chunk)
+                yield chunk
+        metrics.finish()
+        stats.record(endpoint, metrics)
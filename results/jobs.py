@@ -0,0 +1,139 @@
+"""
+Database backed background jobs.
+
+Requests that would recalculate the whole regatta queue a Job rather than
+doing the work inside the request. The `run_jobs` management command picks
+queued jobs up in order and runs them, saving progress as it goes so the
+frontend can poll /api/jobs/<id>/. A job that is still waiting in the queue
+covers any identical job queued after it, so repeated clicks or several
+imports in a row only lead to one recalculation.
+"""
+
+import json
+import traceback
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Crew, Job
+from .versions import CREWS, bump, collected
+
+RECOMPUTE = "recompute"
+START_ORDERS = "start_orders"
+
+# Progress is saved every PROGRESS_STEP crews rather than after every crew
+PROGRESS_STEP = 50
+
+
+def recompute(_params, progress):
+    """Recalculate every crew's times, masters adjustment and ranks"""
+    with collected():
+        updated = Crew.update_all_computed_properties(progress=progress)
+        Crew.objects.filter(status__exact="Accepted").update(
+            requires_recalculation=False
+        )
+        bump(CREWS)
+    return {"updated_crews": updated}
+
+
+def update_start_orders(_params, progress):
+    """Recalculate the draw start score and start order for accepted crews"""
+    return {"updated_crews": Crew.update_start_order_calcs(progress=progress)}
+
+
+HANDLERS = {
+    RECOMPUTE: recompute,
+    START_ORDERS: update_start_orders,
+}
+
+
+def enqueue(kind, params=None):
+    """
+    Queue a job, or return the matching job if one is already waiting to
+    run. A job that has already started is not reused as it may not see the
+    changes that led to this request.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    params = params or {}
+    dedupe_key = f"{kind}:{json.dumps(params, sort_keys=True)}"
+
+    while True:
+        job = Job.objects.filter(dedupe_key=dedupe_key, status=Job.QUEUED).first()
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                return Job.objects.create(
+                    kind=kind, params=params, dedupe_key=dedupe_key
+                )
+        except IntegrityError:
+            # Queued by a concurrent request since it was looked for; if
+            # that job has already been claimed, queue another
+            continue
+
+
+class JobProgress:
+    """Progress callback that saves processed / total on the job row"""
+
+    def __init__(self, job):
+        self.job = job
+        self.saved = None
+
+    def __call__(self, processed, total):
+        if (
+            self.saved is not None
+            and processed - self.saved < PROGRESS_STEP
+            and processed < total
+        ):
+            return
+        self.saved = processed
+        self.job.processed, self.job.total = processed, total
+        Job.objects.filter(pk=self.job.pk).update(processed=processed, total=total)
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it, or None"""
+    while True:
+        job = Job.objects.filter(status=Job.QUEUED).order_by("id").first()
+        if job is None:
+            return None
+
+        # Another worker may have claimed it since it was read
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    """Run a claimed job, recording its result or error"""
+    try:
+        job.result = HANDLERS[job.kind](job.params, JobProgress(job))
+        job.status = Job.SUCCEEDED
+    except Exception:
+        job.error = traceback.format_exc()
+        job.status = Job.FAILED
+    job.finished = timezone.now()
+    job.save(update_fields=["result", "error", "status", "finished"])
+    return job
+
+
+def run_next_job():
+    """Run the oldest queued job. Returns the job, or None if the queue is empty"""
+    job = claim_next_job()
+    if job is not None:
+        run_job(job)
+    return job
+
+
+def fail_interrupted_jobs():
+    """Jobs left running by a worker that stopped part way through"""
+    return Job.objects.filter(status=Job.RUNNING).update(
+        status=Job.FAILED,
+        error="Interrupted: the worker stopped before the job finished",
+        finished=timezone.now(),
+    )
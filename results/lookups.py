@@ -0,0 +1,200 @@
+"""
+Cached reference data lookups.
+
+Crew.event_order, Crew.marshalling_division and Crew.number_location used to
+run a query per crew. The EventOrder, MarshallingDivision and NumberLocation
+tables are small enough to hold in memory instead: each is loaded once per
+process (as a dict, or an interval index for marshalling divisions) and
+reloaded when its version (see results/versions.py) moves on, which the
+imports and model saves and deletes do. Checking the version is a single
+primary key lookup, and as the versions are kept in the database every
+process sees every change.
+"""
+
+import bisect
+
+from django.utils.functional import cached_property
+
+from .models import EventOrder, MarshallingDivision, NumberLocation
+from .versions import (
+    EVENT_ORDERS,
+    MARSHALLING_DIVISIONS,
+    NUMBER_LOCATIONS,
+    data_versions,
+    version,
+)
+
+# Tables built in this process, as {name: (version, table)}
+_tables = {}
+
+
+def cached_table(name, build, table_version=None):
+    """
+    build() for a reference table, held in this process until the table's
+    version changes. table_version saves looking it up if it is already known.
+    """
+    if table_version is None:
+        table_version = version(name)
+    held = _tables.get(name)
+    if held is None or held[0] != table_version:
+        held = (table_version, build())
+        _tables[name] = held
+    return held[1]
+
+
+def load_event_orders():
+    """{event band: event order}, the first if an event band has more than one"""
+    orders = {}
+    for event, event_order in EventOrder.objects.order_by("id").values_list(
+        "event", "event_order"
+    ):
+        orders.setdefault(event, event_order)
+    return orders
+
+
+def load_number_locations():
+    """{host club name: number location}, the first if a club has more than one"""
+    locations = {}
+    for club, number_location in NumberLocation.objects.order_by("id").values_list(
+        "club", "number_location"
+    ):
+        locations.setdefault(club, number_location)
+    return locations
+
+
+def event_orders(table_version=None):
+    """The cached load_event_orders(), not to be modified"""
+    return cached_table(EVENT_ORDERS, load_event_orders, table_version)
+
+
+def number_locations(table_version=None):
+    """The cached load_number_locations(), not to be modified"""
+    return cached_table(NUMBER_LOCATIONS, load_number_locations, table_version)
+
+
+def marshalling_divisions():
+    """
+    Crew.marshalling_division as a function of (bib number, calculated start
+    order), from the cached division index. None if no division covers it.
+    """
+    return marshalling_division_index().division_for
+
+
+class MarshallingDivisionIndex:
+    """
+    Marshalling division ranges as sorted, non-overlapping intervals searched
+    with bisect. Where ranges overlap the first division (by id) wins, as the
+    exports always did; overlaps and gaps are kept so they can be reported.
+    """
+
+    def __init__(self, divisions):
+        """divisions: (name, bottom_range, top_range) in id order"""
+        divisions = [
+            (name, bottom, top) for name, bottom, top in divisions if bottom <= top
+        ]
+
+        boundaries = sorted(
+            {bottom for _name, bottom, _top in divisions}
+            | {top + 1 for _name, _bottom, top in divisions}
+        )
+        self.starts, self.ends, self.names = [], [], []
+        for start, end in zip(boundaries, boundaries[1:]):
+            name = next(
+                (name for name, bottom, top in divisions if bottom <= start <= top),
+                None,
+            )
+            if name is None:
+                continue
+            if self.names and self.names[-1] == name and self.ends[-1] == start - 1:
+                self.ends[-1] = end - 1
+            else:
+                self.starts.append(start)
+                self.ends.append(end - 1)
+                self.names.append(name)
+
+        self.overlaps = []
+        by_bottom = sorted(divisions, key=lambda division: division[1])
+        for i, (name, bottom, top) in enumerate(by_bottom):
+            for other_name, other_bottom, other_top in by_bottom[i + 1 :]:
+                if other_bottom > top:
+                    break
+                self.overlaps.append(
+                    {
+                        "divisions": [name, other_name],
+                        "from": other_bottom,
+                        "to": min(top, other_top),
+                    }
+                )
+
+        self.gaps = []
+        previous_end = 0
+        for start, end in zip(self.starts, self.ends):
+            if start > previous_end + 1:
+                self.gaps.append({"from": previous_end + 1, "to": start - 1})
+            previous_end = end
+
+    @classmethod
+    def load(cls):
+        return cls(
+            MarshallingDivision.objects.order_by("id").values_list(
+                "name", "bottom_range", "top_range"
+            )
+        )
+
+    def lookup(self, number):
+        """The division covering a bib number or start order, or None"""
+        i = bisect.bisect_right(self.starts, number) - 1
+        if i >= 0 and number <= self.ends[i]:
+            return self.names[i]
+        return None
+
+    def division_for(self, bib_number, calculated_start_order):
+        number = bib_number or calculated_start_order
+        if not number:
+            return None
+        return self.lookup(number)
+
+
+def marshalling_division_index(table_version=None):
+    return cached_table(
+        MARSHALLING_DIVISIONS, MarshallingDivisionIndex.load, table_version
+    )
+
+
+class CrewLookups:
+    """
+    The per-crew reference data properties of Crew for a request, fetching
+    each cached table once rather than per crew, with the tables' versions
+    read in one query. Crews need host_club loaded.
+    """
+
+    @cached_property
+    def versions(self):
+        return data_versions()
+
+    @cached_property
+    def event_orders(self):
+        return event_orders(self.versions.get(EVENT_ORDERS, 0))
+
+    @cached_property
+    def number_locations(self):
+        return number_locations(self.versions.get(NUMBER_LOCATIONS, 0))
+
+    @cached_property
+    def marshalling_divisions(self):
+        return marshalling_division_index(
+            self.versions.get(MARSHALLING_DIVISIONS, 0)
+        ).division_for
+
+    def event_order(self, crew):
+        return self.event_orders.get(crew.event_band)
+
+    def marshalling_division(self, crew):
+        return self.marshalling_divisions(
+            crew.bib_number, crew.calculated_start_order
+        )
+
+    def number_location(self, crew):
+        if crew.host_club is None:
+            return None
+        return self.number_locations.get(crew.host_club.name)
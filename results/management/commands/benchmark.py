@@ -0,0 +1,96 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...benchmarks import SIZES, Benchmark, Meeting, ScenarioFailed
+from ...models import Club, Crew, Event, Race
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the race-day scenarios (BROE import, time import, recompute, draw, "
+        "crew and results pages, time comparisons and CSV exports) against a "
+        "generated meeting and write a JSON report. Everything is rolled back "
+        "afterwards; the database must not already hold a meeting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            choices=SIZES,
+            default="race-day",
+            help="Preset number of crews and clubs",
+        )
+        parser.add_argument("--crews", type=int, help="Overrides the size preset")
+        parser.add_argument("--clubs", type=int, help="Overrides the size preset")
+        parser.add_argument("--competitors-per-crew", type=int, default=2)
+        parser.add_argument(
+            "--timing-systems",
+            type=int,
+            default=2,
+            help="Start and finish races per system, the first the reference",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per scenario, median reported"
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Only time scenarios matching this pattern (repeatable, e.g. '*_export')",
+        )
+        parser.add_argument(
+            "--output", help="Write the JSON report here rather than to stdout"
+        )
+
+    def handle(self, *args, **options):
+        if options["timing_systems"] < 1:
+            raise CommandError("At least one timing system is needed")
+        if any(model.objects.exists() for model in (Club, Crew, Event, Race)):
+            raise CommandError(
+                "The database already has clubs, crews, events or races. Run the "
+                "benchmark against an empty, migrated database."
+            )
+
+        size = dict(SIZES[options["size"]])
+        for option in ("crews", "clubs"):
+            if options[option] is not None:
+                size[option] = options[option]
+
+        meeting = Meeting(
+            competitors_per_crew=options["competitors_per_crew"],
+            timing_systems=options["timing_systems"],
+            seed=options["seed"],
+            **size,
+        )
+        benchmark = Benchmark(meeting, options["repeat"], options["scenarios"])
+
+        try:
+            with transaction.atomic():
+                meeting.generate()
+                results = benchmark.run(progress=self.progress)
+                raise Rollback
+        except Rollback:
+            pass
+        except ScenarioFailed as e:
+            raise CommandError(str(e))
+
+        report = json.dumps(benchmark.report(results), indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(report + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(report)
+
+    def progress(self, result):
+        self.stderr.write(
+            f"{result['name']}: {result['queries']} queries, "
+            f"median {result['median_ms']:.1f} ms"
+        )
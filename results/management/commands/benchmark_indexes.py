@@ -0,0 +1,158 @@
+import contextlib
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from ...benchmarks import Meeting
+from ...crew_import import import_crews
+from ...models import Club, Crew, Event, Race, RaceTime
+from ...race_time_import import import_csv_taps
+from ...views import CrewListView, RaceTimeListView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare query plans and timings for the crew list, race time list and a "
+        "full recompute with and without the Crew / RaceTime indexes, on a "
+        "generated meeting. Everything is rolled back afterwards; the database "
+        "must not already hold a meeting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--crews", type=int, default=1000)
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per scenario, median reported"
+        )
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if any(model.objects.exists() for model in (Club, Crew, Event, Race)):
+            raise CommandError(
+                "The database already has clubs, crews, events or races. Run the "
+                "benchmark against an empty, migrated database."
+            )
+
+        self.factory = APIRequestFactory()
+        try:
+            with transaction.atomic():
+                self.generate(options["crews"], options["seed"])
+                with_indexes = self.run_scenarios(options["repeat"], "with")
+                self.drop_indexes()
+                without_indexes = self.run_scenarios(options["repeat"], "without")
+                raise Rollback
+        except Rollback:
+            pass
+
+        for name in with_indexes:
+            self.stdout.write(f"\n== {name}")
+            for label, results in (
+                ("without indexes", without_indexes),
+                ("with indexes", with_indexes),
+            ):
+                queries, median_ms, plan = results[name]
+                self.stdout.write(
+                    f"{label}: {queries} queries, median {median_ms:.1f} ms"
+                )
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+    def generate(self, crews, seed):
+        """A generated meeting with its crews, taps and results loaded"""
+        meeting = Meeting(crews=crews, clubs=max(crews // 10, 1), seed=seed)
+        meeting.generate()
+        import_crews(meeting.broe_crews)
+        meeting.load_competitors()
+        for race, rows in meeting.taps.items():
+            import_csv_taps(rows, race.id)
+        with contextlib.redirect_stdout(io.StringIO()):
+            Crew.update_all_computed_properties()
+
+        self.finish = meeting.timing_systems[0][0]
+        self.event_band = meeting.event_bands[0][0]
+
+    def scenarios(self):
+        """(name, callable, queryset whose plan is shown)"""
+        return [
+            (
+                "CrewListView (accepted crews in an event band, by rank)",
+                lambda: self.render(
+                    CrewListView,
+                    {"status[]": "Accepted", "event_band": self.event_band},
+                ),
+                Crew.objects.filter(
+                    status="Accepted", event_band=self.event_band
+                ).order_by("overall_rank")[:25],
+            ),
+            (
+                "RaceTimeListView (unassigned finish taps)",
+                lambda: self.render(
+                    RaceTimeListView,
+                    {
+                        "race_id": self.finish.id,
+                        "tap": "Finish",
+                        "unassigned_only": "true",
+                    },
+                ),
+                RaceTime.objects.filter(
+                    race=self.finish, tap="Finish", crew__isnull=True
+                ).order_by("sequence")[:25],
+            ),
+            (
+                "Full recompute (times, masters and ranks)",
+                Crew.update_all_computed_properties,
+                RaceTime.objects.filter(
+                    race=self.finish, crew__isnull=False
+                ).order_by("id"),
+            ),
+        ]
+
+    def render(self, view, params):
+        response = view.as_view()(self.factory.get("/", params))
+        response.render()
+        return response
+
+    def run_scenarios(self, repeat, phase):
+        results = {}
+        for name, run, queryset in self.scenarios():
+            timings = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    run()
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (
+                len(queries),
+                statistics.median(timings),
+                self.explain(queryset, phase),
+            )
+        return results
+
+    def explain(self, queryset, phase):
+        """
+        queryset.explain(), but with the phase in a comment - SQLite keeps
+        the plans of repeated EXPLAIN statements even after an index is dropped
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"{connection.ops.explain_query_prefix()} {sql} /* {phase} */", params
+            )
+            rows = cursor.fetchall()
+        return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+    def drop_indexes(self):
+        names = [index.name for index in Crew._meta.indexes]
+        names += [index.name for index in RaceTime._meta.indexes]
+        names += [constraint.name for constraint in RaceTime._meta.constraints]
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
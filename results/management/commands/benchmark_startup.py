@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmarks import StartupTouchedDatabase, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the cold import of results.urls (Django setup, then every view) in "
+        "fresh interpreters, and fail if it runs any database queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Cold starts, median reported"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = measure_startup(options["repeat"])
+        except StartupTouchedDatabase as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ...jobs import fail_interrupted_jobs, run_next_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (recalculations etc.) until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are currently queued, then exit",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between checks of an empty queue",
+        )
+
+    def handle(self, *args, **options):
+        # Only one worker runs, so anything still marked running was cut short
+        interrupted = fail_interrupted_jobs()
+        if interrupted:
+            self.stdout.write(f"Marked {interrupted} interrupted job(s) as failed")
+
+        while True:
+            close_old_connections()
+            job = run_next_job()
+
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+
+            self.stdout.write(
+                f"Job {job.id} ({job.kind}) {job.status} in {job.duration:.1f}s"
+            )
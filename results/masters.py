@@ -0,0 +1,170 @@
+"""
+Masters handicap calculation.
+
+Masters crews in a combined category (denoted by a '/' in the event band) get a
+time adjustment looked up from the imported MastersAdjustment table, keyed by
+their original masters category and the fastest raw time in the matching
+open/women's/mixed boat type. MastersHandicap works out those fastest time
+baselines and loads the lookup tables once, so adjustments for every masters
+crew can be calculated in one pass.
+"""
+
+from functools import cached_property
+
+from django.db.models import Min, Q
+
+from .models import Crew, MastersAdjustment, OriginalEventCategory
+
+# name, event band prefix, boat type
+BASELINES = [
+    ("fastest_men_scull", "Op", "2x"),
+    ("fastest_men_sweep", "Op", "2-"),
+    ("fastest_female_scull", "W", "2x"),
+    ("fastest_female_sweep", "W", "2-"),
+    ("fastest_mixed_scull", "Mx", "2x"),
+]
+
+# Which baseline applies to a masters crew: event gender, boat type in the
+# original event, baseline name and the slice of the original event that
+# holds the master category (e.g. 'MasC' from 'MasC.2x' or 'W.MasC.2x')
+ADJUSTMENT_RULES = [
+    ("Open", "2x", "fastest_men_scull", slice(0, 4)),
+    ("Open", "2-", "fastest_men_sweep", slice(0, 4)),
+    ("Female", "2x", "fastest_female_scull", slice(2, 6)),
+    ("Female", "2-", "fastest_female_sweep", slice(2, 6)),
+    ("Mixed", "2x", "fastest_mixed_scull", slice(3, 7)),
+]
+
+
+def _in_baseline(event_band, prefix, boat_type):
+    return bool(event_band) and event_band.startswith(prefix) and boat_type in event_band
+
+
+def calc_fastest_times(crews=None, exclude_ids=()):
+    """
+    Fastest raw time for each baseline, from the given crews or (if crews is
+    None) from the database in a single aggregate query, leaving out any
+    crews in exclude_ids.
+    """
+    if crews is None:
+        return Crew.objects.exclude(id__in=list(exclude_ids)).aggregate(
+            **{
+                name: Min(
+                    "raw_time",
+                    filter=Q(
+                        event_band__startswith=prefix,
+                        event_band__contains=boat_type,
+                        raw_time__gt=0,
+                    ),
+                )
+                for name, prefix, boat_type in BASELINES
+            }
+        )
+
+    fastest_times = {name: None for name, _prefix, _boat_type in BASELINES}
+    for crew in crews:
+        if not crew.raw_time or crew.raw_time <= 0:
+            continue
+        for name, prefix, boat_type in BASELINES:
+            if _in_baseline(crew.event_band, prefix, boat_type) and (
+                fastest_times[name] is None or crew.raw_time < fastest_times[name]
+            ):
+                fastest_times[name] = crew.raw_time
+    return fastest_times
+
+
+def merge_fastest_times(*fastest_times):
+    """Combine baselines worked out from separate sets of crews"""
+    return {
+        name: min(
+            (times[name] for times in fastest_times if times[name] is not None),
+            default=None,
+        )
+        for name, _prefix, _boat_type in BASELINES
+    }
+
+
+def standard_time(fastest_time):
+    """The fastest time rounded to the nearest second, as held in the adjustment table"""
+    return round(int(fastest_time), -3)
+
+
+class MastersHandicap:
+    def __init__(self, crews=None, fastest_times=None):
+        """
+        Baselines are taken from fastest_times or crews if given (e.g. crews
+        whose raw times have just been recalculated but not yet saved),
+        otherwise from the database.
+        """
+        if fastest_times is None:
+            fastest_times = calc_fastest_times(crews)
+        self.fastest_times = fastest_times
+
+    @cached_property
+    def enabled(self):
+        """Adjustments can only be worked out once original event categories are imported"""
+        return OriginalEventCategory.objects.filter(event_original="2x").exists()
+
+    @cached_property
+    def adjustment_table(self):
+        """{(master_category, standard_time_ms): master_time_adjustment_ms}"""
+        table = {}
+        for master_category, standard_time_ms, adjustment in (
+            MastersAdjustment.objects.order_by("id").values_list(
+                "master_category", "standard_time_ms", "master_time_adjustment_ms"
+            )
+        ):
+            table.setdefault((master_category, standard_time_ms), adjustment)
+        return table
+
+    @cached_property
+    def original_events(self):
+        """{crew_id: original event category} using each crew's first category"""
+        original_events = {}
+        for crew_id, event_original in (
+            OriginalEventCategory.objects.filter(crew__isnull=False)
+            .order_by("id")
+            .values_list("crew_id", "event_original")
+        ):
+            original_events.setdefault(crew_id, event_original)
+        return original_events
+
+    def original_event(self, crew):
+        return self.original_events.get(crew.id)
+
+    def lookup(self, master_category, fastest_time):
+        """Adjustment for a master category against a fastest time, or None if not in the table"""
+        return self.adjustment_table.get((master_category, standard_time(fastest_time)))
+
+    def adjustment(self, crew):
+        """Masters adjustment in milliseconds for a crew (0 if it doesn't apply)"""
+        if not self.enabled:
+            return 0
+
+        if (
+            crew.event_band is None
+            or "/" not in str(crew.event_band)
+            or crew.event.type != "Master"
+            or not crew.raw_time
+            or crew.raw_time <= 0
+        ):
+            return 0
+
+        original_event = self.original_event(crew)
+        if original_event is None:
+            return 0
+
+        for gender, boat_type, baseline, master_category in ADJUSTMENT_RULES:
+            fastest_time = self.fastest_times.get(baseline)
+            if (
+                fastest_time is not None
+                and crew.event.gender == gender
+                and boat_type in original_event
+            ):
+                return self.lookup(original_event[master_category], fastest_time) or 0
+
+        return 0
+
+    def adjustments(self, crews):
+        """{crew_id: masters adjustment} for all the given crews"""
+        return {crew.id: self.adjustment(crew) for crew in crews}
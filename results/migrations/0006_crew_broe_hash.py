@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crew',
+            name='broe_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
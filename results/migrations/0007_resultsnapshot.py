@@ -0,0 +1,40 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0006_crew_broe_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultSnapshot',
+            fields=[
+                ('crew_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50)),
+                ('competitor_names', models.CharField(blank=True, max_length=60, null=True)),
+                ('bib_number', models.IntegerField(blank=True, null=True)),
+                ('composite_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('event_band', models.CharField(db_index=True, max_length=40, null=True)),
+                ('gender', models.CharField(blank=True, db_index=True, max_length=20, null=True)),
+                ('club_name', models.CharField(max_length=50)),
+                ('club_blade_image', models.CharField(blank=True, max_length=200, null=True)),
+                ('overall_rank', models.IntegerField(blank=True, null=True)),
+                ('gender_rank', models.IntegerField(blank=True, null=True)),
+                ('category_rank', models.IntegerField(blank=True, null=True)),
+                ('raw_time', models.IntegerField(blank=True, null=True)),
+                ('published_time', models.IntegerField()),
+                ('published_time_display', models.CharField(max_length=10)),
+                ('masters_adjusted_time', models.IntegerField(default=0)),
+                ('masters_adjusted_time_display', models.CharField(blank=True, max_length=10)),
+                ('penalty', models.IntegerField(default=0)),
+                ('time_only', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['overall_rank'],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+def unassign_duplicate_taps(apps, schema_editor):
+    """
+    Before adding the constraint, keep only one of any duplicate assigned
+    taps on their crew and leave the rest unassigned. The timing code
+    couldn't choose between duplicates (the lookup raised
+    MultipleObjectsReturned), so those crews were left untimed; the lowest
+    id is kept as an arbitrary choice and the crew should be checked.
+    """
+    RaceTime = apps.get_model('results', 'RaceTime')
+    seen = set()
+    duplicates = []
+    race_times = RaceTime.objects.filter(crew__isnull=False, race__isnull=False).order_by('id')
+    for race_time_id, crew_id, race_id, tap in race_times.values_list('id', 'crew_id', 'race_id', 'tap').iterator():
+        if (crew_id, race_id, tap) in seen:
+            duplicates.append(race_time_id)
+        else:
+            seen.add((crew_id, race_id, tap))
+    RaceTime.objects.filter(id__in=duplicates).update(crew=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0007_resultsnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(unassign_duplicate_taps, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='crew',
+            index=models.Index(fields=['status', 'event_band'], name='crew_status_band_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crew',
+            index=models.Index(fields=['status', 'published_time'], name='crew_status_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crew',
+            index=models.Index(fields=['event_band'], name='crew_event_band_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crew',
+            index=models.Index(fields=['bib_number'], name='crew_bib_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crew',
+            index=models.Index(fields=['overall_rank'], name='crew_overall_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crew',
+            index=models.Index(fields=['category_rank'], name='crew_category_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='racetime',
+            index=models.Index(fields=['race', 'tap', 'crew'], name='racetime_race_tap_crew_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='racetime',
+            constraint=models.UniqueConstraint(condition=models.Q(('crew__isnull', False)), fields=('crew', 'race', 'tap'), name='unique_assigned_race_tap'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+DOMAINS = [
+    'crews', 'race_times', 'sync_offsets', 'event_orders',
+    'marshalling_divisions', 'number_locations', 'masters_adjustments',
+]
+
+
+def create_versions(apps, schema_editor):
+    """Start every domain at version 0, so bumps only ever update a row"""
+    DataVersion = apps.get_model('results', 'DataVersion')
+    DataVersion.objects.bulk_create([DataVersion(domain=domain) for domain in DOMAINS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0008_crew_racetime_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=50)),
+                ('crew_ids', models.JSONField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('domain', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
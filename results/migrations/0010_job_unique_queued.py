@@ -0,0 +1,32 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+def fail_duplicate_queued_jobs(apps, schema_editor):
+    """
+    Before adding the constraint, keep only the first of any queued jobs
+    with the same key; the others would have run the same work again.
+    """
+    Job = apps.get_model('results', 'Job')
+    first = {}
+    for job_id, dedupe_key in Job.objects.filter(status='queued').order_by('id').values_list('id', 'dedupe_key'):
+        if dedupe_key in first:
+            Job.objects.filter(id=job_id).update(status='failed', error=f'Merged into job {first[dedupe_key]}')
+        else:
+            first[dedupe_key] = job_id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0009_dataversion_datachange'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_queued_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('dedupe_key',), name='unique_queued_job'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from .band_model import Band
 from .club_model import Club
 from .competitor_model import Competitor
 from .crew_model import Crew, OriginalEventCategory, RaceTime 
+from .data_version_model import DataChange, DataVersion
 from .event_meeting_key_model import EventMeetingKey
 from .event_model import Event
 from .event_order_model import EventOrder
@@ -9,4 +10,6 @@ from .marshalling_division_model import MarshallingDivision
 from .masters_adjustment_model import MastersAdjustment
 from .number_location_model import NumberLocation
 from .global_settings_model import GlobalSettings
-from .race_model import Race, RaceTimingSync
\ No newline at end of file
+from .race_model import Race, RaceTimingSync
+from .job_model import Job
+from .result_snapshot_model import ResultSnapshot
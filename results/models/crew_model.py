@@ -1,6 +1,6 @@
 from django.db import models, transaction
 from django.db.models.signals import post_save, post_delete
-from django.db.models import Min, Avg
+from django.db.models import Min, Avg, Q
 from django.dispatch import receiver
 
 from .club_model import Club
@@ -12,6 +12,40 @@ from .marshalling_division_model import MarshallingDivision
 from .number_location_model import NumberLocation
 from .global_settings_model import GlobalSettings
 from .race_model import Race, RaceTimingSync
+from ..ranking import RANK_FIELDS, calculate_rankings, rank_groups, rank_inputs
+
+# Computed fields that only depend on a crew's own times and settings
+TIME_FIELDS = [
+    "raw_time",
+    "race_time",
+    "published_time",
+    "start_time",
+    "finish_time",
+    "start_sequence",
+    "finish_sequence",
+]
+
+# Every computed results field, in the order they are calculated
+COMPUTED_FIELDS = (
+    ["event_band"]
+    + TIME_FIELDS
+    + ["masters_adjustment", "category_position_time"]
+    + RANK_FIELDS
+)
+
+# Just enough of each crew to rank it
+RANKING_LOAD_FIELDS = [
+    "id",
+    "status",
+    "event__gender",
+    "event_band",
+    "time_only",
+    "published_time",
+    "category_position_time",
+    *RANK_FIELDS,
+]
+
+BULK_BATCH_SIZE = 500
 
 
 class Crew(models.Model):
@@ -50,6 +84,8 @@ class Crew(models.Model):
     did_not_finish = models.BooleanField(default=False)
     disqualified = models.BooleanField(default=False)
     requires_recalculation = models.BooleanField(default=False)
+    # Hash of the fields last imported from BROE, used to skip unchanged crews on re-import
+    broe_hash = models.CharField(max_length=64, blank=True, null=True)
     race_id_start_override = models.ForeignKey(
         Race,
         related_name="crew_override_start",
@@ -99,6 +135,19 @@ class Crew(models.Model):
     start_sequence = models.IntegerField(blank=True, null=True)
     finish_sequence = models.IntegerField(blank=True, null=True)
 
+    class Meta:
+        # The filters behind the crew list, results, draw, ranking and exports
+        indexes = [
+            models.Index(fields=["status", "event_band"], name="crew_status_band_idx"),
+            models.Index(
+                fields=["status", "published_time"], name="crew_status_published_idx"
+            ),
+            models.Index(fields=["event_band"], name="crew_event_band_idx"),
+            models.Index(fields=["bib_number"], name="crew_bib_number_idx"),
+            models.Index(fields=["overall_rank"], name="crew_overall_rank_idx"),
+            models.Index(fields=["category_rank"], name="crew_category_rank_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -115,27 +164,217 @@ class Crew(models.Model):
 
     def update_computed_properties(self, save=True):
         """Update all computed properties for this crew."""
-        self.raw_time = self.calc_raw_time()
-        self.race_time = self.calc_race_time()
-        self.published_time = self.calc_published_time()
-        self.start_time = self.calc_start_time()
-        self.finish_time = self.calc_finish_time()
+        self.update_time_properties()
         self.overall_rank = self.calc_overall_rank()
         self.gender_rank = self.calc_gender_rank()
         self.category_position_time = self.calc_category_position_time()
         self.category_rank = self.calc_category_rank()
-        self.start_sequence = self.calc_start_sequence()
-        self.finish_sequence = self.calc_finish_sequence()
         self.masters_adjustment = self.calc_masters_adjustment()
 
         if save:
             self.save()
 
+    def update_time_properties(self, timing=None):
+        """
+        Update the computed fields that only depend on this crew's own times.
+        Pass a TimingContext when updating many crews to share its lookups.
+        """
+        timing = timing or self._timing_context()
+        self.raw_time = self.calc_raw_time(timing)
+        self.race_time = self.calc_race_time()
+        self.published_time = self.calc_published_time()
+        self.start_time = self.calc_start_time(timing)
+        self.finish_time = self.calc_finish_time(timing)
+        self.start_sequence = self.calc_start_sequence(timing)
+        self.finish_sequence = self.calc_finish_sequence(timing)
+
     @classmethod
-    def update_all_computed_properties(cls):
-        """Update computed properties for all crews."""
-        for crew in cls.objects.all():
-            crew.update_computed_properties()
+    def update_all_computed_properties(cls, progress=None):
+        """
+        Update computed properties for all crews.
+        Timing data, masters baselines and ranks are each worked out once for
+        the whole set of crews, then everything is saved with a single bulk
+        update and the results snapshot rebuilt. progress, if given, is called
+        with (crews processed, total).
+        Returns the number of crews updated.
+        """
+        from ..masters import MastersHandicap
+        from ..timing import TimingContext
+        from ..versions import CREWS, bump
+        from .result_snapshot_model import ResultSnapshot
+
+        crews = list(cls.objects.select_related("event", "band"))
+        timing = TimingContext()
+
+        for processed, crew in enumerate(crews, start=1):
+            crew.event_band = crew.calc_event_band()
+            crew.update_time_properties(timing)
+            if progress:
+                progress(processed, len(crews))
+
+        # Baselines come from the new raw times, before anything is saved
+        handicap = MastersHandicap(crews=crews)
+        for crew in crews:
+            crew.masters_adjustment = crew.calc_masters_adjustment(handicap)
+            crew.category_position_time = crew.calc_category_position_time()
+        calculate_rankings(crews)
+
+        # The results, their snapshot and the version caches are keyed on are
+        # saved together, so a failure part way leaves none of them changed
+        with transaction.atomic():
+            cls.objects.bulk_update(
+                crews, COMPUTED_FIELDS, batch_size=BULK_BATCH_SIZE
+            )
+            ResultSnapshot.rebuild()
+            bump(CREWS)
+        return len(crews)
+
+    @classmethod
+    def update_rankings(cls):
+        """
+        Recalculate overall, gender and category ranks for all crews from their
+        stored times. Only crews whose ranks change are written.
+        """
+        from ..versions import CREWS, bump
+        from .result_snapshot_model import ResultSnapshot
+
+        crews = list(cls.objects.select_related("event").only(*RANKING_LOAD_FIELDS))
+        changed = calculate_rankings(crews)
+        with transaction.atomic():
+            cls.objects.bulk_update(changed, RANK_FIELDS, batch_size=BULK_BATCH_SIZE)
+            ResultSnapshot.rebuild()
+            bump(CREWS, [crew.id for crew in changed])
+        return len(changed)
+
+    @classmethod
+    def timed_on(cls, races):
+        """
+        Crews whose start or finish time comes from any of the races: those
+        overridden to them, and the rest if one is the default start or finish
+        """
+        race_ids = [race.id for race in races]
+        timed = Q(race_id_start_override__in=race_ids) | Q(
+            race_id_finish_override__in=race_ids
+        )
+        if any(race.default_start for race in races):
+            timed |= Q(race_id_start_override__isnull=True)
+        if any(race.default_finish for race in races):
+            timed |= Q(race_id_finish_override__isnull=True)
+        return cls.objects.filter(timed)
+
+    @classmethod
+    def update_computed_properties_for(cls, crew_ids, previous_groups=()):
+        """
+        Incrementally update computed properties after an edit to the given
+        crews or their race times. Only those crews' time fields are
+        recalculated, other masters crews are only redone when a fastest time
+        baseline moves, and ranks are only re-derived for the overall, gender
+        and event band groups whose crews changed (plus previous_groups, for a
+        crew that has just moved group). Only changed rows are written, and
+        only those crews' results snapshot rows replaced.
+        Returns the number of crews written.
+        """
+        from ..masters import MastersHandicap, calc_fastest_times, merge_fastest_times
+        from ..timing import TimingContext
+        from ..versions import CREWS, bump
+        from .result_snapshot_model import ResultSnapshot
+
+        crew_ids = {crew_id for crew_id in crew_ids if crew_id is not None}
+        if not crew_ids and not previous_groups:
+            return 0
+
+        crews = {}
+        before = {}
+        before_rank_inputs = {}
+
+        def track(crew):
+            crews[crew.id] = crew
+            before[crew.id] = crew._values(COMPUTED_FIELDS)
+            before_rank_inputs[crew.id] = rank_inputs(crew)
+
+        with transaction.atomic():
+            for crew in cls.objects.select_related("event", "band").filter(
+                id__in=crew_ids
+            ):
+                track(crew)
+
+            # Step 1: the edited crews' own times
+            timing = TimingContext(crews=crews.values())
+            for crew in crews.values():
+                crew.event_band = crew.calc_event_band()
+                crew.update_time_properties(timing)
+
+            # Step 2: a new fastest time moves every masters crew's adjustment
+            baseline_inputs = ["event_band", "raw_time"]
+            if any(
+                crew._values(baseline_inputs) != before[crew.id][:2]
+                for crew in crews.values()
+            ):
+                previous_fastest_times = calc_fastest_times()
+                handicap = MastersHandicap(
+                    fastest_times=merge_fastest_times(
+                        calc_fastest_times(exclude_ids=crews.keys()),
+                        calc_fastest_times(crews.values()),
+                    )
+                )
+                if handicap.fastest_times != previous_fastest_times:
+                    for crew in (
+                        cls.objects.select_related("event", "band")
+                        .filter(event_band__contains="/")
+                        .exclude(id__in=list(crews))
+                    ):
+                        track(crew)
+            else:
+                handicap = MastersHandicap()
+
+            groups = set(previous_groups)
+            if previous_groups:
+                for crew_id in crew_ids & crews.keys():
+                    groups |= rank_groups(crews[crew_id])
+            for crew in crews.values():
+                crew.masters_adjustment = crew.calc_masters_adjustment(handicap)
+                crew.category_position_time = crew.calc_category_position_time()
+                if rank_inputs(crew) != before_rank_inputs[crew.id]:
+                    groups |= rank_groups(crew)
+                    groups.add(("gender", before_rank_inputs[crew.id][1]))
+                    groups.add(("event_band", before_rank_inputs[crew.id][2]))
+
+            # Step 3: re-rank the affected groups against every crew
+            others = []
+            if groups:
+                rank_against = [
+                    crews.get(crew.id, crew)
+                    for crew in cls.objects.select_related("event").only(
+                        *RANKING_LOAD_FIELDS
+                    )
+                ]
+                others = [
+                    crew
+                    for crew in calculate_rankings(rank_against, groups=groups)
+                    if crew.id not in crews
+                ]
+                cls.objects.bulk_update(
+                    others, RANK_FIELDS, batch_size=BULK_BATCH_SIZE
+                )
+
+            changed = [
+                crew
+                for crew in crews.values()
+                if crew._values(COMPUTED_FIELDS) != before[crew.id]
+            ]
+            cls.objects.bulk_update(
+                changed, COMPUTED_FIELDS, batch_size=BULK_BATCH_SIZE
+            )
+            # The edited crews' own rows too, for fields shown on the results
+            # that aren't recalculated (names, bib numbers, penalties)
+            touched = crew_ids | {crew.id for crew in others + changed}
+            ResultSnapshot.refresh(touched)
+            bump(CREWS, [crew.id for crew in others + changed])
+
+        return len(others) + len(changed)
+
+    def _values(self, fields):
+        return tuple(getattr(self, field) for field in fields)
 
     # Event band
     def calc_event_band(self):
@@ -145,79 +384,45 @@ class Crew(models.Model):
             else self.event.override_name
         )
 
-    def calc_raw_time(self):
+    def calc_raw_time(self, timing=None):
         """
         Calculate raw time (finish - start) with proper timing synchronization.
         Returns time in milliseconds.
         """
-        try:
-            # Get the default start and finish races
-            race_default_start = Race.objects.get(default_start=True)
-            race_default_finish = Race.objects.get(default_finish=True)
-        except Race.DoesNotExist:
-            # If no default races are set, return 0
-            return 0
-
-        try:
-            if self.did_not_start or self.did_not_finish or self.disqualified:
-                return 0
+        timing = timing or self._timing_context()
 
-            # Get start and finish times for this crew from the appropriate races
-            if self.race_id_start_override:
-                start_time_record = self.times.get(
-                    tap="Start", race=self.race_id_start_override
-                )
-            else:
-                start_time_record = self.times.get(tap="Start", race=race_default_start)
+        # If no default races are set, return 0
+        if not timing.has_default_races:
+            return 0
 
-            if self.race_id_finish_override:
-                finish_time_record = self.times.get(
-                    tap="Finish", race=self.race_id_finish_override
-                )
-            else:
-                finish_time_record = self.times.get(
-                    tap="Finish", race=race_default_finish
-                )
+        if self.did_not_start or self.did_not_finish or self.disqualified:
+            return 0
 
-            # Get the races for timing synchronization
-            start_race = start_time_record.race
-            finish_race = finish_time_record.race
+        # Get start and finish times for this crew from the appropriate races
+        start_time_record = timing.start_tap(self)
+        finish_time_record = timing.finish_tap(self)
 
-            # Get synchronized times
-            synchronized_start = self._get_synchronized_time(
-                start_time_record.time_tap, start_race
-            )
-            synchronized_finish = self._get_synchronized_time(
-                finish_time_record.time_tap, finish_race
-            )
+        # Return 0 if start or finish time records don't exist
+        if start_time_record is None or finish_time_record is None:
+            return 0
 
-            return synchronized_finish - synchronized_start
+        # Get synchronized times
+        synchronized_start = timing.synchronized_time(
+            start_time_record.time_tap, start_time_record.race_id
+        )
+        synchronized_finish = timing.synchronized_time(
+            finish_time_record.time_tap, finish_time_record.race_id
+        )
 
-        except RaceTime.DoesNotExist:
-            # Return 0 if start or finish time records don't exist
-            return 0
+        return synchronized_finish - synchronized_start
 
-    def _get_synchronized_time(self, raw_time_ms, source_race):
-        """
-        Helper method to get synchronized time for a given race.
-        If the race is the timing reference, return the raw time.
-        Otherwise, apply the timing offset.
-        """
-        # If this race is the timing reference, no adjustment needed
-        if source_race.is_timing_reference:
-            return raw_time_ms
+    def _timing_context(self):
+        """Timing data for just this crew, when no shared context is passed in"""
+        from ..timing import TimingContext
 
-        try:
-            # Look for a sync record where this race is the target
-            sync_record = RaceTimingSync.objects.get(target_race=source_race)
-            synchronized_time = raw_time_ms + sync_record.timing_offset_ms
-            return synchronized_time
-        except RaceTimingSync.DoesNotExist:
-            # If no sync record exists, treat this race as already synchronized
-            # This handles the case where races are already in sync or no sync is needed
-            return raw_time_ms
+        return TimingContext(crews=[self])
 
-        # Race time
+    # Race time
 
     def calc_race_time(self):
         """Raw time plus any penalties"""
@@ -243,41 +448,15 @@ class Crew(models.Model):
             return self.manual_override_time + self.penalty * 1000
         return self.race_time
 
-    def calc_start_time(self):
+    def calc_start_time(self, timing=None):
         """Get the start time for this crew from the appropriate race."""
-        try:
-            # Determine which race to use for start time
-            if self.race_id_start_override:
-                start_race = self.race_id_start_override
-            else:
-                start_race = Race.objects.get(default_start=True)
-            
-            # Get the start time record
-            start_time_record = self.times.get(tap="Start", race=start_race)
-            return start_time_record.time_tap
-            
-        except Race.DoesNotExist:
-            return 0
-        except RaceTime.DoesNotExist:
-            return 0
+        start_time_record = (timing or self._timing_context()).start_tap(self)
+        return start_time_record.time_tap if start_time_record else 0
 
-    def calc_finish_time(self):
+    def calc_finish_time(self, timing=None):
         """Get the finish time for this crew from the appropriate race."""
-        try:
-            # Determine which race to use for finish time
-            if self.race_id_finish_override:
-                finish_race = self.race_id_finish_override
-            else:
-                finish_race = Race.objects.get(default_finish=True)
-            
-            # Get the finish time record
-            finish_time_record = self.times.get(tap="Finish", race=finish_race)
-            return finish_time_record.time_tap
-            
-        except Race.DoesNotExist:
-            return 0
-        except RaceTime.DoesNotExist:
-            return 0
+        finish_time_record = (timing or self._timing_context()).finish_tap(self)
+        return finish_time_record.time_tap if finish_time_record else 0
 
     # Overall rank
     def calc_overall_rank(self):
@@ -322,41 +501,15 @@ class Crew(models.Model):
             return len(crews) + 1
         return 0
 
-    def calc_start_sequence(self):
+    def calc_start_sequence(self, timing=None):
         """Get the start sequence for this crew from the appropriate race."""
-        try:
-            # Determine which race to use for start sequence
-            if self.race_id_start_override:
-                start_race = self.race_id_start_override
-            else:
-                start_race = Race.objects.get(default_start=True)
-            
-            # Get the start time record and return its sequence
-            start_time_record = self.times.get(tap="Start", race=start_race)
-            return start_time_record.sequence
-            
-        except Race.DoesNotExist:
-            return 0
-        except RaceTime.DoesNotExist:
-            return 0
+        start_time_record = (timing or self._timing_context()).start_tap(self)
+        return start_time_record.sequence if start_time_record else 0
 
-    def calc_finish_sequence(self):
+    def calc_finish_sequence(self, timing=None):
         """Get the finish sequence for this crew from the appropriate race."""
-        try:
-            # Determine which race to use for finish sequence
-            if self.race_id_finish_override:
-                finish_race = self.race_id_finish_override
-            else:
-                finish_race = Race.objects.get(default_finish=True)
-            
-            # Get the finish time record and return its sequence
-            finish_time_record = self.times.get(tap="Finish", race=finish_race)
-            return finish_time_record.sequence
-            
-        except Race.DoesNotExist:
-            return 0
-        except RaceTime.DoesNotExist:
-            return 0
+        finish_time_record = (timing or self._timing_context()).finish_tap(self)
+        return finish_time_record.sequence if finish_time_record else 0
 
     # Competitor names
     def get_competitor_names(self):
@@ -385,167 +538,32 @@ class Crew(models.Model):
     # Need to calculate the fastest time in race type
 
     # Masters adjustment
-    def calc_masters_adjustment(self):
+    def calc_masters_adjustment(self, handicap=None):
+        """
+        Pass a MastersHandicap when updating many crews so the fastest time
+        baselines and adjustment table are only loaded once.
+        """
+        if handicap is None:
+            from ..masters import MastersHandicap
 
-        if not OriginalEventCategory.objects.filter(event_original="2x").exists():
-            return 0
+            handicap = MastersHandicap()
+        return handicap.adjustment(self)
 
-        elif (
-            self.event_band is not None
-            and "/" in str(self.event_band)
-            and self.event.type == "Master"
-            and self.raw_time > 0
-        ):
-            fastest_men_scull = (
-                Crew.objects.all()
-                .filter(
-                    event_band__startswith="Op",
-                    event_band__contains="2x",
-                    raw_time__gt=0,
-                )
-                .aggregate(Min("raw_time"))
-                or 0
-            )
-            fastest_men_sweep = (
-                Crew.objects.all()
-                .filter(
-                    event_band__startswith="Op",
-                    event_band__contains="2-",
-                    raw_time__gt=0,
-                )
-                .aggregate(Min("raw_time"))
-                or 0
-            )
-            fastest_female_scull = (
-                Crew.objects.all()
-                .filter(
-                    event_band__startswith="W",
-                    event_band__contains="2x",
-                    raw_time__gt=0,
-                )
-                .aggregate(Min("raw_time"))
-                or 0
-            )
-            fastest_female_sweep = (
-                Crew.objects.all()
-                .filter(
-                    event_band__startswith="W",
-                    event_band__contains="2-",
-                    raw_time__gt=0,
-                )
-                .aggregate(Min("raw_time"))
-                or 0
-            )
-            fastest_mixed_scull = (
-                Crew.objects.all()
-                .filter(
-                    event_band__startswith="Mx",
-                    event_band__contains="2x",
-                    raw_time__gt=0,
-                )
-                .aggregate(Min("raw_time"))
-                or 0
-            )
+    # Calculate the draw start score (event order plus rowing / sculling CRI as appropriate)
+    # update_start_order_calcs draws every crew at once with results/draw.py
 
-            # Mens 2x (scull)
-            if (
-                fastest_men_scull["raw_time__min"] is not None
-                and self.event.gender == "Open"
-                and "2x" in self.event_original.first().event_original
-            ):
-                master_category = self.event_original.first().event_original[:4]
-
-                try:
-                    adjustment = MastersAdjustment.objects.get(
-                        master_category=master_category,
-                        standard_time_ms=round(
-                            int(fastest_men_scull["raw_time__min"]), -3
-                        ),
-                    ).master_time_adjustment_ms
-                except MastersAdjustment.DoesNotExist:
-                    adjustment = 0
-                return adjustment
-            # Mens 2- (sweep)
-            elif (
-                fastest_men_sweep["raw_time__min"] is not None
-                and self.event.gender == "Open"
-                and "2-" in self.event_original.first().event_original
-            ):
-                master_category = self.event_original.first().event_original[:4]
-
-                try:
-                    adjustment = MastersAdjustment.objects.get(
-                        master_category=master_category,
-                        standard_time_ms=round(
-                            int(fastest_men_sweep["raw_time__min"]), -3
-                        ),
-                    ).master_time_adjustment_ms
-                except MastersAdjustment.DoesNotExist:
-                    adjustment = 0
-                return adjustment
-            # Female 2x (scull)
-            elif (
-                fastest_female_scull["raw_time__min"] is not None
-                and self.event.gender == "Female"
-                and "2x" in self.event_original.first().event_original
-            ):
-                master_category = self.event_original.first().event_original[2:6]
-
-                try:
-                    adjustment = MastersAdjustment.objects.get(
-                        master_category=master_category,
-                        standard_time_ms=round(
-                            int(fastest_female_scull["raw_time__min"]), -3
-                        ),
-                    ).master_time_adjustment_ms
-                except MastersAdjustment.DoesNotExist:
-                    adjustment = 0
-                return adjustment
-            # Female 2- (sweep)
-            elif (
-                fastest_female_sweep["raw_time__min"] is not None
-                and self.event.gender == "Female"
-                and "2-" in self.event_original.first().event_original
-            ):
-                master_category = self.event_original.first().event_original[2:6]
-
-                try:
-                    adjustment = MastersAdjustment.objects.get(
-                        master_category=master_category,
-                        standard_time_ms=round(
-                            int(fastest_female_sweep["raw_time__min"]), -3
-                        ),
-                    ).master_time_adjustment_ms
-                except MastersAdjustment.DoesNotExist:
-                    adjustment = 0
-                return adjustment
-            # Mixed 2x (scull)
-            elif (
-                fastest_mixed_scull["raw_time__min"] is not None
-                and self.event.gender == "Mixed"
-                and "2x" in self.event_original.first().event_original
-            ):
-                master_category = self.event_original.first().event_original[3:7]
-
-                try:
-                    adjustment = MastersAdjustment.objects.get(
-                        master_category=master_category,
-                        standard_time_ms=round(
-                            int(fastest_mixed_scull["raw_time__min"]), -3
-                        ),
-                    ).master_time_adjustment_ms
-                except MastersAdjustment.DoesNotExist:
-                    adjustment = 0
-                return adjustment
-
-        else:
-            return 0
+    def calc_draw_start_score(self, event_orders=None):
+        """
+        Pass {event band: event order} to use instead of the cached event
+        orders.
+        """
+        if event_orders is None:
+            from ..lookups import event_orders as cached_event_orders
 
-    # Calculate the draw start score (event order plus rowing / sculling CRI as appropriate)
+            event_orders = cached_event_orders()
 
-    def calc_draw_start_score(self):
         # Check if EventOrder data exists
-        if not EventOrder.objects.exists():
+        if not event_orders:
             print(f"No EventOrder data found for crew {self.id}")
             return None
 
@@ -588,64 +606,69 @@ class Crew(models.Model):
                 row_score = 0.001  # Small default value
 
             # Get the event order base score
-            try:
-                event_order_obj = EventOrder.objects.get(event=self.event_band)
-                draw_start_score = event_order_obj.event_order + row_score
-                print(
-                    f"Crew {self.id}: event_order={event_order_obj.event_order}, row_score={row_score}, total={draw_start_score}"
-                )
-                return draw_start_score
-            except EventOrder.DoesNotExist:
+            event_order = event_orders.get(self.event_band)
+            if event_order is None:
                 print(f"No EventOrder found for event_band: {self.event_band}")
                 return None
+            draw_start_score = event_order + row_score
+            print(
+                f"Crew {self.id}: event_order={event_order}, row_score={row_score}, total={draw_start_score}"
+            )
+            return draw_start_score
 
         except Exception as e:
             print(f"Error calculating draw_start_score for crew {self.id}: {e}")
             return None
 
     @classmethod
-    def update_start_order_calcs(cls):
-        """Update draw_start_score and calculated_start_order for all accepted crews"""
-        crews = cls.objects.filter(status__exact="Accepted")
-
-        print(f"Found {crews.count()} accepted crews to update")
-
-        # Step 1: Calculate draw_start_score for all crews
-        crew_scores = []
-        for crew in crews:
-            draw_score = crew.calc_draw_start_score()
-            crew.draw_start_score = draw_score
-            crew_scores.append((crew, draw_score))
-
-        # Step 2: Sort crews by draw_start_score (lower scores = better start position)
-        crew_scores.sort(
-            key=lambda x: (
-                x[1] is None,
-                x[1] if x[1] is not None else float("inf"),
-                x[0].name,
+    def update_start_order_calcs(cls, progress=None):
+        """
+        Update draw_start_score and calculated_start_order for all accepted crews.
+        progress, if given, is called with (crews processed, total).
+        """
+        from ..draw import calculate_start_orders
+        from ..lookups import load_event_orders
+        from ..versions import CREWS, bump
+
+        crews = list(
+            cls.objects.filter(status__exact="Accepted").only(
+                "id",
+                "name",
+                "status",
+                "event_band",
+                "sculling_CRI",
+                "rowing_CRI",
+                "draw_start_score",
+                "calculated_start_order",
             )
         )
+        # Read directly as this runs in the job worker, which may not share the web cache
+        event_orders = load_event_orders()
 
-        # Step 3: Assign calculated_start_order based on sorted position
-        for position, (crew, score) in enumerate(crew_scores, start=1):
-            if score is None or score == 0:
-                crew.calculated_start_order = 9999999
-            else:
-                crew.calculated_start_order = position
+        print(f"Found {len(crews)} accepted crews to update")
 
-        # Step 4: Save all updates
-        crews_to_update = [crew for crew, _ in crew_scores]
+        calculate_start_orders(crews, event_orders, progress)
         cls.objects.bulk_update(
-            crews_to_update, ["draw_start_score", "calculated_start_order"]
+            crews,
+            ["draw_start_score", "calculated_start_order"],
+            batch_size=BULK_BATCH_SIZE,
         )
+        bump(CREWS, [crew.id for crew in crews])
 
-        print(f"Updated start orders for {len(crews_to_update)} crews")
-        return len(crews_to_update)
+        undrawn = sum(1 for crew in crews if crew.draw_start_score is None)
+        if undrawn:
+            print(
+                f"{undrawn} crews have no draw start score (missing event band, CRI or event order)"
+            )
+        print(f"Updated start orders for {len(crews)} crews")
+        return len(crews)
 
     # Look up the event order number
     @property
     def event_order(self):
-        return EventOrder.objects.get(event=self.event_band).event_order
+        from ..lookups import event_orders
+
+        return event_orders().get(self.event_band)
 
     # Add the masters adjusted time into adjusted time
     @property
@@ -659,28 +682,18 @@ class Crew(models.Model):
     # Look up marshalling division
     @property
     def marshalling_division(self):
-        bib = self.bib_number
-        if bib:
-            return MarshallingDivision.objects.get(
-                bottom_range__lte=bib, top_range__gte=bib
-            ).name
-        elif self.calculated_start_order:
-            return MarshallingDivision.objects.get(
-                bottom_range__lte=self.calculated_start_order,
-                top_range__gte=self.calculated_start_order,
-            ).name
+        from ..lookups import marshalling_division_index
+
+        return marshalling_division_index().division_for(
+            self.bib_number, self.calculated_start_order
+        )
 
     # Look up number location
     @property
     def number_location(self):
-        club_name = self.host_club.name
-        try:
-            number_location = NumberLocation.objects.get(
-                club__exact=club_name
-            ).number_location
-        except NumberLocation.DoesNotExist:
-            number_location = None
-        return number_location
+        from ..lookups import number_locations
+
+        return number_locations().get(self.host_club.name)
 
 
 class RaceTime(models.Model):
@@ -706,6 +719,22 @@ class RaceTime(models.Model):
         null=True,
     )
 
+    class Meta:
+        indexes = [
+            # A race's taps by kind, including the unassigned ones (crew IS NULL)
+            models.Index(
+                fields=["race", "tap", "crew"], name="racetime_race_tap_crew_idx"
+            ),
+        ]
+        constraints = [
+            # One tap of each kind per crew per race, which also indexes (crew, race, tap)
+            models.UniqueConstraint(
+                fields=["crew", "race", "tap"],
+                condition=models.Q(crew__isnull=False),
+                name="unique_assigned_race_tap",
+            ),
+        ]
+
     @property
     def synchronized_time(self):
         """
@@ -725,3 +754,19 @@ class OriginalEventCategory(models.Model):
         null=True,
     )
     event_original = models.CharField(max_length=30)
+
+
+@receiver([post_save, post_delete], sender=Crew)
+def record_crew_change(sender, instance, **kwargs):
+    from ..versions import CREWS, bump
+
+    bump(CREWS, [instance.id])
+
+
+# RaceTime deletes aren't signalled so that clearing a race's taps stays a
+# single query; the code that deletes taps bumps the race times itself
+@receiver(post_save, sender=RaceTime)
+def record_race_time_change(sender, instance, **kwargs):
+    from ..versions import RACE_TIMES, bump
+
+    bump(RACE_TIMES, [instance.crew_id])
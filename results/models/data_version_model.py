@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class DataVersion(models.Model):
+    """The version a data domain is at: the id of its latest DataChange"""
+
+    domain = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.domain} ({self.version})"
+
+
+class DataChange(models.Model):
+    """
+    A change to a data domain, for the change feed (see results/versions.py).
+    crew_ids lists the crews it touched, or is null when it could be any of
+    them, as for imports and whole-table recalculations.
+    """
+
+    domain = models.CharField(max_length=50)
+    crew_ids = models.JSONField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.domain} change {self.id}"
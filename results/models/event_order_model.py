@@ -1,5 +1,14 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 class EventOrder(models.Model):
     event=models.CharField(max_length=40)
-    event_order=models.IntegerField()
\ No newline at end of file
+    event_order=models.IntegerField()
+
+
+@receiver([post_save, post_delete], sender=EventOrder)
+def record_event_order_change(sender, **kwargs):
+    from ..versions import EVENT_ORDERS, bump
+
+    bump(EVENT_ORDERS)
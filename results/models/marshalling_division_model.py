@@ -1,6 +1,15 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 class MarshallingDivision(models.Model):
     name = models.CharField(max_length=50)
     bottom_range=models.IntegerField()
-    top_range=models.IntegerField()
\ No newline at end of file
+    top_range=models.IntegerField()
+
+
+@receiver([post_save, post_delete], sender=MarshallingDivision)
+def record_marshalling_division_change(sender, **kwargs):
+    from ..versions import MARSHALLING_DIVISIONS, bump
+
+    bump(MARSHALLING_DIVISIONS)
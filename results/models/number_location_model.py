@@ -1,5 +1,14 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 class NumberLocation(models.Model):
     club = models.CharField(max_length=50)
-    number_location=models.CharField(max_length=50)
\ No newline at end of file
+    number_location=models.CharField(max_length=50)
+
+
+@receiver([post_save, post_delete], sender=NumberLocation)
+def record_number_location_change(sender, **kwargs):
+    from ..versions import NUMBER_LOCATIONS, bump
+
+    bump(NUMBER_LOCATIONS)
@@ -1,4 +1,6 @@
 from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 class Race(models.Model):
     race_id = models.CharField(max_length=15, default='')
@@ -51,4 +53,12 @@ class RaceTimingSync(models.Model):
         unique_together = ['reference_race', 'target_race']
         
     def __str__(self):
-        return f"Sync: {self.target_race.name} -> {self.reference_race.name} ({self.timing_offset_ms}ms)"
\ No newline at end of file
+        return f"Sync: {self.target_race.name} -> {self.reference_race.name} ({self.timing_offset_ms}ms)"
+
+
+@receiver([post_save, post_delete], sender=Race)
+@receiver([post_save, post_delete], sender=RaceTimingSync)
+def record_race_timing_change(sender, **kwargs):
+    from ..versions import SYNC_OFFSETS, bump
+
+    bump(SYNC_OFFSETS)
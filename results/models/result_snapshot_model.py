@@ -0,0 +1,133 @@
+from django.db import models, transaction
+from django.db.models import Q
+
+from .crew_model import BULK_BATCH_SIZE, Crew
+from ..utils import format_time
+
+
+class ResultSnapshot(models.Model):
+    """
+    One flat row per crew on the public results, with club and event details
+    copied in and times pre-formatted. Rebuilt from Crew whenever results are
+    recalculated, or refreshed for just the crews an edit touched, so results
+    pages are read without joins or per-crew lookups.
+    """
+
+    crew_id = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=50)
+    competitor_names = models.CharField(max_length=60, blank=True, null=True)
+    bib_number = models.IntegerField(blank=True, null=True)
+    composite_code = models.CharField(max_length=10, blank=True, null=True)
+    event_band = models.CharField(max_length=40, null=True, db_index=True)
+    gender = models.CharField(max_length=20, blank=True, null=True, db_index=True)
+    club_name = models.CharField(max_length=50)
+    club_blade_image = models.CharField(max_length=200, blank=True, null=True)
+    overall_rank = models.IntegerField(blank=True, null=True)
+    gender_rank = models.IntegerField(blank=True, null=True)
+    category_rank = models.IntegerField(blank=True, null=True)
+    raw_time = models.IntegerField(blank=True, null=True)
+    published_time = models.IntegerField()
+    published_time_display = models.CharField(max_length=10)
+    masters_adjusted_time = models.IntegerField(default=0)
+    masters_adjusted_time_display = models.CharField(max_length=10, blank=True)
+    penalty = models.IntegerField(default=0)
+    time_only = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["overall_rank"]
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Replace the snapshot with the accepted crews that have a published
+        time and haven't been disqualified or failed to start or finish.
+        Returns the number of rows.
+        """
+        rows = cls._rows(Crew.objects.all())
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+        return len(rows)
+
+    @classmethod
+    def refresh(cls, crew_ids):
+        """
+        Replace just the given crews' rows, dropping those that no longer
+        belong on the results. Returns the number of rows written.
+        """
+        crew_ids = list(set(crew_ids))
+        if not crew_ids:
+            return 0
+        rows = cls._rows(Crew.objects.filter(id__in=crew_ids))
+        with transaction.atomic():
+            cls.objects.filter(crew_id__in=crew_ids).delete()
+            cls.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+        return len(rows)
+
+    @classmethod
+    def _rows(cls, crews):
+        """Unsaved snapshot rows for the crews that belong on the results"""
+        crews = (
+            crews.filter(status__exact="Accepted", published_time__gt=0)
+            .exclude(
+                Q(disqualified=True) | Q(did_not_finish=True) | Q(did_not_start=True)
+            )
+            .values(
+                "id",
+                "name",
+                "competitor_names",
+                "bib_number",
+                "composite_code",
+                "event_band",
+                "event__gender",
+                "club__name",
+                "club__blade_image",
+                "overall_rank",
+                "gender_rank",
+                "category_rank",
+                "raw_time",
+                "race_time",
+                "published_time",
+                "masters_adjustment",
+                "penalty",
+                "time_only",
+            )
+        )
+
+        rows = []
+        for crew in crews:
+            if crew["masters_adjustment"]:
+                masters_adjusted_time = crew["race_time"] - crew["masters_adjustment"]
+            else:
+                masters_adjusted_time = 0
+
+            rows.append(
+                cls(
+                    crew_id=crew["id"],
+                    name=crew["name"],
+                    competitor_names=crew["competitor_names"],
+                    bib_number=crew["bib_number"],
+                    composite_code=crew["composite_code"],
+                    event_band=crew["event_band"],
+                    gender=crew["event__gender"],
+                    club_name=crew["club__name"],
+                    club_blade_image=crew["club__blade_image"],
+                    overall_rank=crew["overall_rank"],
+                    gender_rank=crew["gender_rank"],
+                    category_rank=crew["category_rank"],
+                    raw_time=crew["raw_time"],
+                    published_time=crew["published_time"],
+                    published_time_display=format_time(
+                        crew["published_time"], decimals=1
+                    ),
+                    masters_adjusted_time=masters_adjusted_time,
+                    masters_adjusted_time_display=(
+                        format_time(masters_adjusted_time, decimals=1)
+                        if masters_adjusted_time > 0
+                        else ""
+                    ),
+                    penalty=crew["penalty"],
+                    time_only=crew["time_only"],
+                )
+            )
+        return rows
@@ -0,0 +1,131 @@
+"""
+RaceTimingSync offsets estimated from the taps.
+
+A crew tapped in both the reference race and another timing system gives the
+offset between their clocks directly: reference time - target time, for the
+same kind of tap. Every such pair is taken in one query and one pass, and
+the offset for each target race is the median of its differences once the
+outliers (mistaken assignments, taps on the wrong boat) further than
+OUTLIER_MADS scaled median absolute deviations from the first median are
+dropped. The spread of what is left shows how well the two systems agree.
+
+Estimates are only proposals. Saving one updates the race's RaceTimingSync,
+and the current offset is compared with the estimate so one typed in wrongly
+shows up rather than silently shifting every synchronised time.
+"""
+
+import statistics
+from collections import defaultdict
+
+from .models import Race, RaceTime, RaceTimingSync
+
+TAPS = ("Start", "Finish")
+
+# Pairs needed before an offset is proposed
+MIN_PAIRS = 3
+
+# Differences further than this many (normal-scaled) median absolute
+# deviations from the median are outliers, but never closer than
+# MIN_OUTLIER_MS, as the clocks may agree to the millisecond
+OUTLIER_MADS = 3
+MAD_SCALE = 1.4826
+MIN_OUTLIER_MS = 500
+
+# A current offset further than this from the estimate is flagged
+MISMATCH_MS = 500
+
+
+def robust_offset(differences):
+    """(offset, inliers, spread) of a non-empty list of differences"""
+    median = statistics.median(differences)
+    mad = statistics.median(abs(difference - median) for difference in differences)
+    limit = max(OUTLIER_MADS * MAD_SCALE * mad, MIN_OUTLIER_MS)
+    inliers = [
+        difference for difference in differences if abs(difference - median) <= limit
+    ]
+
+    offset = statistics.median(inliers)
+    spread = MAD_SCALE * statistics.median(
+        abs(difference - offset) for difference in inliers
+    )
+    return round(offset), inliers, round(spread)
+
+
+def estimate_offsets():
+    """
+    A proposal per race other than the reference: the estimated offset, the
+    pairs it came from, how many were rejected as outliers, the spread and
+    largest residual of the rest, and the current offset. Empty without a
+    reference race.
+    """
+    races = list(Race.objects.order_by("name"))
+    reference = next((race for race in races if race.is_timing_reference), None)
+    if reference is None:
+        return []
+    current = dict(
+        RaceTimingSync.objects.filter(reference_race=reference)
+        .order_by("-id")
+        .values_list("target_race_id", "timing_offset_ms")
+    )
+
+    # {(crew id, tap): reference time} and {race id: [(crew id, tap, time)]}
+    reference_taps = {}
+    target_taps = defaultdict(list)
+    for crew_id, race_id, tap, time_tap in (
+        RaceTime.objects.filter(crew__isnull=False, race__isnull=False, tap__in=TAPS)
+        .order_by("id")
+        .values_list("crew_id", "race_id", "tap", "time_tap")
+    ):
+        if race_id == reference.id:
+            reference_taps.setdefault((crew_id, tap), time_tap)
+        else:
+            target_taps[race_id].append((crew_id, tap, time_tap))
+
+    proposals = []
+    for race in races:
+        if race.id == reference.id:
+            continue
+        differences = [
+            reference_taps[(crew_id, tap)] - time_tap
+            for crew_id, tap, time_tap in target_taps[race.id]
+            if (crew_id, tap) in reference_taps
+        ]
+
+        proposal = {
+            "reference_race_id": reference.id,
+            "reference_race": reference.name,
+            "target_race_id": race.id,
+            "target_race": race.name,
+            "pairs": len(differences),
+            "outliers": 0,
+            "offset_ms": None,
+            "spread_ms": None,
+            "max_residual_ms": None,
+            "current_offset_ms": current.get(race.id),
+            "current_offset_mismatch": False,
+        }
+        if len(differences) >= MIN_PAIRS:
+            offset, inliers, spread = robust_offset(differences)
+            proposal.update(
+                outliers=len(differences) - len(inliers),
+                offset_ms=offset,
+                spread_ms=spread,
+                max_residual_ms=max(abs(difference - offset) for difference in inliers),
+            )
+            if proposal["current_offset_ms"] is not None:
+                proposal["current_offset_mismatch"] = (
+                    abs(proposal["current_offset_ms"] - offset) > MISMATCH_MS
+                )
+        proposals.append(proposal)
+    return proposals
+
+
+def save_offset(target_race, offset_ms):
+    """Set the target race's offset to the reference race, returning the sync"""
+    reference = Race.objects.get(is_timing_reference=True)
+    sync, _created = RaceTimingSync.objects.update_or_create(
+        reference_race=reference,
+        target_race=target_race,
+        defaults={"timing_offset_ms": offset_ms},
+    )
+    return sync
@@ -1,7 +1,16 @@
+import hashlib
+
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Min, Count, Q
 from django.core.cache import cache
 
+from .models import RaceTime
+from .versions import CREWS, RACE_TIMES, data_versions, timing_data_version
+
+# Aggregates are kept until the crews or race times change; this only bounds
+# how long those for filters nobody asks for again stay in the cache
+AGGREGATES_TIMEOUT = 60 * 60
+
 
 class CrewPaginationWithAggregates(PageNumberPagination):
     page_size = 25
@@ -14,12 +23,16 @@ class CrewPaginationWithAggregates(PageNumberPagination):
         return super().paginate_queryset(queryset, request, view)
 
     def get_aggregates(self, queryset):
-        """Calculate aggregates efficiently using a single query where possible"""
-        # Use cache key based on queryset hash to avoid recalculating
-        cache_key = f"crew_aggregates_{hash(str(queryset.query))}"
+        """
+        Calculate aggregates efficiently using a single query where possible,
+        cached for the query against the current crews and race times versions
+        """
+        versions = data_versions()
+        query_hash = hashlib.sha1(str(queryset.query).encode()).hexdigest()
+        cache_key = f"crew_aggregates:{versions.get(CREWS, 0)}:{versions.get(RACE_TIMES, 0)}:{query_hash}"
         cached_result = cache.get(cache_key)
-        
-        if cached_result:
+
+        if cached_result is not None:
             return cached_result
 
         # Single query for status counts
@@ -47,8 +60,7 @@ class CrewPaginationWithAggregates(PageNumberPagination):
         # Combine results
         result = {**status_counts, **fastest_times}
         
-        # Cache for 30 seconds
-        cache.set(cache_key, result, 30)
+        cache.set(cache_key, result, AGGREGATES_TIMEOUT)
         return result
 
     def get_paginated_response(self, data):
@@ -75,18 +87,97 @@ class CrewPaginationWithAggregates(PageNumberPagination):
         return paginated_response
 
 
+def race_time_summary():
+    """
+    Per race: total, assigned and unassigned taps by tap type, taps on
+    scratched crews and any sequence numbers used more than once. Worked
+    out with two grouped queries and cached until the timing data changes.
+    """
+    cache_key = 'race_time_summary:' + ':'.join(str(version) for version in timing_data_version())
+    summary = cache.get(cache_key)
+    if summary is not None:
+        return summary
+
+    races = {}
+
+    def race_summary(race_id):
+        return races.setdefault(race_id, {'race_id': race_id, 'taps': {}, 'scratched_crew_taps': 0, 'duplicate_sequences': []})
+
+    counts = RaceTime.objects.order_by().values('race_id', 'tap').annotate(
+        total=Count('id'),
+        assigned=Count('crew'),
+        scratched=Count('id', filter=Q(crew__status='Scratched')),
+    )
+    for row in counts:
+        race = race_summary(row['race_id'])
+        race['taps'][row['tap']] = {
+            'total': row['total'],
+            'assigned': row['assigned'],
+            'unassigned': row['total'] - row['assigned'],
+        }
+        race['scratched_crew_taps'] += row['scratched']
+
+    duplicates = RaceTime.objects.order_by().values('race_id', 'sequence').annotate(taps=Count('id')).filter(taps__gt=1)
+    for row in duplicates.order_by('race_id', 'sequence'):
+        race_summary(row['race_id'])['duplicate_sequences'].append(row['sequence'])
+
+    summary = sorted(races.values(), key=lambda race: (race['race_id'] is None, race['race_id'] or 0))
+    cache.set(cache_key, summary, AGGREGATES_TIMEOUT)
+    return summary
+
+
 class RaceTimePaginationWithAggregates(PageNumberPagination):
+    """Race time pages, with the tap summary of the races listed and the unassigned taps matching the filters"""
     page_size = 25  # Default page size
     page_size_query_param = 'page_size'  # Allow client to override page size
     max_page_size = 500  # Maximum allowed page size
 
+    # Query parameters the unassigned counts can be read from the cached
+    # summary with; any other filter (tap, search) counts the filtered taps
+    summary_params = {'race_id', 'unassigned_only', 'page', 'page_size', 'ordering'}
+
     def paginate_queryset(self, queryset, request, view=None):
-        self.start_times_no_crew = len(queryset.filter(tap__exact='Start', crew__isnull=True))
-        self.finish_times_no_crew = len(queryset.filter(tap__exact='Finish', crew__isnull=True))
+        summary = race_time_summary()
+        race_id = request.query_params.get('race_id')
+        if race_id is not None:
+            summary = [race for race in summary if str(race['race_id']) == race_id]
+        self.summary = summary
+        if set(request.query_params) <= self.summary_params:
+            self.start_times_no_crew = sum(race['taps'].get('Start', {}).get('unassigned', 0) for race in summary)
+            self.finish_times_no_crew = sum(race['taps'].get('Finish', {}).get('unassigned', 0) for race in summary)
+        else:
+            counts = queryset.order_by().aggregate(
+                start_times_no_crew=Count('id', filter=Q(tap__exact='Start', crew__isnull=True)),
+                finish_times_no_crew=Count('id', filter=Q(tap__exact='Finish', crew__isnull=True)),
+            )
+            self.start_times_no_crew = counts['start_times_no_crew']
+            self.finish_times_no_crew = counts['finish_times_no_crew']
         return super(RaceTimePaginationWithAggregates, self).paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
         paginated_response = super(RaceTimePaginationWithAggregates, self).get_paginated_response(data)
         paginated_response.data['start_times_no_crew'] = self.start_times_no_crew
         paginated_response.data['finish_times_no_crew'] = self.finish_times_no_crew
-        return paginated_response
\ No newline at end of file
+        paginated_response.data['summary'] = self.summary
+        return paginated_response
+
+class ResultPaginationWithFastestTimes(PageNumberPagination):
+    """Results snapshot pages, with the fastest times the trophies are awarded against"""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fastest_times = queryset.order_by().aggregate(
+            fastest_open_2x_time=Min('raw_time', filter=Q(event_band__startswith='Op', event_band__contains='2x', raw_time__gt=0)),
+            fastest_female_2x_time=Min('raw_time', filter=Q(event_band__startswith='W', event_band__contains='2x', raw_time__gt=0)),
+            fastest_open_sweep_time=Min('raw_time', filter=Q(event_band__startswith='Op', event_band__contains='2-', raw_time__gt=0)),
+            fastest_female_sweep_time=Min('raw_time', filter=Q(event_band__startswith='W', event_band__contains='2-', raw_time__gt=0)),
+            fastest_mixed_2x_time=Min('raw_time', filter=Q(event_band__startswith='Mx', event_band__contains='2x', raw_time__gt=0)),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        paginated_response = super().get_paginated_response(data)
+        paginated_response.data.update(self.fastest_times)
+        return paginated_response
@@ -0,0 +1,148 @@
+"""
+Bulk import of race time taps.
+
+Taps from a Webscorer CSV export or the Webscorer FastTaps API are parsed in
+one pass, with crew ids checked against the crew ids loaded once up front, and
+inserted with bulk_create in a single transaction (replacing the race's
+existing times). Rows that can't be imported are counted and reported back
+rather than stopping the import. A crew can only have one tap of each kind
+per race, so repeat taps for a crew are imported unassigned.
+"""
+
+import re
+
+from django.db import transaction
+
+from .models import Crew, RaceTime
+from .models.crew_model import BULK_BATCH_SIZE
+from .utils import parse_time_to_milliseconds
+from .versions import RACE_TIMES, bump
+
+TAP_MAX_LENGTH = RaceTime._meta.get_field("tap").max_length
+
+# Only the first few row errors are sent back
+MAX_ERRORS = 20
+
+
+def _parse_sequence(value):
+    """Whole numbers only, accepting '12' or '12.0' as Webscorer sends either"""
+    value = str(value).strip()
+    if not re.fullmatch(r"-?\d+(\.0*)?", value):
+        raise ValueError(f"Invalid sequence: {value}")
+    return int(float(value))
+
+
+def _parse_crew_id(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return int(str(value).strip())
+
+
+class TapImport:
+    """Validates taps for one race and collects them for a bulk insert"""
+
+    def __init__(self, race_id, replace=True):
+        self.race_id = race_id
+        self.replace = replace
+        self.crew_ids = set(Crew.objects.values_list("id", flat=True))
+        # (crew, tap) pairs already used in this race
+        self.assigned = set()
+        if not replace:
+            self.assigned.update(
+                RaceTime.objects.filter(race_id=race_id, crew__isnull=False)
+                .values_list("crew_id", "tap")
+            )
+        self.race_times = []
+        self.rejected = 0
+        self.duplicates = 0
+        self.unknown_crews = set()
+        self.errors = []
+
+    def reject(self, row_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Row {row_number}: {message}")
+
+    def add(self, row_number, sequence, tap, time_tap, crew):
+        try:
+            sequence = _parse_sequence(sequence)
+            time_tap = parse_time_to_milliseconds(time_tap)
+            crew_id = _parse_crew_id(crew)
+        except ValueError as e:
+            self.reject(row_number, str(e))
+            return
+
+        if not tap or len(tap) > TAP_MAX_LENGTH:
+            self.reject(row_number, f"Invalid tap: {tap}")
+            return
+
+        if crew_id is not None and crew_id not in self.crew_ids:
+            self.unknown_crews.add(crew_id)
+            self.reject(row_number, f"Unknown crew: {crew_id}")
+            return
+
+        if crew_id is not None:
+            if (crew_id, tap) in self.assigned:
+                self.duplicates += 1
+                if len(self.errors) < MAX_ERRORS:
+                    self.errors.append(
+                        f"Row {row_number}: Crew {crew_id} already has a {tap} tap, imported unassigned"
+                    )
+                crew_id = None
+            else:
+                self.assigned.add((crew_id, tap))
+
+        self.race_times.append(
+            RaceTime(
+                sequence=sequence,
+                tap=tap,
+                time_tap=time_tap,
+                crew_id=crew_id,
+                race_id=self.race_id,
+            )
+        )
+
+    def save(self):
+        """Insert the taps, first deleting the race's existing times if replace"""
+        with transaction.atomic():
+            if self.replace:
+                RaceTime.objects.filter(race_id=self.race_id).delete()
+            RaceTime.objects.bulk_create(self.race_times, batch_size=BULK_BATCH_SIZE)
+            bump(RACE_TIMES)
+
+        return {
+            "inserted": len(self.race_times),
+            "rejected": self.rejected,
+            "unknown_crews": sorted(self.unknown_crews),
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+        }
+
+
+def import_csv_taps(reader, race_id, replace=True):
+    """
+    Import taps from the rows of a Webscorer CSV export (after the header):
+    sequence, tap and time tap in columns 1, 4 and 5, crew id in column 9.
+    """
+    taps = TapImport(race_id, replace)
+    for row_number, row in enumerate(reader, start=2):
+        if not row:
+            continue
+        if len(row) < 9:
+            taps.reject(row_number, "Missing columns")
+            continue
+        taps.add(row_number, row[0], row[3] or "Finish", row[4], row[8])
+    return taps.save()
+
+
+def import_fast_taps(fast_taps, race_id, replace=True):
+    """Import taps from the Webscorer FastTaps API"""
+    taps = TapImport(race_id, replace)
+    for row_number, tap in enumerate(fast_taps, start=1):
+        try:
+            values = (tap["Seq #"], tap["Tap"], tap["Time tap"], tap["Team name 2"])
+        except KeyError as e:
+            taps.reject(row_number, f"Missing {e}")
+            continue
+        taps.add(row_number, *values)
+    return taps.save()
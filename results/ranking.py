@@ -0,0 +1,135 @@
+"""
+Set-based crew ranking.
+
+Ranks are worked out in memory from a single load of the crews instead of one
+filtered query per crew. A crew's rank is one more than the number of accepted
+crews with a strictly faster (non-zero) time, so tied crews share a rank and
+the next crew skips the tied places - the same rules as the original per-crew
+calc_overall_rank / calc_gender_rank / calc_category_rank methods.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+
+RANK_FIELDS = ["overall_rank", "gender_rank", "category_rank"]
+
+
+def _time(value):
+    """Treat missing times as zero, matching the published_time__gt=0 filters"""
+    return value or 0
+
+
+def _position_time(crew):
+    if crew.category_position_time is None:
+        return _time(crew.published_time)
+    return crew.category_position_time
+
+
+def _gender(crew):
+    return crew.event.gender if crew.event_id else None
+
+
+def _faster_than(sorted_times, time):
+    """Number of times in the sorted list strictly lower than time"""
+    return bisect_left(sorted_times, time)
+
+
+def build_rank_tables(crews):
+    """
+    Sorted lists of the times each ranking is compared against, built from the
+    accepted crews with a published time.
+    """
+    overall = []
+    by_gender = defaultdict(list)
+    by_event_band = defaultdict(list)
+
+    for crew in crews:
+        if crew.status != "Accepted" or _time(crew.published_time) <= 0:
+            continue
+        overall.append(crew.published_time)
+        by_gender[_gender(crew)].append(crew.published_time)
+        by_event_band[crew.event_band].append(_position_time(crew))
+
+    overall.sort()
+    for times in by_gender.values():
+        times.sort()
+    for times in by_event_band.values():
+        times.sort()
+
+    return overall, by_gender, by_event_band
+
+
+def rank_crew(crew, tables):
+    """Return (overall_rank, gender_rank, category_rank) for one crew"""
+    overall, by_gender, by_event_band = tables
+    published_time = _time(crew.published_time)
+
+    if published_time > 0:
+        overall_rank = _faster_than(overall, published_time) + 1
+    else:
+        overall_rank = 0
+
+    # Gender rank has never been zeroed for crews without a time
+    gender_rank = _faster_than(by_gender.get(_gender(crew), []), published_time) + 1
+
+    if crew.time_only or published_time <= 0:
+        category_rank = 0
+    else:
+        category_rank = (
+            _faster_than(by_event_band.get(crew.event_band, []), _position_time(crew))
+            + 1
+        )
+
+    return overall_rank, gender_rank, category_rank
+
+
+def _group_keys(crew):
+    """Keys of the groups behind overall_rank, gender_rank and category_rank"""
+    return (
+        ("overall", None),
+        ("gender", _gender(crew)),
+        ("event_band", crew.event_band),
+    )
+
+
+def rank_groups(crew):
+    """The overall, gender and event band groups a crew is ranked within"""
+    return set(_group_keys(crew))
+
+
+def rank_inputs(crew):
+    """Everything about a crew that can move its own or another crew's rank"""
+    return (
+        crew.status,
+        _gender(crew),
+        crew.event_band,
+        crew.time_only,
+        _time(crew.published_time),
+        _position_time(crew),
+    )
+
+
+def calculate_rankings(crews, rank_against=None, groups=None):
+    """
+    Set overall_rank, gender_rank and category_rank on each crew in crews.
+    Crews are ranked against rank_against (defaults to crews itself), which
+    must hold every crew whose time can affect the ranks. If groups is given
+    (a set of rank_groups keys) only the ranks for those groups are
+    re-derived. Returns the crews whose ranks changed.
+    """
+    tables = build_rank_tables(crews if rank_against is None else rank_against)
+
+    changed = []
+    for crew in crews:
+        current = (crew.overall_rank, crew.gender_rank, crew.category_rank)
+        ranks = rank_crew(crew, tables)
+        if groups is not None:
+            ranks = tuple(
+                rank if key in groups else current_rank
+                for rank, current_rank, key in zip(ranks, current, _group_keys(crew))
+            )
+        if ranks != current:
+            crew.overall_rank, crew.gender_rank, crew.category_rank = ranks
+            changed.append(crew)
+
+    return changed
@@ -0,0 +1,267 @@
+"""
+Raw time comparison across timing systems.
+
+Each race with both start and finish taps is a timing system. For every crew
+with taps in them, the raw time (finish - start) from each system is compared:
+how far apart they are gives a confidence level, and the crew's overall and
+category positions in each system show whether the systems agree on the
+order.
+
+The taps and crews are read with values_list / values in three queries and
+worked out in one pass, with a single sort per race and event band for the
+positions. The comparison is held in this process until the timing data
+version changes, so paging, filtering and sorting in RawTimeComparisonView
+reuse it rather than recalculating it on every request.
+"""
+
+from collections import defaultdict
+
+from .models import Crew, Race, RaceTime
+from .versions import timing_data_version
+
+# Confidence from the spread of a crew's raw times (in ms / 10): level, score
+# and the largest spread for it, narrowest first
+CONFIDENCE_LEVELS = [("high", 3, 100), ("medium", 2, 500)]
+LOW_CONFIDENCE = ("low", 1)
+
+# The comparison held in this process, as (timing data version, comparison)
+_held = None
+
+
+def position_time(raw_time, masters_adjusted_time, penalty):
+    """The time crews are placed on, as Crew.calc_category_position_time"""
+    if masters_adjusted_time is not None and masters_adjusted_time > 0:
+        return masters_adjusted_time + penalty * 1000
+    return raw_time
+
+
+def confidence(raw_times):
+    if len(raw_times) >= 2:
+        max_time = max(raw_times)
+        min_time = min(raw_times)
+        time_spread = (max_time - min_time) / 10
+        level, score = LOW_CONFIDENCE
+        for band_level, band_score, largest_spread in CONFIDENCE_LEVELS:
+            if time_spread <= largest_spread:
+                level, score = band_level, band_score
+                break
+        return {
+            "level": level,
+            "score": score,
+            "time_spread": time_spread,
+            "max_time": max_time,
+            "min_time": min_time,
+            "avg_time": sum(raw_times) / len(raw_times),
+        }
+    if len(raw_times) == 1:
+        return {
+            "level": "single",
+            "score": 0,
+            "time_spread": 0,
+            "avg_time": raw_times[0],
+        }
+    return {"level": "none", "score": 0}
+
+
+def crew_info(crew):
+    if crew["masters_adjustment"]:
+        masters_adjusted_time = crew["race_time"] - crew["masters_adjustment"]
+    else:
+        masters_adjusted_time = 0
+
+    return {
+        "id": crew["id"],
+        "bib_number": crew["bib_number"],
+        "name": crew["name"],
+        "competitor_names": crew["competitor_names"],
+        "club": crew["club__name"],
+        "event_band": crew["event_band"],
+        "status": crew["status"],
+        "time_only": crew["time_only"],
+        "penalty": crew["penalty"],
+        "masters_adjusted_time": masters_adjusted_time,
+    }
+
+
+class RawTimeComparison:
+    """
+    races: {race id: name, race_id and is_reference} for the timing systems,
+    by name. rows: a row per crew with taps in them, by bib number.
+    """
+
+    def __init__(self, races, rows):
+        self.races = races
+        self.rows = rows
+
+    @classmethod
+    def load(cls):
+        """The comparison from the database, or None without timing systems"""
+        races = {
+            race["id"]: {
+                "name": race["name"],
+                "race_id": race["race_id"],
+                "is_reference": race["is_timing_reference"],
+            }
+            for race in Race.objects.filter(race_times__tap="Start")
+            .filter(race_times__tap="Finish")
+            .distinct()
+            .order_by("name")
+            .values("id", "name", "race_id", "is_timing_reference")
+        }
+        if not races:
+            return None
+
+        # {crew id: {race id: {"start": (id, time tap), "finish": ...}}}
+        taps = defaultdict(dict)
+        for race_time_id, crew_id, race_id, tap, time_tap in (
+            RaceTime.objects.filter(race_id__in=races, crew__isnull=False)
+            .order_by("id")
+            .values_list("id", "crew_id", "race_id", "tap", "time_tap")
+        ):
+            tap = tap.lower()
+            if tap in ("start", "finish"):
+                crew_taps = taps[crew_id].setdefault(
+                    race_id, {"start": None, "finish": None}
+                )
+                crew_taps[tap] = (race_time_id, time_tap)
+
+        crews = (
+            Crew.objects.filter(
+                id__in=RaceTime.objects.filter(
+                    race_id__in=races, crew__isnull=False
+                ).values("crew_id")
+            )
+            .order_by("bib_number", "id")
+            .values(
+                "id",
+                "bib_number",
+                "name",
+                "competitor_names",
+                "club__name",
+                "event_band",
+                "status",
+                "time_only",
+                "penalty",
+                "masters_adjustment",
+                "race_time",
+            )
+        )
+        rows = [
+            cls.build_row(crew_info(crew), taps[crew["id"]], races)
+            for crew in crews
+            if crew["id"] in taps
+        ]
+
+        comparison = cls(races, rows)
+        comparison.calculate_positions()
+        comparison.check_position_matches()
+        return comparison
+
+    @staticmethod
+    def build_row(crew, crew_taps, races):
+        row = {
+            "crew": crew,
+            "raw_times": {},
+            "race_time_details": {},
+            "missing_races": [],
+            "incomplete_races": [],
+            "positions_match": None,
+        }
+
+        raw_times = []
+        for race_id in races:
+            if race_id not in crew_taps:
+                row["missing_races"].append(race_id)
+                continue
+
+            start = crew_taps[race_id]["start"]
+            finish = crew_taps[race_id]["finish"]
+            if start and finish:
+                raw_time = finish[1] - start[1]
+                row["raw_times"][race_id] = raw_time
+                row["race_time_details"][race_id] = {
+                    "start_id": start[0],
+                    "finish_id": finish[0],
+                    "start_time": start[1],
+                    "finish_time": finish[1],
+                    "raw_time": raw_time,
+                    "position_time": position_time(
+                        raw_time, crew["masters_adjusted_time"], crew["penalty"]
+                    ),
+                }
+                raw_times.append(raw_time)
+            else:
+                row["incomplete_races"].append(race_id)
+                row["race_time_details"][race_id] = {
+                    "start_id": start[0] if start else None,
+                    "finish_id": finish[0] if finish else None,
+                    "start_time": start[1] if start else None,
+                    "finish_time": finish[1] if finish else None,
+                    "raw_time": None,
+                    "position_time": None,
+                    "incomplete": True,
+                }
+
+        row["confidence"] = confidence(raw_times)
+        return row
+
+    def calculate_positions(self):
+        """
+        Overall (by raw time) and category (by position time, within the
+        event band) positions of the accepted, ranked crews in each system
+        """
+        for race_id in self.races:
+            placed = []
+            for row in self.rows:
+                details = row["race_time_details"].get(race_id)
+                if (
+                    details is None
+                    or details.get("incomplete")
+                    or row["crew"]["time_only"]
+                    or details["raw_time"] <= 0
+                    or row["crew"]["status"] != "Accepted"
+                ):
+                    continue
+                details["positions"] = {}
+                placed.append((row, details))
+
+            by_event_band = defaultdict(list)
+            for row, details in placed:
+                by_event_band[row["crew"]["event_band"]].append(details)
+            for event_band_details in by_event_band.values():
+                event_band_details.sort(key=lambda details: details["position_time"])
+                for position, details in enumerate(event_band_details, start=1):
+                    details["positions"]["category"] = position
+
+            placed.sort(key=lambda placing: placing[1]["raw_time"])
+            for position, (_row, details) in enumerate(placed, start=1):
+                details["positions"]["overall"] = position
+
+    def check_position_matches(self):
+        """
+        positions_match: whether a crew has the same category position in
+        every system it was placed in, or None if placed in fewer than two
+        """
+        for row in self.rows:
+            positions = [
+                details["positions"]["category"]
+                for details in row["race_time_details"].values()
+                if "positions" in details
+            ]
+            if len(positions) < 2:
+                row["positions_match"] = None
+            else:
+                row["positions_match"] = len(set(positions)) == 1
+
+
+def raw_time_comparison():
+    """
+    The comparison for the current timing data, held until it changes. None
+    if there are no timing systems. Rows are shared, so not to be modified.
+    """
+    global _held
+
+    version = timing_data_version()
+    if _held is None or _held[0] != version:
+        _held = (version, RawTimeComparison.load())
+    return _held[1]
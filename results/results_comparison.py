@@ -0,0 +1,156 @@
+"""
+Results for a start and finish race pair, for comparing timing systems.
+
+Each crew with a start tap in the start race and a finish tap in the finish
+race (and that didn't fail to start or finish, or get disqualified) is timed
+between them, with the sync offsets applied, its penalty and manual override
+added and its masters adjustment from the stored results. The crews, taps
+and offsets are loaded in bulk and the masters adjustments worked out with
+one MastersHandicap.
+
+The results for a pair are held in this process, for the most recently used
+pairs, until the timing data version changes, so switching between
+comparisons or paging through categories doesn't recalculate them.
+"""
+
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.db.models import Q
+
+from .masters import MastersHandicap
+from .models import Crew, RaceTime, RaceTimingSync
+from .versions import timing_data_version
+
+# Race pairs held in this process
+MAX_HELD_PAIRS = 16
+
+# {(start race id, finish race id): (timing data version, results)}, least
+# recently used first
+_held = OrderedDict()
+_held_lock = threading.Lock()
+
+
+def format_time(time_ms):
+    """MM:SS.HH"""
+    if not time_ms or time_ms <= 0:
+        return "00:00.00"
+
+    total_seconds = time_ms / 1000
+    minutes = int(total_seconds // 60)
+    seconds = int(total_seconds % 60)
+    hundredths = int((time_ms % 1000) / 10)
+
+    return f"{minutes:02d}:{seconds:02d}.{hundredths:02d}"
+
+
+def sync_offsets(races):
+    """{race id: offset to the reference} for races that aren't the reference"""
+    offsets = {}
+    for target_race_id, offset in (
+        RaceTimingSync.objects.filter(
+            target_race__in=[race for race in races if not race.is_timing_reference]
+        )
+        .order_by("id")
+        .values_list("target_race_id", "timing_offset_ms")
+    ):
+        offsets.setdefault(target_race_id, offset)
+    return offsets
+
+
+class RacePairResults:
+    """{event band: crew results sorted by published time} for a race pair"""
+
+    def __init__(self, by_event_band):
+        self.by_event_band = by_event_band
+
+    @classmethod
+    def load(cls, start_race, finish_race):
+        offsets = sync_offsets([start_race, finish_race])
+
+        # {crew id: synchronised time} of the start and finish taps
+        starts, finishes = {}, {}
+        for crew_id, race_id, tap, time_tap in (
+            RaceTime.objects.filter(crew__isnull=False)
+            .filter(
+                Q(race=start_race, tap="Start") | Q(race=finish_race, tap="Finish")
+            )
+            .order_by("id")
+            .values_list("crew_id", "race_id", "tap", "time_tap")
+        ):
+            if tap == "Start" and race_id == start_race.id:
+                starts.setdefault(crew_id, time_tap + offsets.get(race_id, 0))
+            if tap == "Finish" and race_id == finish_race.id:
+                finishes.setdefault(crew_id, time_tap + offsets.get(race_id, 0))
+
+        crews = (
+            Crew.objects.filter(times__tap="Start", times__race=start_race)
+            .filter(times__tap="Finish", times__race=finish_race)
+            .exclude(
+                Q(did_not_start=True) | Q(did_not_finish=True) | Q(disqualified=True)
+            )
+            .distinct()
+            .select_related("club", "event", "band")
+        )
+        handicap = MastersHandicap()
+
+        by_event_band = defaultdict(list)
+        for crew in crews:
+            raw_time = finishes[crew.id] - starts[crew.id]
+            if raw_time <= 0:
+                continue
+
+            race_time = raw_time + crew.penalty * 1000
+            race_time += crew.manual_override_minutes * 60 * 1000
+            race_time += crew.manual_override_seconds * 1000
+            race_time += crew.manual_override_hundredths_seconds * 10
+
+            published_time = race_time + handicap.adjustment(crew)
+
+            by_event_band[crew.calc_event_band()].append(
+                {
+                    "crew_id": crew.id,
+                    "crew_name": crew.competitor_names or crew.name,
+                    "club_name": crew.club.name if crew.club else "",
+                    "bib_number": crew.bib_number,
+                    "raw_time": raw_time,
+                    "race_time": race_time,
+                    "published_time": published_time,
+                    "formatted_time": format_time(published_time),
+                    "penalty": crew.penalty,
+                }
+            )
+
+        for results in by_event_band.values():
+            results.sort(key=lambda result: result["published_time"])
+        return cls(dict(by_event_band))
+
+    def summary(self, event_band):
+        """The winner and runner up in an event band, and the number of crews"""
+        results = self.by_event_band.get(event_band, [])
+        return {
+            "winner": results[0] if len(results) > 0 else None,
+            "runner_up": results[1] if len(results) > 1 else None,
+            "total_crews": len(results),
+        }
+
+
+def race_pair_results(start_race, finish_race):
+    """
+    The RacePairResults for the current timing data, held until it changes.
+    Results are shared, so not to be modified.
+    """
+    key = (start_race.id, finish_race.id)
+    version = timing_data_version()
+
+    with _held_lock:
+        held = _held.get(key)
+    if held is None or held[0] != version:
+        held = (version, RacePairResults.load(start_race, finish_race))
+
+    with _held_lock:
+        _held[key] = held
+        _held.move_to_end(key)
+        while len(_held) > MAX_HELD_PAIRS:
+            _held.popitem(last=False)
+    return held[1]
@@ -38,6 +38,7 @@ from .crew_serializers import (
     PopulatedCrewSerializer,
     CrewExportSerializer,
     WriteCrewSerializer,
+    BulkImportCrewSerializer,
 )
 
 from .import_serializers import (
@@ -54,4 +55,11 @@ from .marshalling_division_serializers import (
 from .settings_serializers import (
     GlobalSettingsSerializer,
     EventMeetingKeySerializer,
-)
\ No newline at end of file
+)
+from .job_serializers import (
+    JobSerializer,
+)
+
+from .result_serializers import (
+    ResultSnapshotSerializer,
+)
@@ -2,8 +2,9 @@
 Crew-related serializers.
 """
 
+from django.db.models import Prefetch
 from rest_framework import serializers
-from ..models import Crew, Club, Band
+from ..models import Crew, Club, Band, RaceTime
 from .club_serializers import ClubSerializer
 from .event_serializers import EventSerializer, BandSerializer, ImportOriginalEventSerializer
 from .competitor_serializers import CompetitorSerializer
@@ -31,6 +32,9 @@ class PopulatedCrewSerializer(serializers.ModelSerializer):
     competitors = serializers.SerializerMethodField()
     times = serializers.SerializerMethodField()
     event_original = serializers.SerializerMethodField()
+    event_order = serializers.SerializerMethodField()
+    marshalling_division = serializers.SerializerMethodField()
+    number_location = serializers.SerializerMethodField()
 
     class Meta:
         model = Crew
@@ -98,6 +102,29 @@ class PopulatedCrewSerializer(serializers.ModelSerializer):
         from .event_serializers import ImportOriginalEventSerializer
         return ImportOriginalEventSerializer(obj.event_original.all(), many=True).data
 
+    # Pass a CrewLookups as context['lookups'] when serializing many crews so
+    # the reference data is loaded once rather than queried per crew
+    def get_event_order(self, obj):
+        lookups = self.context.get('lookups')
+        return lookups.event_order(obj) if lookups else obj.event_order
+
+    def get_marshalling_division(self, obj):
+        lookups = self.context.get('lookups')
+        return lookups.marshalling_division(obj) if lookups else obj.marshalling_division
+
+    def get_number_location(self, obj):
+        lookups = self.context.get('lookups')
+        return lookups.number_location(obj) if lookups else obj.number_location
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads in a fixed number of queries"""
+        return queryset.select_related('club', 'event', 'band', 'host_club').prefetch_related(
+            'competitors',
+            'event_original',
+            Prefetch('times', queryset=RaceTime.objects.select_related('race')),
+        )
+
 
 class CrewExportSerializer(serializers.ModelSerializer):
     raw_time = serializers.CharField(max_length=15)
@@ -148,6 +175,38 @@ class WriteCrewSerializer(serializers.ModelSerializer):
         return new_crew
 
 
+class BulkImportCrewSerializer(serializers.ModelSerializer):
+    """
+    Validates a BROE crew without any queries - clubs, events and bands are
+    checked against the id sets passed in the context. Used with many=True
+    to validate a whole import before anything is saved.
+    """
+
+    id = serializers.IntegerField()
+    club = serializers.IntegerField()
+    event = serializers.IntegerField()
+    band = serializers.IntegerField(allow_null=True, required=False)
+    host_club = serializers.IntegerField(allow_null=True, required=False)
+
+    class Meta:
+        model = Crew
+        fields = ('id', 'name', 'composite_code', 'club', 'rowing_CRI', 'sculling_CRI', 'event', 'status', 'band', 'bib_number', 'host_club', 'otd_contact', 'otd_home_phone', 'otd_mobile_phone', 'otd_work_phone', 'time_only', )
+
+    def check_exists(self, value, ids):
+        if value is not None and value not in self.context[ids]:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate_club(self, value):
+        return self.check_exists(value, 'club_ids')
+
+    def validate_event(self, value):
+        return self.check_exists(value, 'event_ids')
+
+    def validate_band(self, value):
+        return self.check_exists(value, 'band_ids')
+
+
 class CrewSerializerLimited(serializers.ModelSerializer):
     # Use SerializerMethodField to avoid circular import
     times = serializers.SerializerMethodField()
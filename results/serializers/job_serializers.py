@@ -0,0 +1,14 @@
+"""
+Background job serializers.
+"""
+
+from rest_framework import serializers
+from results.models.job_model import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    duration = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'processed', 'total', 'result', 'error', 'created', 'started', 'finished', 'duration',)
@@ -19,6 +19,21 @@ class RaceTimesSerializer(serializers.ModelSerializer):
         model = RaceTime
         fields = '__all__'
 
+    def validate(self, data):
+        # A crew can only have one tap of each kind per race (unique_assigned_race_tap)
+        crew = data.get('crew', getattr(self.instance, 'crew', None))
+        race = data.get('race', getattr(self.instance, 'race', None))
+        tap = data.get('tap', getattr(self.instance, 'tap', None))
+        if crew is not None and race is not None:
+            conflicts = RaceTime.objects.filter(crew=crew, race=race, tap=tap)
+            if self.instance is not None:
+                conflicts = conflicts.exclude(pk=self.instance.pk)
+            if conflicts.exists():
+                raise serializers.ValidationError({
+                    'crew': f'Crew {crew.id} already has a {tap} time in this race'
+                })
+        return data
+
 class RaceSerializer(serializers.ModelSerializer):
 
     class Meta:
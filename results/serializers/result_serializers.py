@@ -0,0 +1,19 @@
+"""
+Public results serializers.
+"""
+
+from rest_framework import serializers
+from results.models.result_snapshot_model import ResultSnapshot
+
+
+class ResultSnapshotSerializer(serializers.ModelSerializer):
+    # Same shape as the crew list so the results page can use either
+    id = serializers.IntegerField(source='crew_id')
+    club = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ResultSnapshot
+        fields = ('id', 'name', 'competitor_names', 'bib_number', 'composite_code', 'event_band', 'gender', 'club', 'overall_rank', 'gender_rank', 'category_rank', 'raw_time', 'published_time', 'published_time_display', 'masters_adjusted_time', 'masters_adjusted_time_display', 'penalty', 'time_only',)
+
+    def get_club(self, obj):
+        return {'name': obj.club_name, 'blade_image': obj.club_blade_image}
@@ -0,0 +1,243 @@
+"""
+Automatic assignment of unassigned race taps.
+
+A tap the timing desk didn't tie to a crew can usually be placed from the
+crew's tap of the same kind in another timing system: the same boat crossed
+the line at (nearly) the same synchronised time. Each unassigned Start or
+Finish tap is lined up against the other races' assigned taps of that kind:
+
+* times are synchronised with the races' RaceTimingSync offsets, then
+  corrected by the local drift between the two systems, the median
+  difference for the assigned taps either side of it by sequence;
+* every crew with a tap within TOLERANCE_MS of the expected time, and
+  without a tap of that kind in the race already, is a candidate, scored
+  by how close it is and combined across the races that agree on it;
+* the confidence of the best candidate is its score less the runner up's,
+  so a tap between two crews is never confidently given to either.
+
+Each tap and crew is proposed once, highest confidence first. The accepted
+proposals are applied in one transaction followed by one recalculation of
+the crews they go to.
+"""
+
+import bisect
+import statistics
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Crew, Race, RaceTime
+from .models.crew_model import BULK_BATCH_SIZE
+from .results_comparison import sync_offsets
+from .versions import RACE_TIMES, bump
+
+TAPS = ("Start", "Finish")
+
+# Furthest a tap can be from another system's tap for the same crew, once
+# synchronised and corrected for drift
+TOLERANCE_MS = 3000
+
+# Assigned taps either side (by sequence) used to work out the local drift
+NEIGHBOURS = 3
+
+
+class TapAssigner:
+    """
+    taps: {(race id, tap): [(sequence, synchronised time, race time id,
+    crew id), ...] by sequence} for every Start and Finish tap.
+    """
+
+    def __init__(self, races, taps):
+        self.races = races
+        self.taps = taps
+
+        # {(race id, tap): [(sequence, synchronised time, crew id)]} assigned
+        self.assigned = {}
+        # {(race id, tap): ([synchronised time], [crew id]) by time} assigned
+        self.by_time = {}
+        # {(race id, tap): {crew id: synchronised time}} assigned
+        self.crew_times = {}
+        for key, race_taps in taps.items():
+            assigned = [
+                (sequence, time, crew_id)
+                for sequence, time, _race_time_id, crew_id in race_taps
+                if crew_id is not None
+            ]
+            self.assigned[key] = assigned
+            ordered = sorted((time, crew_id) for _sequence, time, crew_id in assigned)
+            self.by_time[key] = (
+                [time for time, _crew_id in ordered],
+                [crew_id for _time, crew_id in ordered],
+            )
+            self.crew_times[key] = {crew_id: time for _s, time, crew_id in assigned}
+
+    @classmethod
+    def load(cls):
+        races = {race.id: race for race in Race.objects.all()}
+        offsets = sync_offsets(races.values())
+
+        taps = defaultdict(list)
+        for race_time_id, crew_id, race_id, tap, sequence, time_tap in (
+            RaceTime.objects.filter(race__isnull=False, tap__in=TAPS)
+            .order_by("sequence", "id")
+            .values_list("id", "crew_id", "race_id", "tap", "sequence", "time_tap")
+        ):
+            taps[(race_id, tap)].append(
+                (sequence, time_tap + offsets.get(race_id, 0), race_time_id, crew_id)
+            )
+        return cls(races, dict(taps))
+
+    def drift(self, key, other_key, sequence):
+        """
+        The median difference between race key and other_key's synchronised
+        times for the crews tapped in both, nearest sequence first
+        """
+        assigned = self.assigned[key]
+        other_times = self.crew_times[other_key]
+        i = bisect.bisect_left(assigned, (sequence,))
+
+        differences = []
+        for neighbours in (reversed(assigned[:i]), assigned[i:]):
+            found = 0
+            for _sequence, time, crew_id in neighbours:
+                if crew_id in other_times:
+                    differences.append(time - other_times[crew_id])
+                    found += 1
+                    if found == NEIGHBOURS:
+                        break
+        return statistics.median(differences) if differences else 0
+
+    def candidates(self, key, other_key, sequence, time):
+        """{crew id: score} for the crews tapped in other_key near time"""
+        expected = time - self.drift(key, other_key, sequence)
+        times, crew_ids = self.by_time[other_key]
+        tapped = self.crew_times[key]
+
+        scores = {}
+        i = bisect.bisect_left(times, expected - TOLERANCE_MS)
+        while i < len(times) and times[i] <= expected + TOLERANCE_MS:
+            if crew_ids[i] not in tapped:
+                scores[crew_ids[i]] = 1 - abs(times[i] - expected) / TOLERANCE_MS
+            i += 1
+        return scores
+
+    def proposals(self, race_id=None, min_confidence=0):
+        """
+        The proposed assignments, highest confidence first, each crew at most
+        once per race and tap
+        """
+        scored = []
+        for (tap_race_id, tap), race_taps in self.taps.items():
+            if race_id is not None and tap_race_id != race_id:
+                continue
+            key = (tap_race_id, tap)
+            other_keys = [
+                other_key
+                for other_key in self.taps
+                if other_key[1] == tap and other_key != key
+            ]
+
+            for sequence, time, race_time_id, crew_id in race_taps:
+                if crew_id is not None:
+                    continue
+
+                # Scores from each race, combined as independent evidence
+                misses = defaultdict(lambda: 1.0)
+                for other_key in other_keys:
+                    for candidate, score in self.candidates(
+                        key, other_key, sequence, time
+                    ).items():
+                        misses[candidate] *= 1 - score
+                if not misses:
+                    continue
+
+                ranked = sorted(
+                    ((1 - miss, candidate) for candidate, miss in misses.items()),
+                    reverse=True,
+                )
+                best_score, best_crew_id = ranked[0]
+                runner_up = ranked[1][0] if len(ranked) > 1 else 0
+                scored.append(
+                    (best_score - runner_up, race_time_id, best_crew_id, key, sequence)
+                )
+
+        scored.sort(key=lambda proposal: (-proposal[0], proposal[1]))
+        proposed_crews = set()
+        proposals = []
+        for confidence, race_time_id, crew_id, key, sequence in scored:
+            if confidence < min_confidence:
+                break
+            if (key, crew_id) in proposed_crews:
+                continue
+            proposed_crews.add((key, crew_id))
+            proposals.append(
+                {
+                    "race_time_id": race_time_id,
+                    "race_id": key[0],
+                    "race": self.races[key[0]].name,
+                    "tap": key[1],
+                    "sequence": sequence,
+                    "crew_id": crew_id,
+                    "confidence": round(confidence, 3),
+                }
+            )
+
+        crews = Crew.objects.in_bulk({proposal["crew_id"] for proposal in proposals})
+        for proposal in proposals:
+            crew = crews[proposal["crew_id"]]
+            proposal["bib_number"] = crew.bib_number
+            proposal["crew_name"] = crew.competitor_names or crew.name
+        return proposals
+
+
+def apply_assignments(assignments):
+    """
+    Assign taps to crews from [{"race_time_id", "crew_id"}], in one
+    transaction, then recalculate the crews once. Taps that are already
+    assigned, or would give a crew a second tap of a kind in a race, are
+    rejected. Returns the assigned count and the rejected assignments.
+    """
+    wanted = {}
+    for assignment in assignments:
+        wanted[int(assignment["race_time_id"])] = int(assignment["crew_id"])
+
+    rejected = []
+    with transaction.atomic():
+        race_times = RaceTime.objects.select_for_update().in_bulk(wanted)
+        crew_ids = set(
+            Crew.objects.filter(id__in=wanted.values()).values_list("id", flat=True)
+        )
+        tapped = set(
+            RaceTime.objects.filter(
+                crew_id__in=crew_ids,
+                race_id__in={race_time.race_id for race_time in race_times.values()},
+            ).values_list("crew_id", "race_id", "tap")
+        )
+
+        assigned = []
+        for race_time_id, crew_id in wanted.items():
+            race_time = race_times.get(race_time_id)
+            if race_time is None:
+                reason = "Race time not found"
+            elif race_time.crew_id is not None:
+                reason = "Race time is already assigned"
+            elif crew_id not in crew_ids:
+                reason = "Crew not found"
+            elif (crew_id, race_time.race_id, race_time.tap) in tapped:
+                reason = f"Crew already has a {race_time.tap} tap in this race"
+            else:
+                race_time.crew_id = crew_id
+                tapped.add((crew_id, race_time.race_id, race_time.tap))
+                assigned.append(race_time)
+                continue
+            rejected.append(
+                {"race_time_id": race_time_id, "crew_id": crew_id, "reason": reason}
+            )
+
+        RaceTime.objects.bulk_update(assigned, ["crew"], batch_size=BULK_BATCH_SIZE)
+        bump(RACE_TIMES, [race_time.crew_id for race_time in assigned])
+
+    Crew.update_computed_properties_for(
+        [race_time.crew_id for race_time in assigned]
+    )
+    return {"assigned": len(assigned), "rejected": rejected}
@@ -1,6 +1,19 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
+from django.test import override_settings
 from django.urls import reverse
-from .models import Band, Crew, Club, Event
+from .models import Band, Competitor, Crew, Club, DataChange, DataVersion, Event, EventMeetingKey, EventOrder, MastersAdjustment, MarshallingDivision, NumberLocation, OriginalEventCategory, Race, RaceTime, RaceTimingSync, ResultSnapshot, Job
+from . import instrumentation, jobs, versions
+from .benchmarks import Benchmark, Meeting, measure_startup
+from .lookups import marshalling_division_index
+from .masters import MastersHandicap
+from .crew_import import import_crews, sync_crews
+from .race_time_import import import_fast_taps
+from .models.crew_model import COMPUTED_FIELDS
 
 
 # Create your tests here.
@@ -64,3 +77,894 @@ class CrewTests(APITestCase):
             }],
             'event_band': None
         }])
+
+
+class RankingTests(APITestCase):
+
+    def setUp(self):
+        self.club = Club.objects.create(name='Rowing club', id=1)
+        self.open_event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        self.female_event = Event.objects.create(name='W 2x', override_name='W 2x', id=2, type='Open', gender='Female')
+
+    def create_crew(self, crew_id, event, published_time, **kwargs):
+        defaults = {'status': 'Accepted', 'time_only': False}
+        defaults.update(kwargs)
+        return Crew.objects.create(
+            id=crew_id,
+            name=f'Crew {crew_id}',
+            club=self.club,
+            event=event,
+            published_time=published_time,
+            category_position_time=published_time,
+            **defaults,
+        )
+
+    def test_ranks_match_per_crew_calculation(self):
+        """
+        Set-based ranks should match the per-crew query based ranks, including ties
+        """
+        self.create_crew(1, self.open_event, 900000)
+        self.create_crew(2, self.open_event, 910000)
+        self.create_crew(3, self.open_event, 910000)
+        self.create_crew(4, self.female_event, 905000)
+        self.create_crew(5, self.female_event, 0)
+        self.create_crew(6, self.open_event, 920000, time_only=True)
+        self.create_crew(7, self.open_event, 895000, status='Scratched')
+
+        expected = {
+            crew.id: (crew.calc_overall_rank(), crew.calc_gender_rank(), crew.calc_category_rank())
+            for crew in Crew.objects.all()
+        }
+
+        Crew.update_rankings()
+
+        actual = {
+            crew.id: (crew.overall_rank, crew.gender_rank, crew.category_rank)
+            for crew in Crew.objects.all()
+        }
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[2], (3, 2, 2))
+        self.assertEqual(actual[3], (3, 2, 2))
+        self.assertEqual(actual[6], (5, 4, 0))
+
+
+class RecalculationTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        open_event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        female_event = Event.objects.create(name='W 2-', override_name='W 2-', id=2, type='Open', gender='Female')
+        start = Race.objects.create(name='Start', default_start=True, is_timing_reference=True)
+        finish = Race.objects.create(name='Finish', default_finish=True)
+        RaceTimingSync.objects.create(reference_race=start, target_race=finish, timing_offset_ms=250)
+
+        self.finish_times = {}
+        for crew_id in range(1, 13):
+            crew = Crew.objects.create(
+                id=crew_id,
+                name=f'Crew {crew_id}',
+                club=club,
+                event=open_event if crew_id % 2 else female_event,
+                status='Accepted',
+            )
+            RaceTime.objects.create(sequence=crew_id, tap='Start', time_tap=crew_id * 10000, crew=crew, race=start)
+            self.finish_times[crew_id] = RaceTime.objects.create(
+                sequence=crew_id,
+                tap='Finish',
+                time_tap=crew_id * 10000 + 900000 + (crew_id % 4) * 1000,
+                crew=crew,
+                race=finish,
+            )
+        Crew.update_all_computed_properties()
+
+    def computed_state(self):
+        return {crew.id: crew._values(COMPUTED_FIELDS) for crew in Crew.objects.all()}
+
+    def test_incremental_update_matches_full_recalculation(self):
+        """
+        Moving a finish tap between crews should only need those crews recalculated
+        """
+        self.finish_times[4].delete()
+        race_time = self.finish_times[3]
+        race_time.crew_id = 4
+        race_time.save()
+
+        Crew.update_computed_properties_for([3, 4])
+        incremental = self.computed_state()
+
+        Crew.update_all_computed_properties()
+        self.assertEqual(incremental, self.computed_state())
+        self.assertEqual(Crew.objects.get(id=3).raw_time, 0)
+
+    def test_failed_snapshot_rebuild_leaves_results_unchanged(self):
+        """
+        The crews, their snapshot and the crews version are saved together
+        """
+        before = self.computed_state()
+        version = versions.version(versions.CREWS)
+        self.finish_times[1].delete()
+
+        with mock.patch('results.models.ResultSnapshot.rebuild', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Crew.update_all_computed_properties()
+        self.assertEqual(self.computed_state(), before)
+        self.assertEqual(versions.version(versions.CREWS), version)
+
+    def test_time_properties_use_a_single_timing_load(self):
+        """
+        Races, sync offsets and taps are loaded once however many fields are calculated
+        """
+        crew = Crew.objects.get(id=5)
+        with self.assertNumQueries(3):
+            crew.update_time_properties()
+        self.assertEqual(crew.raw_time, 900000 + 1000 + 250)
+        self.assertEqual(crew.start_sequence, 5)
+
+    def test_results_are_read_from_the_snapshot(self):
+        """
+        The results list is rebuilt on recalculation and read without joins
+        """
+        self.finish_times[1].delete()
+        Crew.update_computed_properties_for([1])
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/results/?gender=Open&page_size=100')
+
+        results = response.data['results']
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([result['id'] for result in results], [5, 9, 3, 7, 11])
+        self.assertEqual(results[0]['club'], {'name': 'Rowing club', 'blade_image': None})
+        self.assertEqual(results[0]['published_time_display'], '15:01.2')
+        self.assertEqual(response.data['fastest_open_2x_time'], 901250)
+
+
+    def test_edits_only_replace_the_touched_snapshot_rows(self):
+        """
+        An edit refreshes its crews' results rows, including fields that aren't recalculated
+        """
+        ResultSnapshot.objects.filter(crew_id=7).update(name='Untouched')
+        Crew.objects.filter(id=5).update(name='Renamed')
+        Crew.update_computed_properties_for([5])
+        names = dict(ResultSnapshot.objects.values_list('crew_id', 'name'))
+        self.assertEqual((names[5], names[7]), ('Renamed', 'Untouched'))
+
+        Competitor.objects.create(last_name='SMITH', gender='M', crew_id=9)
+        self.client.get('/api/crew-get-event-band/')
+        self.assertEqual(ResultSnapshot.objects.get(crew_id=9).competitor_names, 'Smith')
+
+
+class DrawTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        events = {
+            name: Event.objects.create(name=name, override_name=name, id=event_id, type='Open', gender='Open')
+            for event_id, name in enumerate(['Op 2x', 'Op 2-', 'Op 4+', 'Op 1x'], start=1)
+        }
+        EventOrder.objects.create(event='Op 2x', event_order=1)
+        EventOrder.objects.create(event='Op 2-', event_order=2)
+        EventOrder.objects.create(event='Op 4+', event_order=3)
+        crews = [
+            ('Op 2x', 50, None), ('Op 2x', 70, None), ('Op 2x', 50, None), ('Op 2x', None, None),
+            ('Op 2-', None, 10), ('Op 2-', None, 30), ('Op 4+', None, None), ('Op 1x', 10, 10),
+        ]
+        for crew_id, (event, sculling_cri, rowing_cri) in enumerate(crews, start=1):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=events[event], status='Accepted', sculling_CRI=sculling_cri, rowing_CRI=rowing_cri)
+        Crew.objects.create(id=9, name='Crew 9', club=club, event=events['Op 2x'], status='Scratched', sculling_CRI=90)
+
+    def test_draw_matches_per_crew_calculation_in_a_few_queries(self):
+        expected = {crew.id: crew.calc_draw_start_score() for crew in Crew.objects.filter(status='Accepted')}
+
+        # Plus three to record the change to the crews
+        with self.assertNumQueries(6):
+            Crew.update_start_order_calcs()
+
+        crews = {crew.id: crew for crew in Crew.objects.filter(status='Accepted')}
+        scores = {crew_id: crew.draw_start_score and float(crew.draw_start_score) for crew_id, crew in crews.items()}
+        self.assertEqual(scores, expected)
+        self.assertEqual(scores[2], 1.001)
+        self.assertEqual(scores[1], 1.002)
+        self.assertEqual(
+            [crews[crew_id].calculated_start_order for crew_id in range(1, 9)],
+            [2, 1, 3, 9999999, 5, 4, 6, 9999999],
+        )
+
+
+class MastersHandicapTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        open_event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        masters_event = Event.objects.create(name='MasC/D 2x', override_name='Op MasC/D 2x', id=2, type='Master', gender='Open')
+        open_crew = Crew.objects.create(id=1, name='Open', club=club, event=open_event, status='Accepted', raw_time=899600)
+        OriginalEventCategory.objects.create(crew=open_crew, event_original='2x')
+        for crew_id in (2, 3):
+            crew = Crew.objects.create(id=crew_id, name=f'Masters {crew_id}', club=club, event=masters_event, status='Accepted', raw_time=950000)
+            OriginalEventCategory.objects.create(crew=crew, event_original='MasC.2x' if crew_id == 2 else 'MasD.2x')
+        MastersAdjustment.objects.create(standard_time_label='15:00', standard_time_ms=900000, master_category='MasC', master_time_adjustment_ms=12000)
+
+    def test_adjustments_for_all_crews_in_one_pass(self):
+        """
+        Baselines and lookup tables are loaded once, not per masters crew
+        """
+        crews = list(Crew.objects.select_related('event').order_by('id'))
+        with self.assertNumQueries(4):
+            handicap = MastersHandicap()
+            adjustments = handicap.adjustments(crews)
+
+        self.assertEqual(handicap.fastest_times['fastest_men_scull'], 899600)
+        self.assertEqual(adjustments, {1: 0, 2: 12000, 3: 0})
+        self.assertEqual(adjustments[2], crews[1].calc_masters_adjustment())
+
+
+class JobTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        for crew_id in (1, 2):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=event, status='Accepted', requires_recalculation=True)
+
+    def test_recompute_is_queued_and_run_by_the_worker(self):
+        """
+        Repeated requests share one queued job, which the worker then runs to completion
+        """
+        first = self.client.get('/api/crew-update-rankings/')
+        second = self.client.get('/api/crew-update-rankings/')
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(first.data['status'], Job.QUEUED)
+
+        job = jobs.run_next_job()
+        self.assertIsNone(jobs.run_next_job())
+
+        response = self.client.get(f'/api/jobs/{job.id}/')
+        self.assertEqual(response.data['status'], Job.SUCCEEDED)
+        self.assertEqual((response.data['processed'], response.data['total']), (2, 2))
+        self.assertEqual(response.data['result'], {'updated_crews': 2})
+        self.assertFalse(Crew.objects.filter(requires_recalculation=True).exists())
+
+        # Once the first job has started, a new request needs a job of its own
+        third = self.client.get('/api/crew-update-rankings/')
+        self.assertNotEqual(third.data['id'], job.id)
+
+    def test_failed_job_records_the_error(self):
+        job = jobs.enqueue(jobs.RECOMPUTE)
+        Job.objects.filter(pk=job.pk).update(kind='missing')
+        job = jobs.run_next_job()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('KeyError', job.error)
+
+    def test_concurrent_requests_share_one_queued_job(self):
+        """
+        A job queued by another request after the lookup is returned rather than duplicated
+        """
+        other = Job.objects.create(kind=jobs.RECOMPUTE, dedupe_key='recompute:{}')
+        queued = Job.objects.filter(status=Job.QUEUED)
+        # The first lookup misses the other request's job
+        with mock.patch.object(Job.objects, 'filter', side_effect=[Job.objects.none(), queued]):
+            job = jobs.enqueue(jobs.RECOMPUTE)
+        self.assertEqual(job.id, other.id)
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+
+class CrewImportTests(APITestCase):
+
+    def setUp(self):
+        Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        Band.objects.create(name='A', id=1, event=event)
+
+    def broe_crew(self, crew_id, **kwargs):
+        crew = {
+            'name': f'Crew {crew_id}', 'id': crew_id, 'compositeCode': None, 'clubId': 1,
+            'rowingCRI': None, 'scullingCRI': 10, 'eventId': 1, 'status': 'Accepted',
+            'customCrewNumber': crew_id, 'bandId': None, 'boatingPermissionsClubID': None,
+            'competitionNotes': None, 'notes': None,
+        }
+        crew.update(kwargs)
+        return crew
+
+    def test_crews_are_imported_in_bulk(self):
+        payload = [
+            self.broe_crew(1, bandId=1),
+            self.broe_crew(2, boatingPermissionsClubID=1, notes='TO'),
+            self.broe_crew(3, boatingPermissionsClubID=50),
+        ]
+        # Including three each to record the change to the crews and race times,
+        # and one to clear the results snapshot
+        with self.assertNumQueries(20):
+            self.assertEqual(import_crews(payload)['inserted'], 3)
+
+        crews = {crew.id: crew for crew in Crew.objects.all()}
+        self.assertEqual(crews[1].event_band, 'Op 2x A')
+        self.assertEqual(crews[1].host_club_id, 999998)
+        self.assertTrue(crews[2].time_only)
+        self.assertEqual(Club.objects.get(id=50).name, 'Unknown club - 50')
+
+    def test_invalid_import_leaves_existing_crews(self):
+        import_crews([self.broe_crew(1)])
+        with self.assertRaises(ValidationError):
+            import_crews([self.broe_crew(2), self.broe_crew(3, eventId=99)])
+        self.assertEqual(list(Crew.objects.values_list('id', flat=True)), [1])
+
+    def test_sync_only_touches_changed_crews(self):
+        import_crews([self.broe_crew(1), self.broe_crew(2), self.broe_crew(3)])
+        Crew.objects.update(penalty=5, requires_recalculation=False)
+
+        counts = sync_crews([
+            self.broe_crew(1),
+            self.broe_crew(2, name='Renamed'),
+            self.broe_crew(3, bandId=1),
+            self.broe_crew(4),
+        ])
+
+        self.assertEqual(counts, {'inserted': 1, 'updated': 2, 'deleted': 0, 'unchanged': 1})
+        crews = {crew.id: crew for crew in Crew.objects.all()}
+        self.assertEqual(crews[2].name, 'Renamed')
+        self.assertEqual(crews[3].event_band, 'Op 2x A')
+        self.assertEqual(crews[3].penalty, 5)
+        self.assertEqual(
+            {crew_id: crew.requires_recalculation for crew_id, crew in crews.items()},
+            {1: False, 2: False, 3: True, 4: True},
+        )
+
+        counts = sync_crews([self.broe_crew(2, name='Renamed'), self.broe_crew(3, bandId=1)])
+        self.assertEqual(counts, {'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 2})
+        self.assertEqual(Crew.objects.get(id=1).status, 'Removed')
+
+    def test_reimported_crews_leave_the_results(self):
+        import_crews([self.broe_crew(1), self.broe_crew(2), self.broe_crew(3)])
+        race = Race.objects.create(name='Race', race_id='1', default_start=True, default_finish=True, is_timing_reference=True)
+        for crew_id in (1, 2, 3):
+            RaceTime.objects.create(sequence=crew_id, tap='Start', time_tap=crew_id * 1000, crew_id=crew_id, race=race)
+            RaceTime.objects.create(sequence=crew_id, tap='Finish', time_tap=crew_id * 1000 + 900000, crew_id=crew_id, race=race)
+        Crew.update_all_computed_properties()
+
+        def results():
+            return sorted(result['id'] for result in self.client.get('/api/results/').data['results'])
+
+        self.assertEqual(results(), [1, 2, 3])
+        sync_crews([self.broe_crew(1), self.broe_crew(2, status='Scratched')])
+        self.assertEqual(results(), [1])
+        import_crews([self.broe_crew(2)])
+        self.assertEqual(results(), [])
+
+    @mock.patch('results.views.crews.requests.post')
+    def test_broe_import_view_syncs_or_replaces(self, post):
+        EventMeetingKey.objects.create(event_meeting_key='KEY', event_meeting_name='Meeting', current_event_meeting=True)
+        post.return_value.status_code = 200
+        post.return_value.json.return_value = {'crews': [self.broe_crew(1), self.broe_crew(2)]}
+
+        response = self.client.get('/api/crew-data-import/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['inserted'], 2)
+        self.assertEqual(post.call_args.kwargs['json']['meetingIdentifier'], 'KEY')
+
+        post.return_value.json.return_value = {'crews': [self.broe_crew(2)]}
+        response = self.client.get('/api/crew-data-import/')
+        self.assertEqual((response.data['unchanged'], response.data['deleted']), (1, 1))
+
+        response = self.client.get('/api/crew-data-import/?replace=true')
+        self.assertEqual((response.data['inserted'], response.data['deleted']), (1, 2))
+        self.assertEqual(list(Crew.objects.values_list('id', flat=True)), [2])
+
+
+class ExportTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1, blade_image='blade.png', index_code='RC')
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        NumberLocation.objects.create(club='Rowing club', number_location='Tent')
+        MarshallingDivision.objects.create(name='Upper', bottom_range=1, top_range=20)
+        for crew_id in range(1, 11):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, host_club=club, event=event, status='Accepted', bib_number=crew_id, race_time=0)
+
+    def test_start_order_export_streams_without_per_crew_queries(self):
+        # Including one for the reference table versions
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/start-order-data-export/')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(lines[1], '1,Accepted,1,Crew 1,Rowing club,"=IMAGE(""blade.png"")",,Op 2x,Rowing club,Tent,Upper,')
+
+
+class CrewListTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        band = Band.objects.create(name='A', id=1, event=event)
+        race = Race.objects.create(name='Finish', race_id='1234')
+        EventOrder.objects.create(event='Op 2x A', event_order=3)
+        NumberLocation.objects.create(club='Rowing club', number_location='Tent')
+        MarshallingDivision.objects.create(name='Upper', bottom_range=1, top_range=20)
+        for crew_id in range(1, 11):
+            crew = Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, host_club=club, event=event, band=band, event_band='Op 2x A', status='Accepted', bib_number=crew_id)
+            Competitor.objects.create(last_name=f'Rower {crew_id}', gender='M', crew=crew)
+            OriginalEventCategory.objects.create(crew=crew, event_original='Op 2x')
+            RaceTime.objects.create(sequence=crew_id, tap='Finish', time_tap=crew_id, crew=crew, race=race)
+
+    def test_page_queries_do_not_grow_with_page_size(self):
+        # Sorting skips the pagination aggregates, which are cached between
+        # requests, as are the reference tables after the first request (only
+        # their versions are read)
+        self.client.get('/api/crews/?ordering=id&page_size=1')
+
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/crews/?ordering=id&page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/crews/?ordering=id&page_size=10')
+        self.assertEqual(len(response.data['results']), 10)
+
+        crew = response.data['results'][0]
+        self.assertEqual(crew['event_order'], 3)
+        self.assertEqual(crew['marshalling_division'], 'Upper')
+        self.assertEqual(crew['number_location'], 'Tent')
+        self.assertEqual(crew['competitors'][0]['last_name'], 'Rower 1')
+        self.assertEqual(crew['times'][0]['race']['name'], 'Finish')
+
+    def test_reference_tables_are_reloaded_after_changes(self):
+        self.assertEqual(Crew.objects.get(id=1).event_order, 3)
+
+        event_order = EventOrder.objects.get()
+        event_order.event_order = 5
+        event_order.save()
+
+        self.assertEqual(Crew.objects.get(id=1).event_order, 5)
+
+
+class MarshallingDivisionIndexTests(APITestCase):
+
+    def setUp(self):
+        MarshallingDivision.objects.create(name='Upper', bottom_range=1, top_range=20)
+        MarshallingDivision.objects.create(name='Middle', bottom_range=15, top_range=30)
+        MarshallingDivision.objects.create(name='Lower', bottom_range=41, top_range=50)
+
+    def test_lookups_overlaps_and_gaps(self):
+        index = marshalling_division_index()
+        self.assertEqual([index.lookup(n) for n in (1, 15, 21, 35, 50, 51)], ['Upper', 'Upper', 'Middle', None, 'Lower', None])
+        self.assertEqual(index.overlaps, [{'divisions': ['Upper', 'Middle'], 'from': 15, 'to': 20}])
+        self.assertEqual(index.gaps, [{'from': 31, 'to': 40}])
+
+        # Only the table's version is read
+        with self.assertNumQueries(1):
+            self.assertIs(marshalling_division_index(), index)
+
+    def test_check_reports_crews_without_a_division(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        for crew_id, bib_number in ((1, 10), (2, 35), (3, None)):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=event, status='Accepted', bib_number=bib_number)
+
+        response = self.client.get('/api/marshalling-divisions/check/')
+        self.assertEqual(response.data['gaps'], [{'from': 31, 'to': 40}])
+        self.assertEqual(response.data['crews_without_division'], [2])
+
+    def test_index_is_rebuilt_when_divisions_change(self):
+        marshalling_division_index()
+        self.client.put('/api/marshalling-divisions/bulk-update/', {'divisions': [{'name': 'All', 'top_range': 100}]}, format='json')
+
+        self.assertEqual(marshalling_division_index().lookup(45), 'All')
+
+
+class RaceTimeImportTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        Crew.objects.create(id=1, name='Crew 1', club=club, event=event, status='Accepted')
+        self.race = Race.objects.create(name='Finish', race_id='1234')
+        RaceTime.objects.create(sequence=1, tap='Finish', time_tap=1, race=self.race)
+
+    def test_taps_are_inserted_in_bulk_with_a_summary(self):
+        fast_taps = [
+            {'Seq #': '1.0', 'Tap': 'Finish', 'Time tap': '10:01.50', 'Team name 2': '1'},
+            {'Seq #': 2, 'Tap': 'Finish', 'Time tap': '10:02.50', 'Team name 2': ''},
+            {'Seq #': 3, 'Tap': 'Finish', 'Time tap': '10:03.50', 'Team name 2': '99'},
+            {'Seq #': 4, 'Tap': 'Finish', 'Time tap': 'later', 'Team name 2': '1'},
+        ]
+        # Including three to record the change to the race times
+        with self.assertNumQueries(8):
+            summary = import_fast_taps(fast_taps, self.race.id)
+
+        self.assertEqual(summary['inserted'], 2)
+        self.assertEqual(summary['rejected'], 2)
+        self.assertEqual(summary['unknown_crews'], [99])
+        self.assertEqual(
+            list(RaceTime.objects.order_by('sequence').values_list('sequence', 'time_tap', 'crew_id')),
+            [(1, 601500, 1), (2, 602500, None)],
+        )
+
+    def test_repeat_taps_for_a_crew_are_imported_unassigned(self):
+        RaceTime.objects.create(sequence=1, tap='Finish', time_tap=1, crew_id=1, race=self.race)
+        fast_taps = [
+            {'Seq #': 2, 'Tap': 'Finish', 'Time tap': '10:02.50', 'Team name 2': '1'},
+            {'Seq #': 3, 'Tap': 'Start', 'Time tap': '00:03.50', 'Team name 2': '1'},
+        ]
+        summary = import_fast_taps(fast_taps, self.race.id, replace=False)
+
+        self.assertEqual(summary['duplicates'], 1)
+        self.assertEqual(
+            list(RaceTime.objects.filter(sequence__gt=1).order_by('sequence').values_list('tap', 'crew_id')),
+            [('Finish', None), ('Start', 1)],
+        )
+
+
+class BenchmarkTests(APITestCase):
+
+    def test_every_scenario_runs_on_a_generated_meeting(self):
+        meeting = Meeting(crews=60, clubs=8, seed=3).generate()
+        benchmark = Benchmark(meeting, repeat=1)
+        results = benchmark.run()
+
+        names = [result['name'] for result in results]
+        self.assertIn('raw_time_comparison', names)
+        self.assertIn('result_data_export', names)
+        self.assertNotIn('competitors', names)
+        self.assertTrue(Crew.objects.filter(published_time__gt=0).exists())
+        self.assertEqual(benchmark.report(results)['meeting']['crews'], 60)
+
+    def test_importing_the_urls_does_not_touch_the_database(self):
+        # Raises StartupTouchedDatabase if any query is run
+        report = measure_startup(repeat=1)
+        self.assertGreater(report['import_ms']['median'], 0)
+
+
+@override_settings(RESULTS_INSTRUMENTATION=True)
+class InstrumentationTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        for crew_id in range(1, 4):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, host_club=club, event=event, status='Accepted', bib_number=crew_id)
+        instrumentation.stats.reset()
+        self.admin = User.objects.create_user('admin', is_staff=True)
+
+    def test_api_requests_are_timed_and_summarised(self):
+        response = self.client.get('/api/crews/1')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=[\d.]+$')
+        self.client.get('/api/crews/2')
+
+        response = self.client.get('/api/bib-data-export/')
+        content = b''.join(response.streaming_content)
+
+        self.client.force_authenticate(self.admin)
+        summary = self.client.get('/api/instrumentation/').data
+        endpoints = {endpoint['endpoint']: endpoint for endpoint in summary['endpoints']}
+        self.assertEqual(endpoints['GET /api/crews/<int:pk>']['requests'], 2)
+        export = endpoints['GET /api/bib-data-export/']
+        self.assertEqual(export['size']['max'], len(content))
+        self.assertEqual(export['queries']['max'], 1)
+        self.assertEqual(len(summary['most_queries']), 3)
+
+    def test_stats_are_only_available_to_staff(self):
+        self.client.get('/api/crews/1')
+        self.assertEqual(self.client.get('/api/instrumentation/').status_code, 401)
+        self.assertEqual(self.client.delete('/api/instrumentation/').status_code, 401)
+
+        self.client.force_authenticate(User.objects.create_user('timekeeper'))
+        self.assertEqual(self.client.delete('/api/instrumentation/').status_code, 403)
+        endpoints = [endpoint['endpoint'] for endpoint in instrumentation.stats.summary()['endpoints']]
+        self.assertIn('GET /api/crews/<int:pk>', endpoints)
+
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.delete('/api/instrumentation/').status_code, 204)
+
+    @override_settings(RESULTS_INSTRUMENTATION=False)
+    def test_stats_are_not_available_when_switched_off(self):
+        response = self.client.get('/api/instrumentation/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class RawTimeComparisonTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        self.races = [Race.objects.create(name=f'System {i}', race_id=str(i)) for i in (1, 2)]
+        for crew_id, (start, finish) in enumerate([(0, 600000), (1000, 602000)], start=1):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=event, status='Accepted', bib_number=crew_id)
+            for race in self.races:
+                RaceTime.objects.create(sequence=crew_id, tap='Start', time_tap=start, crew_id=crew_id, race=race)
+                RaceTime.objects.create(sequence=crew_id, tap='Finish', time_tap=finish, crew_id=crew_id, race=race)
+
+    def test_comparison_is_reused_until_the_timing_data_changes(self):
+        response = self.client.get('/api/raw-time-comparison/?ordering=bib_number')
+        rows = response.json()['comparison_data']
+        self.assertEqual([row['confidence']['level'] for row in rows], ['high', 'high'])
+        self.assertTrue(all(row['positions_match'] for row in rows))
+
+        with self.assertNumQueries(1):
+            self.client.get('/api/raw-time-comparison/?ordering=bib_number&page=1')
+
+        finish = RaceTime.objects.get(crew_id=2, race=self.races[1], tap='Finish')
+        finish.time_tap = 500000
+        finish.save()
+
+        rows = self.client.get('/api/raw-time-comparison/?ordering=bib_number').json()['comparison_data']
+        race_id = str(self.races[1].id)
+        self.assertEqual(rows[1]['race_time_details'][race_id]['positions'], {'category': 1, 'overall': 1})
+        self.assertEqual(rows[1]['confidence']['level'], 'low')
+        self.assertFalse(rows[1]['positions_match'])
+
+
+class ResultsComparisonTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        self.races = [Race.objects.create(name=f'System {i}', race_id=str(i), is_timing_reference=i == 1) for i in (1, 2)]
+        RaceTimingSync.objects.create(reference_race=self.races[0], target_race=self.races[1], timing_offset_ms=1000)
+        for event_id, name in enumerate(['Op 2-', 'Op 2x'], start=1):
+            event = Event.objects.create(name=name, override_name=name, id=event_id, type='Open', gender='Open')
+            for crew_id, finish in [(event_id * 10, 600000), (event_id * 10 + 1, 590000)]:
+                Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=event, status='Accepted')
+                for race in self.races:
+                    RaceTime.objects.create(sequence=crew_id, tap='Start', time_tap=0, crew_id=crew_id, race=race)
+                    RaceTime.objects.create(sequence=crew_id, tap='Finish', time_tap=finish, crew_id=crew_id, race=race)
+
+    def compare(self, **options):
+        body = {
+            'comparison1': {'start_race_id': self.races[0].id, 'finish_race_id': self.races[0].id},
+            'comparison2': {'start_race_id': self.races[0].id, 'finish_race_id': self.races[1].id},
+            **options,
+        }
+        return self.client.post('/api/results-comparison/', body, format='json').json()
+
+    def test_race_pairs_are_compared_with_sync_offsets_a_page_at_a_time(self):
+        data = self.compare(limit=1)
+        self.assertEqual(data['categories'], ['Op 2-'])
+        self.assertEqual(data['next_cursor'], 'Op 2-')
+        self.assertEqual(data['comparison1']['results']['Op 2-']['winner']['crew_id'], 11)
+        self.assertEqual(data['comparison2']['results']['Op 2-']['winner']['raw_time'], 591000)
+
+        # The races, and the timing data version for each pair
+        with self.assertNumQueries(3):
+            data = self.compare(limit=1, cursor='Op 2-')
+        self.assertEqual(data['categories'], ['Op 2x'])
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['comparison1']['results']['Op 2x']['runner_up']['crew_id'], 20)
+
+    def test_invalid_race_ids_are_rejected(self):
+        for race_id in ['x', 999]:
+            body = {
+                'comparison1': {'start_race_id': race_id, 'finish_race_id': self.races[0].id},
+                'comparison2': {'start_race_id': self.races[0].id, 'finish_race_id': self.races[1].id},
+            }
+            response = self.client.post('/api/results-comparison/', body, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Invalid race ID provided'})
+
+
+class ChangeFeedTests(APITestCase):
+
+    def setUp(self):
+        self.club = Club.objects.create(name='Rowing club', id=1)
+        self.event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        self.race = Race.objects.create(name='Race', race_id='1234')
+        for crew_id in range(1, 4):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=self.club, event=self.event, status='Accepted')
+
+    def test_feed_lists_the_crews_changed_since_a_version(self):
+        data = self.client.get('/api/changes/').json()
+        self.assertTrue(data['all_crews'])
+        since = data['cursor']
+
+        crew = Crew.objects.get(id=1)
+        crew.penalty = 5
+        crew.save()
+        RaceTime.objects.create(sequence=1, tap='Finish', time_tap=1, crew_id=2, race=self.race)
+
+        data = self.client.get(f'/api/changes/?since={since}').json()
+        self.assertEqual(data['crew_ids'], [1, 2])
+        self.assertFalse(data['all_crews'])
+        self.assertEqual(versions.parse_cursor(data['cursor']), data['versions'])
+
+        Crew.update_all_computed_properties()
+        self.assertTrue(self.client.get(f'/api/changes/?since={data["cursor"]}').json()['all_crews'])
+        self.assertEqual(self.client.get('/api/changes/?since=latest').status_code, 400)
+
+    def test_changes_committed_out_of_order_are_not_passed_over(self):
+        """
+        A crews change given an id before a race times change, but committed after it, is still listed
+        """
+        since = self.client.get('/api/changes/').json()['cursor']
+        # Recorded, but the transaction hasn't committed its version yet
+        pending = DataChange.objects.create(domain=versions.CREWS, crew_ids=[1])
+        RaceTime.objects.create(sequence=1, tap='Finish', time_tap=1, crew_id=2, race=self.race)
+
+        data = self.client.get(f'/api/changes/?since={since}').json()
+        self.assertEqual(data['crew_ids'], [2])
+
+        DataVersion.objects.filter(domain=versions.CREWS).update(version=pending.id)
+        data = self.client.get(f'/api/changes/?since={data["cursor"]}').json()
+        self.assertEqual(data['crew_ids'], [1])
+        self.assertFalse(data['all_crews'])
+
+    def test_collected_changes_are_recorded_once(self):
+        since = versions.data_versions()[versions.CREWS]
+        with versions.collected():
+            for crew in Crew.objects.all():
+                crew.save()
+        changes = DataChange.objects.filter(id__gt=since)
+        self.assertEqual(list(changes.values_list('domain', 'crew_ids')), [(versions.CREWS, [1, 2, 3])])
+
+    def test_penalties_import_is_recorded_once(self):
+        for crew in Crew.objects.all():
+            Crew.objects.filter(id=crew.id).update(bib_number=crew.id)
+        since = max(versions.data_versions().values())
+        upload = SimpleUploadedFile('penalties.csv', b'bib_number,penalty\n1,5\n2,10\n')
+        response = self.client.post('/api/crew-import-penalties/', {'file': upload})
+        self.assertEqual(response.data['results']['updated_count'], 2)
+        changes = DataChange.objects.filter(id__gt=since)
+        self.assertEqual(list(changes.values_list('domain', 'crew_ids')), [(versions.CREWS, None)])
+
+    def test_crew_aggregates_are_recalculated_after_changes(self):
+        self.assertEqual(self.client.get('/api/crews/').data['num_scratched_crews'], 0)
+
+        crew = Crew.objects.get(id=3)
+        crew.status = 'Scratched'
+        crew.save()
+        self.assertEqual(self.client.get('/api/crews/').data['num_scratched_crews'], 1)
+
+
+class TapAutoAssignTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        self.races = [
+            Race.objects.create(name='Race A', race_id='1', default_start=True, default_finish=True, is_timing_reference=True),
+            Race.objects.create(name='Race B', race_id='2'),
+        ]
+        # Race B's clock is a second behind, and drifts 200ms further behind
+        RaceTimingSync.objects.create(reference_race=self.races[0], target_race=self.races[1], timing_offset_ms=1000)
+        self.unassigned = {}
+        for crew_id in range(1, 7):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=event, status='Accepted')
+            for race, clock in [(self.races[0], 0), (self.races[1], -1200)]:
+                RaceTime.objects.create(sequence=crew_id, tap='Start', time_tap=crew_id * 60000 + clock, crew_id=crew_id, race=race)
+                missed = (crew_id, race) in [(3, self.races[1]), (5, self.races[0])]
+                finish = RaceTime.objects.create(sequence=crew_id, tap='Finish', time_tap=crew_id * 60000 + 900000 + clock, crew_id=None if missed else crew_id, race=race)
+                if missed:
+                    self.unassigned[crew_id] = finish.id
+
+    def test_missed_taps_are_proposed_and_applied_in_one_go(self):
+        proposals = self.client.get('/api/race-times/auto-assign/').data
+        self.assertEqual(
+            [(proposal['race_time_id'], proposal['crew_id']) for proposal in proposals],
+            [(self.unassigned[3], 3), (self.unassigned[5], 5)],
+        )
+        self.assertGreater(proposals[0]['confidence'], 0.9)
+
+        response = self.client.post('/api/race-times/auto-assign/', {'min_confidence': 0.9}, format='json')
+        self.assertEqual(response.data, {'assigned': 2, 'rejected': []})
+        self.assertEqual(Crew.objects.get(id=3).raw_time, 900000)
+        self.assertEqual(self.client.get('/api/race-times/auto-assign/').data, [])
+
+        response = self.client.post('/api/race-times/auto-assign/', {'assignments': [{'race_time_id': self.unassigned[3], 'crew_id': 4}]}, format='json')
+        self.assertEqual(response.data['rejected'][0]['reason'], 'Race time is already assigned')
+
+
+class OffsetEstimationTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        self.reference = Race.objects.create(name='Race A', race_id='1', default_start=True, default_finish=True, is_timing_reference=True)
+        self.target = Race.objects.create(name='Race B', race_id='2')
+        RaceTimingSync.objects.create(reference_race=self.reference, target_race=self.target, timing_offset_ms=-4000)
+        for crew_id in range(1, 9):
+            Crew.objects.create(id=crew_id, name=f'Crew {crew_id}', club=club, event=event, status='Accepted')
+            for tap, time in [('Start', crew_id * 60000), ('Finish', crew_id * 60000 + 900000)]:
+                RaceTime.objects.create(sequence=crew_id, tap=tap, time_tap=time, crew_id=crew_id, race=self.reference)
+                # Race B's clock is 4.5s ahead give or take 50ms, with one tap on the wrong crew
+                target_time = time - 4500 + (crew_id % 3 - 1) * 50 + (120000 if (crew_id, tap) == (4, 'Finish') else 0)
+                RaceTime.objects.create(sequence=crew_id, tap=tap, time_tap=target_time, crew_id=crew_id, race=self.target)
+
+    def test_offset_is_estimated_without_outliers_and_saved(self):
+        [proposal] = self.client.get('/api/race-time-sync/estimate/').data
+        self.assertEqual(proposal['target_race_id'], self.target.id)
+        self.assertEqual((proposal['pairs'], proposal['outliers']), (16, 1))
+        self.assertEqual(proposal['offset_ms'], 4500)
+        self.assertEqual(proposal['max_residual_ms'], 50)
+        self.assertTrue(proposal['current_offset_mismatch'])
+
+        response = self.client.post('/api/race-time-sync/estimate/', {'target_race_id': self.target.id}, format='json')
+        self.assertEqual(response.data['timing_offset_ms'], 4500)
+        self.assertEqual(RaceTimingSync.objects.get().timing_offset_ms, 4500)
+
+        response = self.client.post('/api/race-time-sync/estimate/', {'target_race_id': self.reference.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_changing_an_offset_only_recalculates_crews_timed_on_the_race(self):
+        Crew.objects.filter(id=1).update(race_id_finish_override=self.target)
+        sync = RaceTimingSync.objects.get()
+        self.client.patch(f'/api/race-time-sync/{sync.id}/', {'timing_offset_ms': 4500}, format='json')
+
+        self.assertEqual(Crew.objects.get(id=1).raw_time, 900000)
+        self.assertIsNone(Crew.objects.get(id=2).raw_time)
+
+
+class RaceTimeSummaryTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        Crew.objects.create(id=1, name='Crew 1', club=club, event=event, status='Accepted')
+        Crew.objects.create(id=2, name='Crew 2', club=club, event=event, status='Scratched')
+        self.race = Race.objects.create(name='Race', race_id='1')
+        other_race = Race.objects.create(name='Other race', race_id='2')
+        for sequence, tap, crew_id in [(1, 'Start', 1), (2, 'Start', 2), (3, 'Start', None), (3, 'Finish', None), (4, 'Finish', 1)]:
+            RaceTime.objects.create(sequence=sequence, tap=tap, time_tap=sequence, crew_id=crew_id, race=self.race)
+        RaceTime.objects.create(sequence=1, tap='Start', time_tap=1, race=other_race)
+
+    def test_tap_summary_is_grouped_and_cached(self):
+        response = self.client.get(f'/api/race-times/?race_id={self.race.id}')
+        self.assertEqual(response.data['summary'], [{
+            'race_id': self.race.id,
+            'taps': {
+                'Finish': {'total': 2, 'assigned': 1, 'unassigned': 1},
+                'Start': {'total': 3, 'assigned': 2, 'unassigned': 1},
+            },
+            'scratched_crew_taps': 1,
+            'duplicate_sequences': [3],
+        }])
+        self.assertEqual((response.data['start_times_no_crew'], response.data['finish_times_no_crew']), (1, 1))
+
+        # The timing data version, then the page and its count
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/race-times/?page=2&page_size=2')
+        self.assertEqual(response.data['start_times_no_crew'], 2)
+
+        # Other filters count the unassigned taps they match
+        response = self.client.get(f'/api/race-times/?race_id={self.race.id}&tap=Finish')
+        self.assertEqual((response.data['start_times_no_crew'], response.data['finish_times_no_crew']), (0, 1))
+        response = self.client.get('/api/race-times/?search=Crew')
+        self.assertEqual((response.data['start_times_no_crew'], response.data['finish_times_no_crew']), (0, 0))
+
+        RaceTime.objects.filter(tap='Finish', crew__isnull=True).update(crew_id=2)
+        versions.bump(versions.RACE_TIMES)
+        response = self.client.get(f'/api/race-times/?race_id={self.race.id}')
+        self.assertEqual(response.data['summary'][0]['scratched_crew_taps'], 2)
+
+
+class DashboardStatsTests(APITestCase):
+
+    def setUp(self):
+        club = Club.objects.create(name='Rowing club', id=1)
+        event = Event.objects.create(name='Op 2x', override_name='Op 2x', id=1, type='Open', gender='Open')
+        Crew.objects.create(id=1, name='Crew 1', club=club, event=event, status='Accepted', bib_number=1, start_time=1000, finish_time=2000)
+        Crew.objects.create(id=2, name='Crew 2', club=club, event=event, status='Accepted', penalty=5)
+        Crew.objects.create(id=3, name='Crew 3', club=club, event=event, status='Scratched')
+        race = Race.objects.create(name='Race', race_id='1', is_timing_reference=True)
+        Race.objects.create(name='Other race', race_id='2')
+        RaceTime.objects.create(sequence=1, tap='Start', time_tap=1000, crew_id=1, race=race)
+        RaceTime.objects.create(sequence=2, tap='Start', time_tap=1500, race=race)
+
+    def test_stats_are_aggregated_and_cached(self):
+        response = self.client.get('/api/crews/stats/?phase=race')
+        self.assertEqual(response.data['phase'], 'race')
+        self.assertEqual(
+            [response.data[key] for key in ['total_crews_count', 'accepted_crews_count', 'scratched_crews_count', 'crews_with_penalties', 'races_count', 'race_times_count']],
+            [3, 2, 1, 1, 2, 2])
+        self.assertEqual(response.data['readiness']['pre-race']['crews_without_bib'], 1)
+        self.assertEqual(response.data['readiness']['race']['crews_without_times'], 1)
+        self.assertEqual(response.data['readiness']['race']['unassigned_taps'], 1)
+        self.assertEqual(response.data['readiness']['race']['unsynced_races'], 1)
+
+        # Only the data versions
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/crews/stats/?phase=pre-race')
+        self.assertEqual(response.data['phase'], 'pre-race')
+        self.assertEqual(response.data['race_times_count'], 2)
+
+        RaceTime.objects.filter(crew__isnull=True).update(crew_id=2)
+        versions.bump(versions.RACE_TIMES)
+        response = self.client.get('/api/crews/stats/')
+        self.assertEqual(response.data['readiness']['race']['unassigned_taps'], 0)
@@ -0,0 +1,87 @@
+"""
+Preloaded timing data for calculating crew times.
+
+TimingContext loads the races, sync offsets and race times once so start and
+finish taps, synchronised times and sequences can be resolved for any number of
+crews from in-memory lookups rather than several queries per crew.
+"""
+
+from .models import Crew, Race, RaceTime, RaceTimingSync
+
+
+class TimingContext:
+    def __init__(self, crews=None):
+        """
+        Load timing data for the given crews, or for every crew if crews is None.
+        """
+        races = list(Race.objects.all())
+        self.default_start_id = next(
+            (race.id for race in races if race.default_start), None
+        )
+        self.default_finish_id = next(
+            (race.id for race in races if race.default_finish), None
+        )
+        self.reference_race_ids = {
+            race.id for race in races if race.is_timing_reference
+        }
+        self.offsets = dict(
+            RaceTimingSync.objects.values_list("target_race_id", "timing_offset_ms")
+        )
+
+        # Only the default races and any crew overrides can be used for a crew's times
+        if crews is None:
+            overrides = Crew.objects.values_list(
+                "race_id_start_override", "race_id_finish_override"
+            ).distinct()
+        else:
+            crews = list(crews)
+            overrides = [
+                (crew.race_id_start_override_id, crew.race_id_finish_override_id)
+                for crew in crews
+            ]
+        race_ids = {self.default_start_id, self.default_finish_id}
+        for start_override, finish_override in overrides:
+            race_ids.update((start_override, finish_override))
+        race_ids.discard(None)
+
+        race_times = RaceTime.objects.filter(
+            race_id__in=race_ids, crew__isnull=False
+        ).order_by("id")
+        if crews is not None:
+            race_times = race_times.filter(crew_id__in=[crew.id for crew in crews])
+
+        # Keyed by (crew, race, tap); the first tap wins if a crew has duplicates
+        self.race_times = {}
+        for race_time in race_times.only(
+            "id", "sequence", "tap", "time_tap", "crew_id", "race_id"
+        ):
+            self.race_times.setdefault(
+                (race_time.crew_id, race_time.race_id, race_time.tap), race_time
+            )
+
+    @property
+    def has_default_races(self):
+        return self.default_start_id is not None and self.default_finish_id is not None
+
+    def start_race_id(self, crew):
+        return crew.race_id_start_override_id or self.default_start_id
+
+    def finish_race_id(self, crew):
+        return crew.race_id_finish_override_id or self.default_finish_id
+
+    def start_tap(self, crew):
+        """The RaceTime used as this crew's start, or None"""
+        return self.race_times.get((crew.id, self.start_race_id(crew), "Start"))
+
+    def finish_tap(self, crew):
+        """The RaceTime used as this crew's finish, or None"""
+        return self.race_times.get((crew.id, self.finish_race_id(crew), "Finish"))
+
+    def synchronized_time(self, time_tap, race_id):
+        """
+        Convert a tap from the given race to the reference timing system.
+        Races without a sync record are treated as already in sync.
+        """
+        if race_id in self.reference_race_ids:
+            return time_tap
+        return time_tap + self.offsets.get(race_id, 0)
@@ -21,6 +21,10 @@ from .views import masters_crews
 from .views import crew_dashboard_stats
 from .views import crew_start_order_duplicates_check
 from .views import crew_close_times_report
+from .views import job_status
+from .views import results
+from .views import instrumentation
+from .views import changes
 
 
 urlpatterns = [
@@ -44,6 +48,7 @@ urlpatterns = [
         name="crew-start-order-duplicates",
     ),
     path("crew-close-times/", crew_close_times_report.CloseTimesReportView.as_view(), name="crew-close-times"),
+    path("results/", results.ResultListView.as_view(), name="results-list"),
     path("results-export/", crews.ResultDataExport.as_view()),
     path("crew-update-rankings/", crews.CrewUpdateRankings.as_view()),
     path("crew-get-event-band/", crews.CrewGetEventBand.as_view()),
@@ -70,6 +75,7 @@ urlpatterns = [
     path("competitor-data-export/", competitors.CompetitorDataExport.as_view()),
     path("competitor-data-import/", competitors.CompetitorDataImport.as_view()),
     path("race-times/", times.RaceTimeListView.as_view()),
+    path("race-times/auto-assign/", times.RaceTimeAutoAssignView.as_view()),
     path("race-times/<int:pk>", times.RaceTimeDetailView.as_view()),
     path("crew-race-times-import/", times.ImportRaceTimes.as_view()),
     path(
@@ -96,6 +102,11 @@ urlpatterns = [
         marshalling_division.BulkUpdateMarshallingDivisions.as_view(),
         name="bulk-update-marshalling-divisions",
     ),
+    path(
+        "marshalling-divisions/check/",
+        marshalling_division.MarshallingDivisionCheck.as_view(),
+        name="check-marshalling-divisions",
+    ),
     path(
         "original-event-import/",
         original_event_category.OriginalEventCategoryImport.as_view(),
@@ -145,6 +156,11 @@ urlpatterns = [
         race_timing_sync.RaceTimingSyncListView.as_view(),
         name="race-timing-sync-list",
     ),
+    path(
+        "race-time-sync/estimate/",
+        race_timing_sync.RaceTimingSyncEstimateView.as_view(),
+        name="race-timing-sync-estimate",
+    ),
     path(
         "race-time-sync/<int:pk>/",
         race_timing_sync.RaceTimingSyncDetailView.as_view(),
@@ -178,4 +194,11 @@ urlpatterns = [
         masters_adjustments.MastersAdjustmentsImport.as_view(),
         name="masters-adjustment-import",
     ),
+    path("jobs/<int:pk>/", job_status.JobDetailView.as_view(), name="job-detail"),
+    path(
+        "instrumentation/",
+        instrumentation.InstrumentationStatsView.as_view(),
+        name="instrumentation-stats",
+    ),
+    path("changes/", changes.ChangesView.as_view(), name="changes"),
 ]
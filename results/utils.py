@@ -65,4 +65,17 @@ def parse_time_to_milliseconds(time_str):
         milliseconds
     )
     
-    return total_milliseconds
\ No newline at end of file
+    return total_milliseconds
+
+
+def format_time(milliseconds, decimals=2):
+    """
+    mm:ss.hh, or mm:ss.t if decimals is 1, from a time in milliseconds.
+    """
+    minutes = int((milliseconds / (1000 * 60)) % 60)
+    seconds = int((milliseconds / 1000) % 60)
+    if decimals == 1:
+        fraction = "%01d" % int((milliseconds / 100) % 10)
+    else:
+        fraction = "%02d" % int((milliseconds / 10) % 100)
+    return "%02d:%02d.%s" % (minutes, seconds, fraction)
@@ -0,0 +1,190 @@
+"""
+Version numbers for the data caches and the frontend are built from.
+
+Every change to a data domain (the crews, race times, races and their sync
+offsets, and each reference table) is recorded as a DataChange, whose id
+becomes the domain's version. Versions only ever go up and are kept in the
+database, so every process (web and worker) sees the same ones: a cache
+keyed on the versions it was built from is stale exactly when one of them
+has moved on.
+
+Model saves and deletes bump their domain through the receivers on the
+models. Bulk imports, recalculations and deletes that skip the signals bump
+it themselves, and code that saves many rows in one go must wrap them in
+collected() to record a single change rather than one per row.
+
+The changes also make up the change feed (/api/changes/?since=<cursor>):
+the crews touched since the versions in the cursor, so the frontend can
+refetch only those.
+Changes that could have touched any crew, or that have been pruned, tell it
+to reload everything instead.
+"""
+
+import operator
+import threading
+from contextlib import contextmanager
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import DataChange, DataVersion
+
+CREWS = "crews"
+RACE_TIMES = "race_times"
+# Races and the offsets between their timing systems
+SYNC_OFFSETS = "sync_offsets"
+
+# Reference tables
+EVENT_ORDERS = "event_orders"
+MARSHALLING_DIVISIONS = "marshalling_divisions"
+NUMBER_LOCATIONS = "number_locations"
+MASTERS_ADJUSTMENTS = "masters_adjustments"
+
+# The domains results worked out from the timing data depend on
+TIMING_DOMAINS = [CREWS, RACE_TIMES, SYNC_OFFSETS, MASTERS_ADJUSTMENTS]
+
+# Changes kept for the change feed, pruned every PRUNE_EVERY changes. Clients
+# further behind than this are told to reload everything.
+RETAINED_CHANGES = 10000
+PRUNE_EVERY = 500
+
+# Changes held by collected(), per thread
+_collecting = threading.local()
+
+
+def bump(domain, crew_ids=None):
+    """
+    Record a change to a domain and return its new version. crew_ids are the
+    crews the change touched, or None if it could be any of them. Inside
+    collected() the change is held and None returned.
+    """
+    if crew_ids is not None:
+        crew_ids = {crew_id for crew_id in crew_ids if crew_id is not None}
+
+    held = getattr(_collecting, "changes", None)
+    if held is not None:
+        if crew_ids is None or held.get(domain, set()) is None:
+            held[domain] = None
+        else:
+            held[domain] = held.get(domain, set()) | crew_ids
+        return None
+
+    with transaction.atomic(savepoint=False):
+        # Locking the domain's row orders its changes, so its version never
+        # passes over a change that commits after a later one. Bumps to other
+        # domains don't wait on it, so the change feed's cursor holds a
+        # version per domain.
+        list(
+            DataVersion.objects.select_for_update()
+            .filter(domain=domain)
+            .values_list("domain")
+        )
+        change = DataChange.objects.create(
+            domain=domain,
+            crew_ids=None if crew_ids is None else sorted(crew_ids),
+        )
+        if not DataVersion.objects.filter(domain=domain).update(version=change.id):
+            DataVersion.objects.create(domain=domain, version=change.id)
+        if change.id % PRUNE_EVERY == 0:
+            DataChange.objects.filter(id__lte=change.id - RETAINED_CHANGES).delete()
+    return change.id
+
+
+@contextmanager
+def collected():
+    """Record the changes bumped inside as one change per domain, on leaving"""
+    if getattr(_collecting, "changes", None) is not None:
+        yield
+        return
+
+    _collecting.changes = {}
+    try:
+        yield
+    finally:
+        changes, _collecting.changes = _collecting.changes, None
+    for domain, crew_ids in changes.items():
+        bump(domain, crew_ids)
+
+
+def data_versions():
+    """{domain: version} for every domain that has been bumped"""
+    return dict(DataVersion.objects.values_list("domain", "version"))
+
+
+def version(domain):
+    return (
+        DataVersion.objects.filter(domain=domain)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+def timing_data_version():
+    """The versions of the timing domains, as one comparable value"""
+    versions = data_versions()
+    return tuple(versions.get(domain, 0) for domain in TIMING_DOMAINS)
+
+
+def feed_cursor(versions):
+    """The change feed cursor for {domain: version}: "crews:12,race_times:15"..."""
+    return ",".join(f"{domain}:{version}" for domain, version in sorted(versions.items()))
+
+
+def parse_cursor(cursor):
+    """{domain: version} from a feed cursor; ValueError if it isn't one"""
+    since = {}
+    for part in cursor.split(","):
+        domain, separator, version = part.partition(":")
+        if not separator or not domain:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        since[domain] = int(version)
+    return since
+
+
+def changes_since(since=None):
+    """
+    The change feed after the cursor since ({domain: version}): every
+    domain's version, the cursor to pass next time, and the ids of the crews
+    changed since. all_crews is set (and crew_ids left empty) if any crew
+    could have changed, or since is None.
+
+    The cursor holds a version per domain, as only each domain's changes are
+    sure to commit in order (see bump()): a change in one domain can commit
+    after a later one in another, and a single number would pass over it.
+    Changes newer than their domain's version haven't been seen to commit
+    and are left for the next call.
+    """
+    versions = data_versions()
+    latest = max(versions.values(), default=0)
+
+    crew_ids = set()
+    all_crews = since is None
+    unseen = []
+    if not all_crews:
+        for domain, current in versions.items():
+            seen = since.get(domain, 0)
+            if current <= seen:
+                continue
+            if seen < latest - RETAINED_CHANGES:
+                # Changes after it may have been pruned
+                all_crews = True
+                break
+            unseen.append(Q(domain=domain, id__gt=seen, id__lte=current))
+
+    if not all_crews and unseen:
+        for changed in DataChange.objects.filter(
+            reduce(operator.or_, unseen)
+        ).values_list("crew_ids", flat=True):
+            if changed is None:
+                all_crews = True
+                break
+            crew_ids.update(changed)
+
+    return {
+        "cursor": feed_cursor(versions),
+        "versions": versions,
+        "all_crews": all_crews,
+        "crew_ids": [] if all_crews else sorted(crew_ids),
+    }
@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from ..serializers import  BandSerializer, PopulatedBandSerializer
 
 from ..models import Band, EventMeetingKey
+from ..versions import collected
 
 class BandListView(APIView): # used to populate the pulldown on the CrewTimeEdit page
 
@@ -17,6 +18,7 @@ class BandListView(APIView): # used to populate the pulldown on the CrewTimeEdit
 
 class BandDataImport(APIView):
 
+    @collected()
     def get(self, _request):
         # Start by deleting all existing bands
         Band.objects.all().delete()
@@ -0,0 +1,23 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..versions import changes_since, parse_cursor
+
+
+class ChangesView(APIView):
+    """
+    The change feed: every data domain's version, and the ids of the crews
+    changed since the cursor in ?since= (the 'cursor' of the last response).
+    all_crews means anything may have changed, so refetch it all. Without
+    since there is nothing to compare against, so all_crews is set.
+    """
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = parse_cursor(since)
+            except ValueError:
+                raise ValidationError({'since': 'The cursor from the last response is required'})
+        return Response(changes_since(since))
@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from ..serializers import WriteClubSerializer, ClubSerializer
 
 from ..models import Club, EventMeetingKey
+from ..versions import collected
 
 class ClubListView(APIView): # extend the APIView
 
@@ -18,6 +19,7 @@ class ClubListView(APIView): # extend the APIView
 
 class ClubDataImport(APIView):
 
+    @collected()
     def get(self, _request):
         # Start by deleting all existing clubs
         Club.objects.all().delete()
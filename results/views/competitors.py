@@ -1,17 +1,18 @@
-import csv
 import os
 import requests
-from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 
+from ..csv_export import CHUNK_SIZE, stream_csv
 from ..serializers import CompetitorSerializer, CompetitorExportSerializer
 
 from ..models import Competitor, Crew, EventMeetingKey
+from ..versions import collected
 
 class CompetitorDataImport(APIView):
 
+    @collected()
     def get(self, _request):
         # Start by deleting all existing competitors
         Competitor.objects.all().delete()
@@ -55,21 +56,7 @@ class CompetitorDataImport(APIView):
 class CompetitorDataExport(APIView):
 
     def get(self, _request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="competitordata.csv"'
-
-        crews = Crew.objects.filter(status__exact='Accepted')
-
-        serializer = CompetitorExportSerializer(crews, many=True)
-
-        crews = serializer.data
-
         header = CompetitorExportSerializer.Meta.fields
+        crews = Crew.objects.filter(status__exact='Accepted').values_list(*header)
 
-        writer = csv.DictWriter(response, fieldnames=header)
-        writer.writeheader()
-
-        for row in serializer.data:
-            writer.writerow(row)
-
-        return response
+        return stream_csv('competitordata.csv', header, crews.iterator(chunk_size=CHUNK_SIZE))
@@ -1,72 +1,107 @@
 from rest_framework import generics
 from rest_framework.response import Response
-from rest_framework import status
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Count, Q, Exists, OuterRef
+from django.db.models import Count, Q
 from ..models import Race, Crew, RaceTime, OriginalEventCategory, EventOrder, MarshallingDivision, NumberLocation
+from ..versions import data_versions
+
+# Stats are kept until the data changes; this only bounds how long those for
+# old versions stay in the cache
+STATS_TIMEOUT = 60 * 60
+
+
+def no_time(field):
+    return Q(**{f'{field}__isnull': True}) | Q(**{field: 0})
+
 
 class DataOverviewStatsView(generics.GenericAPIView):
     """
-    Get stats for Crew dashboard
+    Get stats for Crew dashboard. Every phase's stats and readiness checks
+    come from one aggregate query per table, cached until the data changes
+    (see results/versions.py), so polling widgets only cost a version lookup.
     """
-    
+
     def get(self, request, *args, **kwargs):
         phase = request.query_params.get('phase', 'pre-race')
 
-
         stats = self.get_stats_data(phase)
         return Response(stats)
 
     def get_stats_data(self, phase):
-        """
-        Get stats based on phase - only calculate what's needed
-        """
-        stats = {
-            'phase': phase,
-            'last_updated': timezone.now().isoformat()
-        }
-        
-        # Common stats for all phases
-        stats.update(self.get_common_stats())
-        
-        # Phase-specific stats
-        if phase == 'pre-race':
+        versions = data_versions()
+        cache_key = 'dashboard_stats:' + ':'.join(f'{domain}={version}' for domain, version in sorted(versions.items()))
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = {'last_updated': timezone.now().isoformat()}
+            stats.update(self.get_crew_stats())
             stats.update(self.get_prerace_stats())
-        elif phase == 'race':
             stats.update(self.get_race_stats())
-        
-        return stats
+            stats['readiness'] = self.get_readiness(stats)
+            cache.set(cache_key, stats, STATS_TIMEOUT)
+        return {'phase': phase, **stats}
+
+    def get_crew_stats(self):
+        """Crew counts by status, with the readiness checks, in one query"""
+        accepted = Q(status='Accepted')
+        counts = Crew.objects.aggregate(
+            total_crews_count=Count('id'),
+            scratched_crews_count=Count('id', filter=Q(status='Scratched')),
+            withdrawn_crews_count=Count('id', filter=Q(status='Withdrawn')),
+            accepted_crews_count=Count('id', filter=accepted),
+            submitted_crews_count=Count('id', filter=Q(status='Submitted')),
+            masters_crews_count=Count('id', filter=Q(event_band__icontains='mas')),
+            crews_with_penalties=Count('id', filter=Q(penalty__gt=0)),
+            accepted_crews_without_bib=Count('id', filter=accepted & Q(bib_number__isnull=True)),
+            accepted_crews_without_start_order=Count('id', filter=accepted & Q(calculated_start_order__isnull=True)),
+            accepted_crews_without_start_time=Count('id', filter=accepted & no_time('start_time')),
+            accepted_crews_without_finish_time=Count('id', filter=accepted & no_time('finish_time')),
+            crews_requiring_recalculation=Count('id', filter=accepted & Q(requires_recalculation=True)),
+        )
+        return counts
 
-    def get_common_stats(self):
-        """Stats needed across all phases"""
-        return {
-            'total_crews_count': Crew.objects.count(),
-            'scratched_crews_count': Crew.objects.filter(status__exact='Scratched').count(),
-            'withdrawn_crews_count': Crew.objects.filter(status__exact='Withdrawn').count(),
-            'accepted_crews_count': Crew.objects.filter(status__exact='Accepted').count(),
-            'submitted_crews_count': Crew.objects.filter(status__exact='Submitted').count(),
-        }
-    
     def get_prerace_stats(self):
-        """Stats specific to pre-race phase"""
+        """Reference table counts"""
         return {
             'event_order_count': EventOrder.objects.count(),
             'marshalling_divisions_count': MarshallingDivision.objects.count(),
             'number_locations_count': NumberLocation.objects.count(),
         }
-    
+
     def get_race_stats(self):
-        """Stats specific to race phase"""
-        original_events = OriginalEventCategory.objects.count() if OriginalEventCategory.objects.exists() else 0
+        """Races and their taps, a query for each table"""
+        races = Race.objects.aggregate(
+            races_count=Count('id', distinct=True),
+            timing_reference_count=Count('id', filter=Q(is_timing_reference=True), distinct=True),
+            unsynced_races_count=Count('id', filter=Q(is_timing_reference=False, sync_as_target__isnull=True), distinct=True),
+        )
+        race_times = RaceTime.objects.aggregate(
+            race_times_count=Count('id'),
+            unassigned_race_times_count=Count('id', filter=Q(crew__isnull=True)),
+        )
+        return {
+            **races,
+            **race_times,
+            'original_event_categories_imported': OriginalEventCategory.objects.count(),
+        }
 
+    def get_readiness(self, stats):
+        """What is still to do before each phase, from the counts above"""
         return {
-            'races_count': Race.objects.count(),
-            'race_times_count': RaceTime.objects.count(),
-            'race_times_count': RaceTime.objects.count(),
-            'original_event_categories_imported': original_events,
-            'masters_crews_count': Crew.objects.filter(
-                Q(event_band__icontains='mas')
-            ).count(),
-            'crews_with_penalties': Crew.objects.filter(Q(penalty__gt=0)).count()
+            'pre-race': {
+                'crews_without_bib': stats['accepted_crews_without_bib'],
+                'crews_without_start_order': stats['accepted_crews_without_start_order'],
+                'event_orders_imported': stats['event_order_count'] > 0,
+                'marshalling_divisions_imported': stats['marshalling_divisions_count'] > 0,
+                'number_locations_imported': stats['number_locations_count'] > 0,
+            },
+            'race': {
+                'crews_without_times': max(stats['accepted_crews_without_start_time'], stats['accepted_crews_without_finish_time']),
+                'crews_without_start_time': stats['accepted_crews_without_start_time'],
+                'crews_without_finish_time': stats['accepted_crews_without_finish_time'],
+                'unassigned_taps': stats['unassigned_race_times_count'],
+                'unsynced_races': stats['unsynced_races_count'],
+                'timing_reference_set': stats['timing_reference_count'] > 0,
+                'crews_requiring_recalculation': stats['crews_requiring_recalculation'],
+            },
         }
-        
\ No newline at end of file
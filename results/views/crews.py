@@ -11,6 +11,7 @@ from django.db import transaction
 from django.db.models import Min, Avg, Q
 from rest_framework import status
 from django.http import Http404, HttpResponse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -27,11 +28,27 @@ from ..serializers import (
     CrewSerializerLimited,
     CSVUpdateCrewSerializer,
     PopulatedCrewSerializer,
-    WriteCrewSerializer,
     CrewExportSerializer,
+    JobSerializer,
 )
 
-from ..models import Crew, Race, RaceTime, OriginalEventCategory, EventMeetingKey
+from .. import jobs
+from ..crew_import import import_crews, sync_crews
+from ..csv_export import (
+    CHUNK_SIZE,
+    blade_image,
+    export_rows,
+    manual_override_time,
+    masters_adjusted_time,
+    stream_csv,
+    timestamped_filename,
+)
+from ..lookups import CrewLookups
+from ..masters import MastersHandicap
+from ..models import Crew, Race, EventMeetingKey, ResultSnapshot
+from ..ranking import rank_groups
+from ..utils import format_time
+from ..versions import collected
 
 
 class CrewListView(generics.ListCreateAPIView):
@@ -62,9 +79,14 @@ class CrewListView(generics.ListCreateAPIView):
         "event__gender",
     ]
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["lookups"] = CrewLookups()
+        return context
+
     def get_queryset(self):
         """Get queryset to return based on params"""
-        queryset = Crew.objects.all().select_related("club", "event")
+        queryset = PopulatedCrewSerializer.setup_eager_loading(Crew.objects.all())
         status_list = self.request.query_params.getlist("status[]")  # Note the []
         if status_list:
             print(f"Filtering by status: {status_list}")
@@ -131,6 +153,7 @@ class CrewListOptionsForSelect(APIView):
 
 
 class CrewGetEventBand(APIView):
+    @collected()
     def get(self, _request):
         crews = Crew.objects.filter(
             status__exact="Accepted"
@@ -141,34 +164,28 @@ class CrewGetEventBand(APIView):
 
     def get_event_and_names(self, crews):
         # Get event band for all crews
+        changed = []
         for crew in crews:
+            previous = (crew.event_band, crew.competitor_names)
             crew.event_band = crew.calc_event_band()
             crew.competitor_names = crew.get_competitor_names()
             crew.save()
+            if (crew.event_band, crew.competitor_names) != previous:
+                changed.append(crew.id)
+        # Names and event bands are shown on the results
+        ResultSnapshot.refresh(changed)
 
 
 class UpdateStartOrdersView(APIView):
     """
     API endpoint to recalculate start orders for all crews.
     Call this when crew statuses change or you need to refresh calculations.
+    The work is queued as a background job - poll /api/jobs/<id>/ for progress.
     """
 
     def post(self, request):
-        try:
-            updated_count = Crew.update_start_order_calcs()
-            return Response(
-                {
-                    "success": True,
-                    "message": f"Successfully updated start orders for {updated_count} crews",
-                    "updated_crews": updated_count,
-                },
-                status=status.HTTP_200_OK,
-            )
-        except Exception as e:
-            return Response(
-                {"success": False, "message": f"Error updating start orders: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        job = jobs.enqueue(jobs.START_ORDERS)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
 class CrewUpdateRankings(APIView):
@@ -177,31 +194,9 @@ class CrewUpdateRankings(APIView):
     """
 
     def get(self, _request):
-        """Get crews for recalculation"""
-        crews = Crew.objects.filter(status__exact="Accepted")
-        serializer = CrewSerializer(crews, many=True)
-        self.update_timing_calcs(crews)
-        return Response(serializer.data)
-
-    def update_timing_calcs(self, crews):
-        """Recalculate rankings for all crews"""
-
-        for crew in crews:
-            crew.event_band = crew.calc_event_band()
-            crew.raw_time = crew.calc_raw_time()
-            crew.race_time = crew.calc_race_time()
-            crew.published_time = crew.calc_published_time()
-            crew.start_time = crew.calc_start_time()
-            crew.finish_time = crew.calc_finish_time()
-            crew.overall_rank = crew.calc_overall_rank()
-            crew.gender_rank = crew.calc_gender_rank()
-            crew.category_rank = crew.calc_category_rank()
-            crew.category_position_time = crew.calc_category_position_time()
-            crew.start_sequence = crew.calc_start_sequence()
-            crew.finish_sequence = crew.calc_finish_sequence()
-            crew.masters_adjustment = crew.calc_masters_adjustment()
-            crew.requires_recalculation = False
-            crew.save()
+        """Queue a recalculation of all crews and return the job"""
+        job = jobs.enqueue(jobs.RECOMPUTE)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
 class CrewDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -213,22 +208,31 @@ class CrewDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PopulatedCrewSerializer
 
     def perform_update(self, serializer):
+        # The crew may be moving event band or gender, so its old groups need re-ranking too
+        previous_groups = rank_groups(serializer.instance)
         super().perform_update(serializer)
         
         try:
-            Crew.update_all_computed_properties()
+            Crew.update_computed_properties_for(
+                [serializer.instance.id], previous_groups=previous_groups
+            )
         except Exception as e:
             print(f"Error updating computed properties: {e}")
 
+    def perform_destroy(self, instance):
+        crew_id = instance.id
+        super().perform_destroy(instance)
+        ResultSnapshot.refresh([crew_id])
 
-class CrewDataImport(APIView):
 
-    def get(self, _request, personal=0):
-        # Start by deleting all existing crews and times
-        Crew.objects.all().delete()
-        RaceTime.objects.all().delete()
-        OriginalEventCategory.objects.all().delete()
+class CrewDataImport(APIView):
+    """
+    Update the crews from BROE. New crews are added, changed crews updated and
+    crews no longer in BROE marked as removed. Pass ?replace=true to delete
+    all crews, times and original event categories and reload instead.
+    """
 
+    def get(self, request, personal=0):
         Meeting = EventMeetingKey.objects.get(
             current_event_meeting=True
         ).event_meeting_key
@@ -237,72 +241,18 @@ class CrewDataImport(APIView):
         UserAuth = os.getenv("USERAUTH")  # As supplied in email
 
         header = {"Authorization": UserAuth}
-        request = {"api_key": UserAPI, "meetingIdentifier": Meeting}
+        payload = {"api_key": UserAPI, "meetingIdentifier": Meeting}
 
         url = "https://webapi.britishrowing.org/api/OE2CrewInformation"  # change ENDPOINTNAME for the needed endpoint eg OE2MeetingSetup
 
-        r = requests.post(url, json=request, headers=header)
+        r = requests.post(url, json=payload, headers=header)
         if r.status_code == 200:
-            # pprint(r.json())
-
-            for crew in r.json()["crews"]:
-
-                if crew["competitionNotes"] == "TO" or crew["notes"] == "TO":
-                    time_only = True
-                else:
-                    time_only = False
-
-                host_club_value = crew[
-                    "boatingPermissionsClubID"
-                ]  # This will be None if null
-
-                if personal > 0:
-
-                    data = {
-                        "name": crew["name"],
-                        "id": crew["id"],
-                        "composite_code": crew["compositeCode"],
-                        "club": crew["clubId"],
-                        "rowing_CRI": crew["rowingCRI"],
-                        "sculling_CRI": crew["scullingCRI"],
-                        "event": crew["eventId"],
-                        "status": crew["status"],
-                        "bib_number": crew["customCrewNumber"],
-                        "band": crew["bandId"],
-                        "host_club": host_club_value,
-                        "otd_contact": crew["competitionContactName"],
-                        "otd_home_phone": crew["competitionContactHomePhone"],
-                        "otd_mobile_phone": crew["competitionContactMobilePhone"],
-                        "otd_work_phone": crew["competitionContactWorkPhone"],
-                        "submitting_administrator_email": crew[
-                            "submittingAdministratorEmail"
-                        ],
-                        "time_only": time_only,
-                    }
-
-                else:
-                    data = {
-                        "name": crew["name"],
-                        "id": crew["id"],
-                        "composite_code": crew["compositeCode"],
-                        "club": crew["clubId"],
-                        "rowing_CRI": crew["rowingCRI"],
-                        "sculling_CRI": crew["scullingCRI"],
-                        "event": crew["eventId"],
-                        "status": crew["status"],
-                        "bib_number": crew["customCrewNumber"],
-                        "band": crew["bandId"],
-                        "host_club": host_club_value,
-                        "time_only": time_only,
-                    }
-
-                serializer = WriteCrewSerializer(data=data)
-                serializer.is_valid(raise_exception=True)
-                serializer.save()
-
-            crews = Crew.objects.all()
-            serializer = WriteCrewSerializer(crews, many=True)
-            return Response(serializer.data)
+            if self.request.query_params.get("replace") == "true":
+                counts = import_crews(r.json()["crews"], personal=personal > 0)
+            else:
+                counts = sync_crews(r.json()["crews"], personal=personal > 0)
+
+            return Response({**counts, "imported": timezone.now()})
 
         return Response(status=400)
 
@@ -310,165 +260,175 @@ class CrewDataImport(APIView):
 class CrewDataExport(APIView):
     def get(self, _request):
 
-        filename = "crewdataforimporttobroe - " + datetime.datetime.now().strftime(
-            "%Y-%m-%d-%H-%M.csv"
-        )
+        filename = timestamped_filename("crewdataforimporttobroe")
 
         crews = Crew.objects.filter(status__exact="Accepted")
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="' + filename + '"'
-        writer = csv.writer(response, delimiter=",")
-        writer.writerow(
-            [
-                "Crew ID",
-                "Event ID",
-                "Event",
-                "Band",
-                "Division",
-                "Crew Name",
-                "Crew Club",
-                "Position In Event",
-                "Raw Time",
-                "Time",
-                "Status",
-            ]
-        )
-
-        for crew in crews:
-
-            if crew.manual_override_time > 0:
-                raw_time = crew.manual_override_time
+        fields = [
+            "id",
+            "event_id",
+            "event__name",
+            "band__name",
+            "name",
+            "club__name",
+            "category_rank",
+            "raw_time",
+            "published_time",
+            "race_time",
+            "masters_adjustment",
+            "manual_override_minutes",
+            "manual_override_seconds",
+            "manual_override_hundredths_seconds",
+            "time_only",
+            "disqualified",
+            "did_not_start",
+            "did_not_finish",
+        ]
+
+        def format_row(crew):
+            if manual_override_time(crew) > 0:
+                raw_time = manual_override_time(crew)
             else:
-                raw_time = crew.raw_time
+                raw_time = crew["raw_time"] or 0
 
             if raw_time == 0:
                 rank = 0
             else:
-                rank = crew.category_rank
+                rank = crew["category_rank"]
 
-            if raw_time > 0 and crew.time_only:
+            if raw_time > 0 and crew["time_only"]:
                 status = "Time Only"
-            elif crew.disqualified:
+            elif crew["disqualified"]:
                 status = "Disqualified"
-            elif crew.did_not_start:
+            elif crew["did_not_start"]:
                 status = "Did not start"
-            elif crew.did_not_finish:
+            elif crew["did_not_finish"]:
                 status = "Did not finish"
-            elif raw_time == 0 or raw_time is None:
+            elif raw_time == 0:
                 status = "Did not start"
             elif raw_time > 0:
                 status = "Finished"
-
-            if crew.band is None:
-                band = ""
-            else:
-                band = crew.band.name
-
-            if raw_time > 0:
-                hundredths = int((raw_time / 10) % 100)
-                seconds = int((raw_time / 1000) % 60)
-                minutes = int((raw_time / (1000 * 60)) % 60)
-
-                raw_time = (
-                    str("%02d" % minutes)
-                    + ":"
-                    + str("%02d" % seconds)
-                    + "."
-                    + str("%02d" % hundredths)
-                )
             else:
-                raw_time = 0
-
-            if crew.masters_adjusted_time > 0:
-                hundredths = int((crew.masters_adjusted_time / 10) % 100)
-                seconds = int((crew.masters_adjusted_time / 1000) % 60)
-                minutes = int((crew.masters_adjusted_time / (1000 * 60)) % 60)
-                race_time = (
-                    str("%02d" % minutes)
-                    + ":"
-                    + str("%02d" % seconds)
-                    + "."
-                    + str("%02d" % hundredths)
-                )
+                status = ""
 
-            elif crew.published_time > 0:
-                hundredths = int((crew.published_time / 10) % 100)
-                seconds = int((crew.published_time / 1000) % 60)
-                minutes = int((crew.published_time / (1000 * 60)) % 60)
-
-                race_time = (
-                    str("%02d" % minutes)
-                    + ":"
-                    + str("%02d" % seconds)
-                    + "."
-                    + str("%02d" % hundredths)
-                )
+            if masters_adjusted_time(crew) > 0:
+                race_time = format_time(masters_adjusted_time(crew))
+            elif (crew["published_time"] or 0) > 0:
+                race_time = format_time(crew["published_time"])
             else:
                 race_time = 0
 
-            writer.writerow(
-                [
-                    crew.id,
-                    crew.event.id,
-                    crew.event.name,
-                    band,
-                    "",
-                    crew.name,
-                    crew.club.name,
-                    rank,
-                    raw_time,
-                    race_time,
-                    status,
-                ]
-            )
+            return [
+                crew["id"],
+                crew["event_id"],
+                crew["event__name"],
+                crew["band__name"] or "",
+                "",
+                crew["name"],
+                crew["club__name"],
+                rank,
+                format_time(raw_time) if raw_time > 0 else 0,
+                race_time,
+                status,
+            ]
 
-        return response
+        return stream_csv(
+            filename,
+            [
+                "Crew ID",
+                "Event ID",
+                "Event",
+                "Band",
+                "Division",
+                "Crew Name",
+                "Crew Club",
+                "Position In Event",
+                "Raw Time",
+                "Time",
+                "Status",
+            ],
+            export_rows(crews, fields, format_row),
+        )
 
 
 class BibDataExport(APIView):
     def get(self, _request):
-        filename = "bibdata - " + datetime.datetime.now().strftime("%Y-%m-%d-%H-%M.csv")
+        filename = timestamped_filename("bibdata")
 
-        crews = Crew.objects.filter(status__exact="Accepted")
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="' + filename + '"'
+        crews = Crew.objects.filter(status__exact="Accepted").values_list(
+            "id", "name", "calculated_start_order"
+        )
 
-        writer = csv.writer(response, delimiter=",")
-        writer.writerow(
+        return stream_csv(
+            filename,
             [
                 "Crew ID",
                 "Crew",
                 "Bib",
-            ]
+            ],
+            crews.iterator(chunk_size=CHUNK_SIZE),
         )
 
-        for crew in crews:
-
-            writer.writerow(
-                [
-                    crew.id,
-                    crew.name,
-                    crew.calculated_start_order,
-                ]
-            )
-
-        return response
-
 
 class StartOrderDataExport(APIView):
     def get(self, _request):
-        filename = "startorderdata - " + datetime.datetime.now().strftime(
-            "%Y-%m-%d-%H-%M.csv"
-        )
+        filename = timestamped_filename("startorderdata")
 
         crews = Crew.objects.filter(status__in=["Accepted", "Scratched"]).order_by(
             "bib_number"
         )
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="' + filename + '"'
+        fields = [
+            "id",
+            "status",
+            "bib_number",
+            "name",
+            "competitor_names",
+            "club__name",
+            "club__blade_image",
+            "composite_code",
+            "event_band",
+            "host_club__name",
+            "calculated_start_order",
+            "time_only",
+        ]
+        # Both tables against one read of their versions
+        lookups = CrewLookups()
+        number_location_for_club = lookups.number_locations
+        marshalling_division = lookups.marshalling_divisions
+
+        def format_row(crew):
+            if crew["competitor_names"] is None:
+                crew_name = crew["name"]
+            else:
+                crew_name = crew["competitor_names"]
 
-        writer = csv.writer(response, delimiter=",")
-        writer.writerow(
+            number_location = number_location_for_club.get(crew["host_club__name"])
+            if number_location is None:
+                number_location = "⚠️ Missing number location!"
+
+            if crew["time_only"]:
+                time_only = "TO"
+            else:
+                time_only = ""
+
+            return [
+                crew["id"],
+                crew["status"],
+                crew["bib_number"],
+                crew_name,
+                crew["club__name"],
+                blade_image(crew["club__blade_image"]),
+                crew["composite_code"],
+                crew["event_band"],
+                crew["host_club__name"],
+                number_location,
+                marshalling_division(
+                    crew["bib_number"], crew["calculated_start_order"]
+                ),
+                time_only,
+            ]
+
+        return stream_csv(
+            filename,
             [
                 "Id",
                 "Status",
@@ -482,48 +442,10 @@ class StartOrderDataExport(APIView):
                 "Number location",
                 "Marshalling division",
                 "Time only",
-            ]
+            ],
+            export_rows(crews, fields, format_row),
         )
 
-        for crew in crews:
-
-            if crew.competitor_names is None:
-                crew_name = crew.name
-            else:
-                crew_name = crew.competitor_names
-
-            if crew.club.blade_image:
-                image = '=IMAGE("' + crew.club.blade_image + '")'
-
-            if crew.number_location is None:
-                number_location = "⚠️ Missing number location!"
-            else:
-                number_location = crew.number_location
-
-            if crew.time_only:
-                time_only = "TO"
-            else:
-                time_only = ""
-
-            writer.writerow(
-                [
-                    crew.id,
-                    crew.status,
-                    crew.bib_number,
-                    crew_name,
-                    crew.club.name,
-                    image,
-                    crew.composite_code,
-                    crew.event_band,
-                    crew.host_club.name,
-                    number_location,
-                    crew.marshalling_division,
-                    time_only,
-                ]
-            )
-
-        return response
-
 
 class CrewStartOrderDataExport(APIView):
     def get(self, _request):
@@ -531,80 +453,85 @@ class CrewStartOrderDataExport(APIView):
         crews = Crew.objects.filter(status__in=["Accepted", "Scratched"]).order_by(
             "bib_number"
         )
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = (
-            'attachment; filename="crewstartorderdata.csv"'
-        )
-
-        writer = csv.writer(response, delimiter=",")
-        writer.writerow(
-            ["Bib", "Crew No", "Crew", "Club name", "Club code", "Event band"]
-        )
-
-        for crew in crews:
-
-            if crew.competitor_names is None:
-                crew_name = crew.name
+        fields = [
+            "bib_number",
+            "id",
+            "status",
+            "name",
+            "competitor_names",
+            "club__name",
+            "club__index_code",
+            "event_band",
+        ]
+
+        def format_row(crew):
+            if crew["competitor_names"] is None:
+                crew_name = crew["name"]
             else:
-                crew_name = crew.competitor_names
-
-            writer.writerow(
-                [
-                    crew.bib_number,
-                    crew.id,
-                    crew.status,
-                    crew_name,
-                    crew.club.name,
-                    crew.club.index_code,
-                    crew.event_band,
-                ]
-            )
+                crew_name = crew["competitor_names"]
+
+            return [
+                crew["bib_number"],
+                crew["id"],
+                crew["status"],
+                crew_name,
+                crew["club__name"],
+                crew["club__index_code"],
+                crew["event_band"],
+            ]
 
-        return response
+        return stream_csv(
+            "crewstartorderdata.csv",
+            ["Bib", "Crew No", "Crew", "Club name", "Club code", "Event band"],
+            export_rows(crews, fields, format_row),
+        )
 
 
 class CrewWebScorerDataExport(APIView):
     def get(self, _request):
 
-        filename = "webscorerdata - " + datetime.datetime.now().strftime(
-            "%Y-%m-%d-%H-%M.csv"
-        )
+        filename = timestamped_filename("webscorerdata")
 
         crews = Crew.objects.filter(status__exact="Accepted").order_by("bib_number")
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="' + filename + '"'
-
-        writer = csv.writer(response, delimiter=",")
-        writer.writerow(
-            ["Name", "Team name", "Team name 2", "Category", "Bib", "Info 1"]
-        )
-
-        for crew in crews:
-
-            if crew.competitor_names is None:
-                crew_name = crew.club.index_code + " - " + crew.name
+        fields = [
+            "id",
+            "name",
+            "competitor_names",
+            "club__name",
+            "club__index_code",
+            "event_band",
+            "bib_number",
+            "status",
+        ]
+
+        def format_row(crew):
+            if crew["competitor_names"] is None:
+                crew_name = crew["club__index_code"] + " - " + crew["name"]
             else:
                 crew_name = (
-                    crew.club.index_code
+                    crew["club__index_code"]
                     + " - "
-                    + crew.competitor_names.rsplit("/", 1)[-1]
+                    + crew["competitor_names"].rsplit("/", 1)[-1]
                 )
 
-            writer.writerow(
-                [
-                    crew_name,
-                    crew.club.name,
-                    crew.id,
-                    crew.event_band,
-                    crew.bib_number,
-                    crew.status,
-                ]
-            )
+            return [
+                crew_name,
+                crew["club__name"],
+                crew["id"],
+                crew["event_band"],
+                crew["bib_number"],
+                crew["status"],
+            ]
 
-        return response
+        return stream_csv(
+            filename,
+            ["Name", "Team name", "Team name 2", "Category", "Bib", "Info 1"],
+            export_rows(crews, fields, format_row),
+        )
 
 
 class CreateEventOrderTemplate(APIView):
+    @collected()
     def get(self, _request):
 
         filename = "eventordertemplate - " + datetime.datetime.now().strftime(
@@ -684,6 +611,7 @@ class CreatePenaltiesTemplate(APIView):
 class CSVImportPenalties(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
+    @collected()
     def post(self, request):
         """
         Import CSV file that includes penalties based on bib number match
@@ -728,6 +656,7 @@ class CSVImportPenalties(APIView):
 
 
 class CrewBulkUpdateOverridesView(APIView):
+    @collected()
     def patch(self, request):
         updates = request.data.get("updates", [])
         if not updates:
@@ -777,152 +706,113 @@ class ResultDataExport(APIView):
 
     def get(self, _request):
 
-        filename = "resultdataexport - " + datetime.datetime.now().strftime(
-            "%Y-%m-%d-%H-%M.csv"
-        )
+        filename = timestamped_filename("resultdataexport")
 
         crews = Crew.objects.filter(
             status__exact="Accepted",
             published_time__gt=0,
         ).order_by("overall_rank")
-        fastest_female_scull = (
-            Crew.objects.all()
-            .filter(
-                event_band__startswith="W", event_band__contains="2x", raw_time__gt=0
-            )
-            .aggregate(Min("raw_time"))
-        )
-        fastest_female_sweep = (
-            Crew.objects.all()
-            .filter(
-                event_band__startswith="W", event_band__contains="2-", raw_time__gt=0
-            )
-            .aggregate(Min("raw_time"))
-        )
-        fastest_mixed_scull = (
-            Crew.objects.all()
-            .filter(
-                event_band__startswith="Mx", event_band__contains="2x", raw_time__gt=0
-            )
-            .aggregate(Min("raw_time"))
-        )
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="' + filename + '"'
-
-        writer = csv.writer(response, delimiter=",")
-        writer.writerow(
-            [
-                "Id",
-                "Overall pos",
-                "No",
-                "Time",
-                "Mas adj time",
-                "Blade(img)",
-                "Club",
-                "Crew",
-                "Com code",
-                "Category",
-                "Pos in Cat",
-                "Pennant",
-                "Trophy",
-                "Penalty",
-                "Time only",
-            ]
-        )
-
-        for crew in crews:
-
-            if crew.published_time == 0:
+        fields = [
+            "id",
+            "overall_rank",
+            "bib_number",
+            "published_time",
+            "race_time",
+            "masters_adjustment",
+            "club__name",
+            "club__blade_image",
+            "competitor_names",
+            "composite_code",
+            "event_band",
+            "category_rank",
+            "penalty",
+            "time_only",
+        ]
+        # Same baselines as the masters adjustment, in one query
+        fastest_times = MastersHandicap().fastest_times
+        trophy_times = {
+            fastest_times["fastest_female_scull"],
+            fastest_times["fastest_female_sweep"],
+            fastest_times["fastest_mixed_scull"],
+        }
+
+        def format_row(crew):
+            if crew["published_time"] == 0:
                 rank = 0
             else:
-                rank = crew.overall_rank
-
-            if crew.published_time > 0:
-                tenths = int((crew.published_time / 100) % 10)
-                seconds = int((crew.published_time / 1000) % 60)
-                minutes = int((crew.published_time / (1000 * 60)) % 60)
-
-                published_time = (
-                    str("%02d" % minutes)
-                    + ":"
-                    + str("%02d" % seconds)
-                    + "."
-                    + str("%01d" % tenths)
-                )
+                rank = crew["overall_rank"]
+
+            if crew["published_time"] > 0:
+                published_time = format_time(crew["published_time"], decimals=1)
             else:
                 published_time = 0
 
-            if crew.masters_adjusted_time > 0:
-                tenths = int((crew.masters_adjusted_time / 100) % 10)
-                seconds = int((crew.masters_adjusted_time / 1000) % 60)
-                minutes = int((crew.masters_adjusted_time / (1000 * 60)) % 60)
-
-                masters_adjusted_time = (
-                    str("%02d" % minutes)
-                    + ":"
-                    + str("%02d" % seconds)
-                    + "."
-                    + str("%01d" % tenths)
-                )
+            if masters_adjusted_time(crew) > 0:
+                adjusted_time = format_time(masters_adjusted_time(crew), decimals=1)
             else:
-                masters_adjusted_time = ""
+                adjusted_time = ""
 
-            if crew.penalty > 0:
+            if crew["penalty"] > 0:
                 penalty = "P"
             else:
                 penalty = ""
 
-            if crew.time_only:
+            if crew["time_only"]:
                 time_only = "TO"
             else:
                 time_only = ""
 
-            if crew.category_rank == 0:
+            if crew["category_rank"] == 0:
                 category_rank = ""
             else:
-                category_rank = crew.category_rank
+                category_rank = crew["category_rank"]
 
-            if crew.category_rank == 1:
+            if crew["category_rank"] == 1:
                 pennant = '=IMAGE("https://www.bblrc.co.uk/wp-content/uploads/2021/09/pennant-ph80.png")'
             else:
                 pennant = ""
 
-            if (
-                crew.overall_rank == 1
-                or crew.published_time == fastest_female_scull["raw_time__min"]
-                or crew.published_time == fastest_female_sweep["raw_time__min"]
-                or crew.published_time == fastest_mixed_scull["raw_time__min"]
-            ):
+            if crew["overall_rank"] == 1 or crew["published_time"] in trophy_times:
                 trophy = '=IMAGE("https://www.bblrc.co.uk/wp-content/uploads/2023/10/trophy_PH-2.jpg")'
             else:
                 trophy = ""
 
-            if crew.club.blade_image:
-                image = '=IMAGE("' + crew.club.blade_image + '")'
-
-            writer.writerow(
-                [
-                    crew.id,
-                    rank,
-                    crew.bib_number,
-                    published_time,
-                    masters_adjusted_time,
-                    image,
-                    crew.club.name,
-                    crew.competitor_names,
-                    crew.composite_code,
-                    crew.event_band,
-                    category_rank,
-                    pennant,
-                    trophy,
-                    penalty,
-                    time_only,
-                ]
-            )
-
-            # print(crew.calc_published_time)
-            # print(fastest_female_scull)
-            # print(fastest_female_sweep)
-            # print(fastest_mixed_scull)
+            return [
+                crew["id"],
+                rank,
+                crew["bib_number"],
+                published_time,
+                adjusted_time,
+                blade_image(crew["club__blade_image"]),
+                crew["club__name"],
+                crew["competitor_names"],
+                crew["composite_code"],
+                crew["event_band"],
+                category_rank,
+                pennant,
+                trophy,
+                penalty,
+                time_only,
+            ]
 
-        return response
+        return stream_csv(
+            filename,
+            [
+                "Id",
+                "Overall pos",
+                "No",
+                "Time",
+                "Mas adj time",
+                "Blade(img)",
+                "Club",
+                "Crew",
+                "Com code",
+                "Category",
+                "Pos in Cat",
+                "Pennant",
+                "Trophy",
+                "Penalty",
+                "Time only",
+            ],
+            export_rows(crews, fields, format_row),
+        )
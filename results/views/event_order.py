@@ -1,15 +1,18 @@
 import csv
-from .helpers import decode_utf8
+from .helpers import decode_utf8, with_job
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from .. import jobs
+from ..versions import EVENT_ORDERS, bump, collected
 from ..serializers import WriteEventOrderSerializer
-from ..models import EventOrder, Crew
+from ..models import EventOrder
 
 class EventOrderImport(APIView):
 
     parser_classes = (FormParser, MultiPartParser)
 
+    @collected()
     def post(self, request):
         EventOrder.objects.all().delete()
 
@@ -26,10 +29,9 @@ class EventOrderImport(APIView):
                 if serializer.is_valid():
                     serializer.save()
 
+        bump(EVENT_ORDERS)
         event_orders = EventOrder.objects.all()
 
         serializer = WriteEventOrderSerializer(event_orders, many=True)
 
-        Crew.update_start_order_calcs()
-
-        return Response(serializer.data)
+        return with_job(Response(serializer.data), jobs.enqueue(jobs.START_ORDERS))
@@ -11,6 +11,7 @@ from django.db.models import Count
 from ..serializers import EventSerializer, PopulatedEventSerializer
 
 from ..models import Event, EventMeetingKey
+from ..versions import collected
 
 
 class EventListView(APIView):  # extend the APIView
@@ -24,6 +25,7 @@ class EventListView(APIView):  # extend the APIView
 
 class EventDataImport(APIView):
 
+    @collected()
     def get(self, _request):
         # Start by deleting all existing events
         Event.objects.all().delete()
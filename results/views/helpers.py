@@ -1,3 +1,8 @@
 def decode_utf8(input_iterator):
     for l in input_iterator:
-        yield l.decode('utf-8')
\ No newline at end of file
+        yield l.decode('utf-8')
+
+def with_job(response, job):
+    """Pass the id of the background job an import has queued back to the client"""
+    response["X-Job-Id"] = str(job.id)
+    return response
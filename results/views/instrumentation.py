@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.http import Http404
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..instrumentation import stats
+
+
+class InstrumentationStatsView(APIView):
+    """
+    Rolling per-endpoint query counts and timings from this process, with
+    the requests that ran the most queries or took the longest. Only
+    available when RESULTS_INSTRUMENTATION is set, and only to staff users;
+    DELETE starts afresh.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def initial(self, request, *args, **kwargs):
+        if not settings.RESULTS_INSTRUMENTATION:
+            raise Http404
+        super().initial(request, *args, **kwargs)
+
+    def get(self, _request):
+        return Response(stats.summary())
+
+    def delete(self, _request):
+        stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
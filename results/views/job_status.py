@@ -0,0 +1,14 @@
+from rest_framework import generics
+from ..serializers import JobSerializer
+
+from ..models import Job
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    """
+    Status of a background job: progress (crews processed / total), duration,
+    result and any error. Polled by the frontend until the job finishes.
+    """
+
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
@@ -6,7 +6,9 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.db import transaction
 from ..serializers import ImportMarshallingDivisionSerializer, MarshallingDivisionSerializer
-from ..models import MarshallingDivision
+from ..lookups import MarshallingDivisionIndex
+from ..versions import MARSHALLING_DIVISIONS, bump, collected
+from ..models import Crew, MarshallingDivision
 
 class MarshallingDivisionListView(generics.ListCreateAPIView):
     queryset = MarshallingDivision.objects.all()
@@ -20,6 +22,7 @@ class BulkUpdateMarshallingDivisions(APIView):
     """
     Handle bulk updates of marshalling divisions with automatic range calculation
     """
+    @collected()
     def put(self, request):
         divisions_data = request.data.get('divisions', [])
         
@@ -59,22 +62,26 @@ class BulkUpdateMarshallingDivisions(APIView):
                     # Next division starts where this one ends + 1
                     current_bottom = top_range + 1
                 
-                # Serialize and return the created divisions
-                serializer = MarshallingDivisionSerializer(created_divisions, many=True)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-                
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Rebuild the cached index from the committed divisions
+        bump(MARSHALLING_DIVISIONS)
+
+        # Serialize and return the created divisions
+        serializer = MarshallingDivisionSerializer(created_divisions, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 class ImportMarshallingDivision(APIView):
     # This function imports the csv from frontend
     # Start by deleting all existing marshalling divisions
 
     parser_classes = (FormParser, MultiPartParser)
 
+    @collected()
     def post(self, request):
         MarshallingDivision.objects.all().delete()
 
@@ -93,9 +100,31 @@ class ImportMarshallingDivision(APIView):
                 if serializer.is_valid():
                     serializer.save()
 
+        bump(MARSHALLING_DIVISIONS)
         marshalling_divisions = MarshallingDivision.objects.all()
 
         serializer = ImportMarshallingDivisionSerializer(marshalling_divisions, many=True)
 
         return Response(serializer.data)
 
+
+class MarshallingDivisionCheck(APIView):
+    """
+    Overlapping division ranges, numbers below the top division that no
+    division covers, and accepted crews whose bib number (or start order)
+    has no division.
+    """
+
+    def get(self, _request):
+        index = MarshallingDivisionIndex.load()
+        crews = Crew.objects.filter(status__exact='Accepted').values_list('id', 'bib_number', 'calculated_start_order')
+
+        return Response({
+            'overlaps': index.overlaps,
+            'gaps': index.gaps,
+            'crews_without_division': [
+                crew_id for crew_id, bib_number, calculated_start_order in crews
+                if (bib_number or calculated_start_order)
+                and index.division_for(bib_number, calculated_start_order) is None
+            ],
+        })
@@ -6,6 +6,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 
 from ..serializers import WriteMastersAdjustmentSerializer
 
+from ..versions import MASTERS_ADJUSTMENTS, bump
 from ..models import MastersAdjustment
 
 class MastersAdjustmentsImport(APIView):
@@ -31,6 +32,7 @@ class MastersAdjustmentsImport(APIView):
                 serializer = WriteMastersAdjustmentSerializer(data=data)
                 if serializer.is_valid():
                     serializer.save()
+        bump(MASTERS_ADJUSTMENTS)
 
         masters_adjustments = MastersAdjustment.objects.all()
 
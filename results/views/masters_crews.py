@@ -1,7 +1,8 @@
 from django.http import JsonResponse
 from django.views import View
-from django.db.models import Min, Q, Count
-from ..models import Crew, OriginalEventCategory, MastersAdjustment
+from django.db.models import Q, Count
+from ..masters import MastersHandicap, standard_time
+from ..models import Crew, OriginalEventCategory
 
 class MastersCrewsView(View):
 
@@ -20,25 +21,26 @@ class MastersCrewsView(View):
             status__exact='Accepted'
         ).exclude(
             Q(did_not_start=True) | Q(did_not_finish=True) | Q(disqualified=True)
-        ).select_related('club', 'event').prefetch_related('event_original')
+        ).select_related('club', 'event')
         
+        # Fastest times, adjustment table and original categories are loaded once for all crews
+        handicap = MastersHandicap()
+
         # Calculate the fastest times used in masters adjustments (only if categories imported)
         fastest_times = {}
+        masters_adjustments = {}
         if categories_status['has_categories']:
-            fastest_times = self._get_fastest_times()
+            fastest_times = self._get_fastest_times(handicap)
+            masters_adjustments = handicap.adjustments(masters_crews)
         
         masters_data = []
         
         for crew in masters_crews:
             # Get masters adjustment (only if categories imported)
-            masters_adjustment = 0
-            if categories_status['has_categories'] and hasattr(crew, 'calc_masters_adjustment'):
-                masters_adjustment = crew.calc_masters_adjustment()
+            masters_adjustment = masters_adjustments.get(crew.id, 0)
             
             # Get original event category
-            original_event = None
-            if crew.event_original.exists():
-                original_event = crew.event_original.first().event_original
+            original_event = handicap.original_event(crew)
             
             # Determine which fastest time category this crew falls into
             fastest_time_category = None
@@ -61,25 +63,13 @@ class MastersCrewsView(View):
                 
                 # Look up the adjustment details
                 if master_category and applicable_fastest_time:
-                    try:
-                        rounded_fastest = round(int(applicable_fastest_time), -3)
-                        adjustment_record = MastersAdjustment.objects.get(
-                            master_category=master_category,
-                            standard_time_ms=rounded_fastest
-                        )
-                        adjustment_details = {
-                            'master_category': master_category,
-                            'standard_time_ms': rounded_fastest,
-                            'adjustment_ms': adjustment_record.master_time_adjustment_ms,
-                            'found_in_table': True
-                        }
-                    except MastersAdjustment.DoesNotExist:
-                        adjustment_details = {
-                            'master_category': master_category,
-                            'standard_time_ms': rounded_fastest,
-                            'adjustment_ms': 0,
-                            'found_in_table': False
-                        }
+                    adjustment_ms = handicap.lookup(master_category, applicable_fastest_time)
+                    adjustment_details = {
+                        'master_category': master_category,
+                        'standard_time_ms': standard_time(applicable_fastest_time),
+                        'adjustment_ms': adjustment_ms or 0,
+                        'found_in_table': adjustment_ms is not None
+                    }
             
             masters_data.append({
                 'crew_id': crew.id,
@@ -149,30 +139,15 @@ class MastersCrewsView(View):
             ) if not has_categories else None
         }
     
-    def _get_fastest_times(self):
+    def _get_fastest_times(self, handicap):
         """
-        Calculate the fastest times for each category used in masters adjustments.
+        The fastest times for each category used in masters adjustments.
         """
-        fastest_times = {}
-        
-        # Only calculate if OriginalEventCategory with '2x' exists
-        if not OriginalEventCategory.objects.filter(event_original='2x').exists():
-            return fastest_times
-        
-        # Get fastest times for each category
-        categories = [
-            ('fastest_men_scull', Q(event_band__startswith='Op', event_band__contains='2x')),
-            ('fastest_men_sweep', Q(event_band__startswith='Op', event_band__contains='2-')),
-            ('fastest_female_scull', Q(event_band__startswith='W', event_band__contains='2x')),
-            ('fastest_female_sweep', Q(event_band__startswith='W', event_band__contains='2-')),
-            ('fastest_mixed_scull', Q(event_band__startswith='Mx', event_band__contains='2x')),
-        ]
-        
-        for category_name, filter_q in categories:
-            result = Crew.objects.filter(filter_q, raw_time__gt=0).aggregate(Min('raw_time'))
-            fastest_times[category_name] = result.get('raw_time__min')
+        # Only report them if OriginalEventCategory with '2x' exists
+        if not handicap.enabled:
+            return {}
         
-        return fastest_times
+        return dict(handicap.fastest_times)
     
     def _determine_fastest_time_category(self, crew, original_event):
         """
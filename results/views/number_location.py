@@ -7,6 +7,7 @@ from rest_framework.views import APIView
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, ParseError
+from ..versions import NUMBER_LOCATIONS, bump, collected
 from ..serializers import NumberLocationSerializer
 from ..models import NumberLocation, Crew
 
@@ -19,14 +20,17 @@ class NumberLocationDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = NumberLocationSerializer
 
 class NumberLocationBulkUpdate(APIView):
+    @collected()
     def post(self, request):
         # Handling bulk create
         serializer = NumberLocationSerializer(data=request.data, many=True)
         if serializer.is_valid():
             serializer.save()
+            bump(NUMBER_LOCATIONS)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @collected()
     def put(self, request):
         # Handling bulk update
         data = request.data
@@ -39,6 +43,7 @@ class NumberLocationBulkUpdate(APIView):
                         'club': item.get('club'),
                     }
                 )
+        bump(NUMBER_LOCATIONS)
         return Response({'status': 'Updated number_locations successfully'}, status=status.HTTP_200_OK)
 
 
@@ -48,6 +53,7 @@ class NumberLocationImport(APIView):
 
     parser_classes = (FormParser, MultiPartParser)
 
+    @collected()
     def post(self, request):
         NumberLocation.objects.all().delete()
 
@@ -64,6 +70,7 @@ class NumberLocationImport(APIView):
                 if serializer.is_valid():
                     serializer.save()
 
+        bump(NUMBER_LOCATIONS)
         number_locations = NumberLocation.objects.all()
 
         serializer = NumberLocationSerializer(number_locations, many=True)
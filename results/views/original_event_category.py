@@ -2,8 +2,11 @@ import csv, io
 from rest_framework.views import APIView
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
+from .helpers import with_job
+from .. import jobs
 from ..models import OriginalEventCategory, Crew
 from ..serializers import ImportOriginalEventSerializer
+from ..versions import CREWS, bump
 
 
 class OriginalEventCategoryImport(APIView):
@@ -46,18 +49,19 @@ class OriginalEventCategoryImport(APIView):
                 else:
                     errors.append({'row': row, 'errors': serializer.errors})
 
+        # Original categories are crew data, though their masters adjustments
+        # only change once the recompute job runs
+        bump(CREWS)
         event_categories = OriginalEventCategory.objects.all()
         serializer = ImportOriginalEventSerializer(event_categories, many=True)
-        try:
-            Crew.update_all_computed_properties()
-        except Exception:
-            pass
+        job = jobs.enqueue(jobs.RECOMPUTE)
 
-        return Response({
+        return with_job(Response({
             "status": "success",
             "created_count": created_count,
             "matched_crews": matched_crews,
             "unmatched_crews": unmatched_crews,
             "data": serializer.data,
-            "errors": errors
-        })
+            "errors": errors,
+            "job_id": job.id,
+        }), job)
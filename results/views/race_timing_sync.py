@@ -1,20 +1,75 @@
 from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from ..offset_estimation import estimate_offsets, save_offset
 from ..serializers import RaceTimingSyncSerializer
 
-from ..models import RaceTimingSync, Crew
+from ..models import Race, RaceTimingSync, Crew
 
-class RaceTimingSyncListView(generics.ListCreateAPIView):
+def recompute_timed_on(races):
+    """Recalculate the crews whose start or finish times come from the races"""
+    Crew.update_computed_properties_for(Crew.timed_on(races).values_list('id', flat=True))
+
+class RecomputeOnSyncChangeMixin:
+    """
+    Offsets only move the times of the crews timed on the target race, so only
+    those are recalculated, and only once an offset is created, updated or
+    deleted.
+    """
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        recompute_timed_on([serializer.instance.target_race])
+
+    def perform_update(self, serializer):
+        previous_target_race = serializer.instance.target_race
+        super().perform_update(serializer)
+        recompute_timed_on([previous_target_race, serializer.instance.target_race])
+
+    def perform_destroy(self, instance):
+        target_race = instance.target_race
+        super().perform_destroy(instance)
+        recompute_timed_on([target_race])
+
+class RaceTimingSyncListView(RecomputeOnSyncChangeMixin, generics.ListCreateAPIView):
     queryset = RaceTimingSync.objects.all()
     serializer_class = RaceTimingSyncSerializer
-    try:
-        Crew.update_all_computed_properties()
-    except Exception:
-        pass
 
-class RaceTimingSyncDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RaceTimingSyncDetailView(RecomputeOnSyncChangeMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = RaceTimingSync.objects.all()
     serializer_class = RaceTimingSyncSerializer
-    try:
-        Crew.update_all_computed_properties()
-    except Exception:
-        pass
\ No newline at end of file
+
+class RaceTimingSyncEstimateView(APIView):
+    """
+    GET proposes an offset to the reference race for every other race, from
+    the crews tapped in both (see results/offset_estimation.py). POST saves
+    one: 'target_race_id', with 'offset_ms' or else the estimate, and
+    recalculates the crews timed on the race.
+    """
+
+    def get(self, _request):
+        return Response(estimate_offsets())
+
+    def post(self, request):
+        try:
+            target_race = Race.objects.get(id=int(request.data['target_race_id']), is_timing_reference=False)
+        except (KeyError, TypeError, ValueError, Race.DoesNotExist):
+            return Response({'error': 'target_race_id must be a race other than the reference'}, status=400)
+        if not Race.objects.filter(is_timing_reference=True).exists():
+            return Response({'error': 'No race is set as the timing reference'}, status=400)
+
+        offset_ms = request.data.get('offset_ms')
+        if offset_ms is None:
+            offset_ms = next(
+                (proposal['offset_ms'] for proposal in estimate_offsets() if proposal['target_race_id'] == target_race.id),
+                None,
+            )
+            if offset_ms is None:
+                return Response({'error': 'Not enough crews tapped in both races to estimate the offset'}, status=400)
+
+        try:
+            sync = save_offset(target_race, int(offset_ms))
+        except (TypeError, ValueError):
+            return Response({'error': 'offset_ms must be a whole number of milliseconds'}, status=400)
+        recompute_timed_on([target_race])
+        return Response(RaceTimingSyncSerializer(sync).data)
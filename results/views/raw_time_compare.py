@@ -1,11 +1,9 @@
 from django.http import JsonResponse
 from django.views import View
-from django.db.models import Q
-from collections import defaultdict
-import json
-from ..models import Race, RaceTime
 from django.core.paginator import Paginator
 
+from ..raw_time_comparison import raw_time_comparison
+
 class RawTimeComparisonView(View):
 
     def get(self, request):
@@ -14,186 +12,18 @@ class RawTimeComparisonView(View):
         Groups by crew and calculates confidence based on time differences.
         Includes position rankings for each race timing system.
         Supports pagination, filtering, and sorting.
+        The comparison itself is only recalculated when the timing data
+        changes (see results/raw_time_comparison.py).
         """
-        # Get all races that have both start and finish timing data
-        races_with_complete_times = Race.objects.filter(
-            race_times__tap='Start'
-        ).filter(
-            race_times__tap='Finish'
-        ).distinct().order_by('name')
-        
-        if not races_with_complete_times.exists():
+        comparison = raw_time_comparison()
+
+        if comparison is None:
             return JsonResponse({
                 'error': 'No races found with both Start and Finish timing data'
             }, status=404)
-        
-        # Get all race times (both start and finish) for these races
-        race_times = RaceTime.objects.filter(
-            race__in=races_with_complete_times,
-        ).select_related('crew', 'race', 'crew__club').order_by('crew__bib_number', 'race__id', 'tap')
-        
-        # Build race info
-        race_info = {}
-        for race in races_with_complete_times:
-            race_info[race.id] = {
-                'name': race.name,
-                'race_id': race.race_id,
-                'is_reference': race.is_timing_reference
-            }
-        
-        # Group race times by crew and race, separating start and finish
-        crew_race_times = defaultdict(lambda: defaultdict(lambda: {'start': None, 'finish': None}))
-        unassigned_times = defaultdict(lambda: defaultdict(lambda: {'start': None, 'finish': None}))
-        
-        for race_time in race_times:
-            tap_type = race_time.tap.lower()
-            if race_time.crew:
-                crew_race_times[race_time.crew.id][race_time.race.id][tap_type] = race_time
-            else:
-                unassigned_times[race_time.race.id][race_time.id][tap_type] = race_time
-        
-        # Calculate raw times and build comparison data
-        comparison_data = []
-        
-        for crew_id, race_data in crew_race_times.items():
-            # Get crew info
-            crew_info = None
-            crew_obj = None
-            for race_id, times in race_data.items():
-                if times['start'] and times['start'].crew:
-                    crew_obj = times['start'].crew
-                    crew_info = {
-                        'id': crew_obj.id,
-                        'bib_number': crew_obj.bib_number,
-                        'name': crew_obj.name,
-                        'competitor_names': crew_obj.competitor_names,
-                        'club': crew_obj.club.name if crew_obj.club else None,
-                        'event_band': crew_obj.event_band if hasattr(crew_obj, 'event_band') else None,
-                        'status': crew_obj.status,
-                        'time_only': crew_obj.time_only,
-                        'penalty': crew_obj.penalty if hasattr(crew_obj, 'penalty') else 0,
-                        'masters_adjusted_time': crew_obj.masters_adjusted_time if hasattr(crew_obj, 'masters_adjusted_time') else None,
-                    }
-                    break
-                elif times['finish'] and times['finish'].crew:
-                    crew_obj = times['finish'].crew
-                    crew_info = {
-                        'id': crew_obj.id,
-                        'bib_number': crew_obj.bib_number,
-                        'name': crew_obj.name,
-                        'competitor_names': crew_obj.competitor_names,
-                        'club': crew_obj.club.name if crew_obj.club else None,
-                        'event_band': crew_obj.event_band if hasattr(crew_obj, 'event_band') else None,
-                        'status': crew_obj.status,
-                        'time_only': crew_obj.time_only,
-                        'penalty': crew_obj.penalty if hasattr(crew_obj, 'penalty') else 0,
-                        'masters_adjusted_time': crew_obj.masters_adjusted_time if hasattr(crew_obj, 'masters_adjusted_time') else None,
-                    }
-                    break
-            
-            if not crew_info:
-                continue
-            
-            row = {
-                'crew': crew_info,
-                'raw_times': {},  # race_id -> raw_time (in centiseconds)
-                'race_time_details': {},  # race_id -> {start, finish, raw_time, position_time}
-                'missing_races': [],
-                'incomplete_races': [],  # races with only start or finish
-                'positions_match': None,  # Will be set after calculating positions
-            }
-            
-            raw_times_list = []
-            
-            # Calculate raw times for each race
-            for race_id in race_info.keys():
-                if race_id in race_data:
-                    times = race_data[race_id]
-                    start_time = times['start']
-                    finish_time = times['finish']
-                    
-                    if start_time and finish_time:
-                        # Calculate raw time (finish - start) in centiseconds
-                        raw_time = finish_time.time_tap - start_time.time_tap
-                        
-                        # Calculate position time (like calc_category_position_time)
-                        position_time = self._calc_position_time(
-                            raw_time,
-                            crew_info['masters_adjusted_time'],
-                            crew_info['penalty']
-                        )
-                        
-                        row['raw_times'][race_id] = raw_time
-                        row['race_time_details'][race_id] = {
-                            'start_id': start_time.id,
-                            'finish_id': finish_time.id,
-                            'start_time': start_time.time_tap,
-                            'finish_time': finish_time.time_tap,
-                            'raw_time': raw_time,
-                            'position_time': position_time,
-                        }
-                        raw_times_list.append(raw_time)
-                    elif start_time or finish_time:
-                        # Has one but not the other
-                        row['incomplete_races'].append(race_id)
-                        row['race_time_details'][race_id] = {
-                            'start_id': start_time.id if start_time else None,
-                            'finish_id': finish_time.id if finish_time else None,
-                            'start_time': start_time.time_tap if start_time else None,
-                            'finish_time': finish_time.time_tap if finish_time else None,
-                            'raw_time': None,
-                            'position_time': None,
-                            'incomplete': True,
-                        }
-                else:
-                    row['missing_races'].append(race_id)
-            
-            # Calculate confidence metrics
-            if len(raw_times_list) >= 2:
-                max_time = max(raw_times_list)
-                min_time = min(raw_times_list)
-                time_spread = (max_time - min_time) / 10  # in centiseconds
-                avg_time = sum(raw_times_list) / len(raw_times_list)
-                
-                # Determine confidence level based on spread (100 centiseconds = 1 second)
-                if time_spread <= 100:  # 1.0s
-                    confidence = 'high'
-                    confidence_score = 3
-                elif time_spread <= 500:  # 5.0s
-                    confidence = 'medium'
-                    confidence_score = 2
-                else:
-                    confidence = 'low'
-                    confidence_score = 1
-                
-                row['confidence'] = {
-                    'level': confidence,
-                    'score': confidence_score,
-                    'time_spread': time_spread,  # in centiseconds
-                    'max_time': max_time,
-                    'min_time': min_time,
-                    'avg_time': avg_time,
-                }
-            elif len(raw_times_list) == 1:
-                row['confidence'] = {
-                    'level': 'single',
-                    'score': 0,
-                    'time_spread': 0,
-                    'avg_time': raw_times_list[0],
-                }
-            else:
-                row['confidence'] = {
-                    'level': 'none',
-                    'score': 0,
-                }
-            
-            comparison_data.append(row)
-        
-        # Calculate positions for each race
-        self._calculate_positions(comparison_data, race_info)
-        
-        # Check if positions match across races for each crew
-        self._check_position_matches(comparison_data, race_info)
+
+        race_info = comparison.races
+        comparison_data = comparison.rows
         
         # Apply filtering
         filtered_data = self._apply_filters(comparison_data, request)
@@ -271,99 +101,6 @@ class RawTimeComparisonView(View):
             }
         })
     
-    def _calc_position_time(self, raw_time, masters_adjusted_time, penalty):
-        """
-        Calculate the time to use for position ranking.
-        Similar to Crew.calc_category_position_time()
-        """
-        if masters_adjusted_time is not None and masters_adjusted_time > 0:
-            return masters_adjusted_time + penalty * 1000
-        return raw_time
-    
-    def _calculate_positions(self, comparison_data, race_info):
-        """
-        Calculate positions for each race timing system.
-        Similar to Crew.calc_category_rank()
-        """
-        # For each race, calculate positions within each event_band
-        for race_id in race_info.keys():
-            # Group crews by event_band for this race
-            event_band_crews = defaultdict(list)
-            
-            for row in comparison_data:
-                # Skip if crew doesn't have data for this race
-                if race_id not in row['race_time_details']:
-                    continue
-                
-                details = row['race_time_details'][race_id]
-                
-                # Skip incomplete races or time_only crews
-                if details.get('incomplete') or row['crew']['time_only']:
-                    continue
-                
-                # Skip if no valid time
-                if details.get('raw_time') is None or details.get('raw_time') <= 0:
-                    continue
-                
-                # Skip if crew status is not "Accepted"
-                if row['crew']['status'] != 'Accepted':
-                    continue
-                
-                event_band = row['crew']['event_band']
-                event_band_crews[event_band].append({
-                    'crew_id': row['crew']['id'],
-                    'position_time': details['position_time'],
-                })
-            
-            # Sort and assign positions within each event_band
-            for event_band, crews in event_band_crews.items():
-                # Sort by position_time
-                crews.sort(key=lambda x: x['position_time'])
-                
-                # Assign positions
-                for position, crew_data in enumerate(crews, start=1):
-                    # Find the crew in comparison_data and add position
-                    for row in comparison_data:
-                        if row['crew']['id'] == crew_data['crew_id']:
-                            if 'positions' not in row['race_time_details'][race_id]:
-                                row['race_time_details'][race_id]['positions'] = {}
-                            row['race_time_details'][race_id]['positions']['category'] = position
-                            break
-            
-            # Also calculate overall positions (across all event_bands)
-            all_crews = []
-            for row in comparison_data:
-                if race_id not in row['race_time_details']:
-                    continue
-                
-                details = row['race_time_details'][race_id]
-                
-                if details.get('incomplete') or row['crew']['time_only']:
-                    continue
-                
-                if details.get('raw_time') is None or details.get('raw_time') <= 0:
-                    continue
-                
-                if row['crew']['status'] != 'Accepted':
-                    continue
-                
-                all_crews.append({
-                    'crew_id': row['crew']['id'],
-                    'raw_time': details['raw_time'],
-                })
-            
-            # Sort by raw_time for overall position
-            all_crews.sort(key=lambda x: x['raw_time'])
-            
-            # Assign overall positions
-            for position, crew_data in enumerate(all_crews, start=1):
-                for row in comparison_data:
-                    if row['crew']['id'] == crew_data['crew_id']:
-                        if 'positions' not in row['race_time_details'][race_id]:
-                            row['race_time_details'][race_id]['positions'] = {}
-                        row['race_time_details'][race_id]['positions']['overall'] = position
-                        break
-    
     def _apply_filters(self, data, request):
         """Apply filters to the comparison data."""
         filtered_data = data
@@ -442,36 +179,3 @@ class RawTimeComparisonView(View):
             sorted_data = list(reversed(sorted_data))
         
         return sorted_data
-    
-    def _check_position_matches(self, comparison_data, race_info):
-        """
-        Check if category positions match across all races for each crew.
-        Sets positions_match flag: True if all match, False if mismatch, None if not enough data.
-        """
-        for row in comparison_data:
-            # Collect all category positions for this crew across races
-            category_positions = []
-            
-            for race_id in race_info.keys():
-                if race_id in row['race_time_details']:
-                    details = row['race_time_details'][race_id]
-                    
-                    # Skip incomplete races
-                    if details.get('incomplete'):
-                        continue
-                    
-                    # Get the category position if it exists
-                    position = details.get('positions', {}).get('category')
-                    if position is not None:
-                        category_positions.append(position)
-            
-            # Determine if positions match
-            if len(category_positions) == 0:
-                # No valid positions to compare
-                row['positions_match'] = None
-            elif len(category_positions) == 1:
-                # Only one race with position, can't compare
-                row['positions_match'] = None
-            else:
-                # Check if all positions are the same
-                row['positions_match'] = len(set(category_positions)) == 1
\ No newline at end of file
@@ -0,0 +1,44 @@
+from rest_framework import filters, generics
+from django_filters.rest_framework import DjangoFilterBackend
+
+from ..pagination import ResultPaginationWithFastestTimes
+from ..serializers import ResultSnapshotSerializer
+
+from ..models import ResultSnapshot
+
+
+class ResultListView(generics.ListAPIView):
+    """
+    Public results, read from the results snapshot (rebuilt whenever results
+    are recalculated) rather than the crews and their related tables
+    """
+
+    queryset = ResultSnapshot.objects.all()
+    serializer_class = ResultSnapshotSerializer
+    pagination_class = ResultPaginationWithFastestTimes
+    filter_backends = [
+        filters.SearchFilter,
+        filters.OrderingFilter,
+        DjangoFilterBackend,
+    ]
+    ordering_fields = [
+        "overall_rank",
+        "gender_rank",
+        "category_rank",
+        "club_name",
+        "competitor_names",
+        "published_time",
+    ]
+    ordering = ["overall_rank"]
+    search_fields = [
+        "name",
+        "=crew_id",
+        "club_name",
+        "event_band",
+        "=bib_number",
+        "competitor_names",
+    ]
+    filterset_fields = [
+        "event_band",
+        "gender",
+    ]
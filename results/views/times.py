@@ -5,7 +5,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from .helpers import decode_utf8
+from .helpers import decode_utf8, with_job
 from django.http import Http404
 from django.db import transaction
 from pprint import pprint
@@ -21,7 +21,11 @@ from rest_framework import filters, generics
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.parsers import MultiPartParser, FormParser, ParseError
 
-from ..serializers import WriteRaceTimesSerializer, RaceTimesSerializer, PopulatedRaceTimesSerializer
+from .. import jobs
+from ..versions import RACE_TIMES, bump
+from ..race_time_import import import_csv_taps, import_fast_taps
+from ..tap_assignment import TapAssigner, apply_assignments
+from ..serializers import RaceTimesSerializer, PopulatedRaceTimesSerializer
 
 from ..models import RaceTime, Crew, Race
 
@@ -68,20 +72,21 @@ class RaceTimeDetailView(APIView):
 
     def put(self, request, pk):
         race_time = self.get_race_time(pk)
-        race_time = RaceTime.objects.get(pk=pk)
+        previous_crew_id = race_time.crew_id
         serializer = RaceTimesSerializer(race_time, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=201)
             try:
-                Crew.update_all_computed_properties()
+                Crew.update_computed_properties_for([previous_crew_id, race_time.crew_id])
             except Exception:
                 pass
+            return Response(serializer.data, status=201)
         return Response(serializer.errors, status=422)
 
     
     def patch(self, request, pk):
         race_time = self.get_race_time(pk)
+        previous_crew_id = race_time.crew_id
         
         # Handle crew assignment with conflict resolution
         if 'crew' in request.data:
@@ -115,9 +120,9 @@ class RaceTimeDetailView(APIView):
                         race_time.crew = None
                         race_time.save()
                     
-                    # Update computed properties after the assignment
+                    # Update computed properties for the crews losing and gaining the time
                     try:
-                        Crew.update_all_computed_properties()
+                        Crew.update_computed_properties_for([previous_crew_id, race_time.crew_id])
                     except Exception:
                         pass
                     
@@ -141,7 +146,7 @@ class RaceTimeDetailView(APIView):
             if serializer.is_valid():
                 serializer.save()
                 try:
-                    Crew.update_all_computed_properties()
+                    Crew.update_computed_properties_for([previous_crew_id, race_time.crew_id])
                 except Exception:
                     pass
                 return Response(serializer.data, status=200)
@@ -150,15 +155,45 @@ class RaceTimeDetailView(APIView):
 
     def delete(self, _request, pk):
         race_time = self.get_race_time(pk)
-        race_time = RaceTime.objects.get(pk=pk)
+        crew_id = race_time.crew_id
         race_time.delete()
+        bump(RACE_TIMES, [crew_id])
         try:
-            Crew.update_all_computed_properties()
+            Crew.update_computed_properties_for([crew_id])
         except Exception:
             pass
         return Response(status=204)
 
 
+class RaceTimeAutoAssignView(APIView):
+    """
+    GET proposes crews for the unassigned Start and Finish taps (optionally
+    of one race_id, and at or above min_confidence), lined up against the
+    other timing systems. POST applies 'assignments' ([{race_time_id,
+    crew_id}]), or every proposal at or above 'min_confidence', in one go.
+    """
+
+    def get(self, request):
+        try:
+            race_id = request.query_params.get('race_id')
+            race_id = int(race_id) if race_id else None
+            min_confidence = float(request.query_params.get('min_confidence', 0))
+        except ValueError:
+            return Response({'error': 'race_id and min_confidence must be numbers'}, status=400)
+        return Response(TapAssigner.load().proposals(race_id, min_confidence))
+
+    def post(self, request):
+        assignments = request.data.get('assignments')
+        try:
+            if assignments is None:
+                min_confidence = float(request.data['min_confidence'])
+                assignments = TapAssigner.load().proposals(min_confidence=min_confidence)
+            summary = apply_assignments(assignments)
+        except (KeyError, TypeError, ValueError):
+            return Response({'error': 'assignments ([{race_time_id, crew_id}]) or min_confidence is required'}, status=400)
+        return Response(summary)
+
+
 # Import CSV via frontend
 
 class ImportRaceTimes(APIView):
@@ -174,36 +209,11 @@ class ImportRaceTimes(APIView):
         except Race.DoesNotExist:
             return Response({'error': 'Race not found'}, status=404)
 
-        if delete_times:
-            race_times_to_delete = RaceTime.objects.filter(race_id=id)
-            race_times_to_delete.delete()
-
         reader = csv.reader(decode_utf8(request.FILES['file']))
         next(reader) # skips the first row
-        for row in reader:
-
-            if row:
-                data = {
-                    'sequence': row[0],
-                    'tap': row[3] or 'Finish',
-                    'time_tap': row[4],
-                    'crew':row[8] or None,
-                    'race': id
-                }
-                serializer = WriteRaceTimesSerializer(data=data)
-                if serializer.is_valid():
-                    serializer.save()
-
-        race_times = RaceTime.objects.all()
+        summary = import_csv_taps(reader, id, replace=delete_times)
 
-        serializer = WriteRaceTimesSerializer(race_times, many=True)
-
-        try:
-            Crew.update_all_computed_properties()
-        except Exception:
-            pass
-
-        return Response(serializer.data)
+        return with_job(Response(summary), jobs.enqueue(jobs.RECOMPUTE))
 
 
 class ImportTimesWebscorer(APIView):
@@ -213,10 +223,6 @@ class ImportTimesWebscorer(APIView):
         apiid = os.getenv("WEBSCORERAPI")
         race_id = Race.objects.get(id=id).race_id
 
-        if delete_times:
-            race_times_to_delete = RaceTime.objects.filter(race_id=id)
-            race_times_to_delete.delete()
-
         url = 'https://www.webscorer.com/json/fasttaps' 
         payload = {'raceid':race_id, 'apiid':apiid}
         headers = {
@@ -225,29 +231,9 @@ class ImportTimesWebscorer(APIView):
         r = requests.get(url, params=payload, headers=headers)
 
         if r.status_code == 200:
-            for tap in r.json()['FastTaps']:
-
-                data = {
-                    'sequence': float(tap['Seq #']),
-                    'tap': tap['Tap'],
-                    'time_tap': tap['Time tap'],
-                    'crew': tap['Team name 2'],
-                    'race': id
-                }
-
-                serializer = WriteRaceTimesSerializer(data=data)
-                if serializer.is_valid(raise_exception=True):
-                    serializer.save()
-
-            race_times = RaceTime.objects.all()
-
-            serializer = RaceTimesSerializer(race_times, many=True)
-
-            try:
-                Crew.update_all_computed_properties()
-            except Exception:
-                pass
+            # Replaces the race's existing times
+            summary = import_fast_taps(r.json()['FastTaps'], id, replace=delete_times)
 
-            return Response(serializer.data)
+            return with_job(Response(summary), jobs.enqueue(jobs.RECOMPUTE))
         
         return Response(status=400)
\ No newline at end of file